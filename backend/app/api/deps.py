@@ -2,14 +2,51 @@
 Dependencias de FastAPI para autenticación y autorización.
 """
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.database import get_db
 from app.models.user import User
 from app.auth import decode_access_token
+from app.config import settings
+from app.core.cache import TTLCache
 
 security = HTTPBearer()
 
+# Usuario autenticado por id: columnas de la fila, no la instancia (cada
+# request la adjunta a su propia sesión). Se invalida al modificar el
+# usuario; lo que cambie por otro camino tarda a lo sumo el TTL en verse.
+principal_cache = TTLCache(maxsize=settings.AUTH_PRINCIPAL_CACHE_SIZE, ttl=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+
+_USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+
+def invalidate_principal(user_id: int):
+    """Llamar después del commit que modifica al usuario (rol, estado, perfil, reputación)."""
+    principal_cache.delete(user_id)
+
+
+def _query_principal(db: Session, user_id: int):
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        principal_cache.set(user_id, {key: getattr(user, key) for key in _USER_COLUMNS})
+    return user
+
+
+async def _load_principal(db: Session, user_id: int):
+    row = principal_cache.get(user_id, None)
+    if row is not None:
+        # Instancia "persistente" armada desde la caché, sin SELECT: si el
+        # endpoint la modifica, el commit hace el UPDATE como siempre.
+        user = User(**row)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    # La sesión es sync (la comparten las rutas `def`): la consulta va al
+    # threadpool para no bloquear el event loop.
+    return await run_in_threadpool(_query_principal, db, user_id)
+
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -31,12 +68,19 @@ async def get_current_user(
                 detail="Token inválido"
             )
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await _load_principal(db, user_id)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Usuario no encontrado"
             )
+
+        # Bloqueado (o nunca aprobado) después de emitido el token
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Tu cuenta está bloqueada o pendiente de aprobación."
+            )
         
         return user
     
@@ -59,5 +103,3 @@ def get_current_admin_user(
             detail="Se requieren privilegios de Administrador"
         )
     return current_user
-
-
@@ -1,14 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database import get_db
-from app.api.deps import get_current_admin_user
+from sqlalchemy import func, or_, and_
+from app.database import get_db, pool_stats
+from app.api.deps import get_current_admin_user, invalidate_principal, principal_cache
 from app.models import User, Ride, Booking, RideRequest
-from app.models.audit import AuditLog
+from app.models.audit import AuditLog, AuditArchive
 from app.models.stats import VisitCounter
+from app.models.payment import PaymentWebhookEvent
 from app.schemas import UserResponse, RideResponse, BookingResponse
 from app.services.audit_service import AuditService
+from app.utils.matching import ride_index
+from app.services.match_service import MatchService
+from app.services.geocode_service import GeocodeService, upstream as geocode_upstream
+from app.services.payment_webhook_service import PaymentWebhookService, WORKER_NAME as WEBHOOK_WORKER
+from app.services.payment_reconciliation_service import PaymentReconciliationService
+from app.core import workers
+from app.core.audit_writer import audit_writer
+from app.core.password_hasher import password_hasher
+from app.config import settings
+from app.utils.pagination import encode_cursor, decode_cursor
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
@@ -91,14 +102,52 @@ def get_all_bookings(
 
 @router.get("/logs")
 def get_all_logs(
-    skip: int = 0,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: int = 50,
+    action: Optional[str] = None,
+    user_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user)
 ):
-    logs = db.query(AuditLog).order_by(AuditLog.timestamp.desc()).offset(skip).limit(limit).all()
+    """
+    Auditoría, más reciente primero. Paginado por cursor (keyset sobre
+    timestamp, id): si hay más, la respuesta trae `X-Next-Cursor`.
+    Los meses ya archivados están en /logs/archives.
+    """
+    limit = max(1, min(limit, settings.AUDIT_ADMIN_PAGE_SIZE_MAX))
+    query = db.query(AuditLog)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if user_id is not None:
+        query = query.filter(AuditLog.user_id == user_id)
+    if cursor:
+        before_ts, before_id = decode_cursor(cursor, tz=None)
+        query = query.filter(or_(
+            AuditLog.timestamp < before_ts,
+            and_(AuditLog.timestamp == before_ts, AuditLog.id < before_id)
+        ))
+    logs = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    if len(logs) > limit:
+        logs = logs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(logs[-1].timestamp, logs[-1].id)
     return logs
 
+@router.get("/logs/archives")
+def get_log_archives(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Meses de auditoría exportados (JSONL gzip) y borrados de la tabla."""
+    archives = db.query(AuditArchive).order_by(AuditArchive.month.desc(), AuditArchive.id.desc()).all()
+    return [
+        {
+            "month": a.month, "path": a.path, "rows": a.rows,
+            "min_id": a.min_id, "max_id": a.max_id, "created_at": a.created_at
+        }
+        for a in archives
+    ]
+
 class VerificationRequest(BaseModel):
     status: str # "approved" or "rejected"
 
@@ -126,6 +175,7 @@ def change_user_role(
     old_role = user.role
     user.role = payload.role
     db.commit()
+    invalidate_principal(user.id)
     
     # Audit
     AuditService.log(db, "ROLE_CHANGED", user_id=current_user.id, details={
@@ -162,6 +212,7 @@ def verify_user(
         raise HTTPException(status_code=400, detail="Estado inválido (use 'approved' o 'rejected')")
         
     db.commit()
+    invalidate_principal(user.id)
     
     # Audit
     AuditService.log(db, "VERIFICATION_DECIDED", user_id=current_user.id, details={
@@ -191,6 +242,7 @@ def approve_user_access(
     
     user.is_active = True
     db.commit()
+    invalidate_principal(user.id)
     
     AuditService.log(db, "USER_ACTIVATED", user_id=current_user.id, details={"target_user_id": user.id})
     return {"message": f"Usuario {user.name} activado correctamente."}
@@ -210,6 +262,7 @@ def block_user_access(
     
     user.is_active = False
     db.commit()
+    invalidate_principal(user.id)
     
     AuditService.log(db, "USER_BLOCKED", user_id=current_user.id, details={"target_user_id": user.id})
     return {"message": f"Usuario {user.name} bloqueado temporalmente."}
@@ -229,7 +282,99 @@ def admin_cancel_ride(
         
     ride.status = "cancelled"
     # Logic to refund bookings could go here
+    MatchService.on_ride_closed(db, ride.id)
     db.commit()
+    ride_index.remove(ride.id)
     
     AuditService.log(db, "RIDE_CANCELLED_ADMIN", user_id=current_user.id, details={"ride_id": ride.id})
     return {"message": "Viaje cancelado por administración."}
+
+
+@router.post("/matches/rebuild")
+def rebuild_matches(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Reconstruye desde cero la tabla de coincidencias materializadas.
+    """
+    total = MatchService.rebuild(db)
+    AuditService.log(db, "MATCHES_REBUILT", user_id=current_user.id, details={"matches": total})
+    return {"message": "Coincidencias reconstruidas.", "matches": total}
+
+
+@router.get("/matches/check")
+def check_matches(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Verifica la tabla de coincidencias contra el motor de matching.
+    """
+    return MatchService.check_consistency(db)
+
+
+class WebhookReplayRequest(BaseModel):
+    event_ids: Optional[List[int]] = None  # Sin ids: todos los eventos 'failed'
+
+
+@router.get("/payment-webhooks")
+def list_payment_webhooks(
+    status: str = "failed",
+    limit: int = 50,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Notificaciones de MercadoPago en la cola de ingesta, por estado.
+    """
+    events = db.query(PaymentWebhookEvent).filter(
+        PaymentWebhookEvent.status == status
+    ).order_by(PaymentWebhookEvent.id.desc()).limit(min(limit, 500)).all()
+    return [{
+        "id": e.id,
+        "topic": e.topic,
+        "resource_id": e.resource_id,
+        "status": e.status,
+        "deliveries": e.deliveries,
+        "attempts": e.attempts,
+        "last_error": e.last_error,
+        "booking_id": e.booking_id,
+        "received_at": e.received_at,
+        "processed_at": e.processed_at,
+    } for e in events]
+
+
+@router.post("/payment-webhooks/replay")
+def replay_payment_webhooks(
+    request: WebhookReplayRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Vuelve a encolar notificaciones fallidas (o las indicadas por id).
+    """
+    count = PaymentWebhookService.replay(db, request.event_ids)
+    workers.wake(WEBHOOK_WORKER)
+    AuditService.log(db, "PAYMENT_WEBHOOKS_REPLAYED", user_id=current_user.id, details={"count": count, "event_ids": request.event_ids})
+    return {"message": "Notificaciones reencoladas.", "count": count}
+
+
+@router.get("/metrics")
+def get_runtime_metrics(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Métricas del proceso (cachés, colas). Son por worker y se reinician con él.
+    """
+    return {
+        "geocode_cache": GeocodeService.stats(),
+        "geocode_upstream": geocode_upstream.stats(),
+        "workers": workers.stats(),
+        "audit_writer": audit_writer.stats(),
+        "principal_cache": principal_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "db_pool": pool_stats(),
+        "payment_reconciliation": PaymentReconciliationService.freshness(db),
+    }
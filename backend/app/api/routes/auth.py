@@ -4,10 +4,12 @@ Rutas de autenticación: registro y login.
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.api.deps import invalidate_principal
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, UserLogin, Token
 from app import auth
 from app import utils
+from app.core.password_hasher import HasherBusy, password_hasher
 from app.services.email_service import EmailService
 from app.services.audit_service import AuditService
 
@@ -106,6 +108,17 @@ def login(user_credentials: UserLogin, request: Request, db: Session = Depends(g
              logger.error(f"Bcrypt Error for {user_credentials.dni}: {ve}")
              raise HTTPException(status_code=500, detail="Error de seguridad interno (Hash Invalido)")
 
+        # Hash de otro costo (PASSWORD_HASH_ROUNDS cambió): rehacerlo ahora que tenemos la contraseña
+        if auth.password_needs_rehash(user.hashed_password):
+            try:
+                user.hashed_password = auth.get_password_hash(user_credentials.password)
+                db.commit()
+                invalidate_principal(user.id)
+                password_hasher.record_rehash()
+            except HasherBusy:
+                # Con el pool saturado no vale la pena: se rehace en otro login
+                pass
+
         # Login Exitoso
         access_token = auth.create_access_token(
             data={"sub": user.dni, "id": user.id} 
@@ -121,7 +134,7 @@ def login(user_credentials: UserLogin, request: Request, db: Session = Depends(g
             "token_type": "bearer", 
             "user": user
         }
-    except HTTPException:
+    except (HTTPException, HasherBusy):
         raise
     except Exception as e:
         logger.error(f"CRITICAL LOGIN ERROR: {e}")
@@ -196,6 +209,7 @@ def reset_password(payload: ResetPasswordRequest, db: Session = Depends(get_db))
     # Cambiar Password
     user.hashed_password = auth.get_password_hash(payload.new_password)
     db.commit()
+    invalidate_principal(user.id)
     
     return {"message": "Contraseña actualizada correctamente"}
 
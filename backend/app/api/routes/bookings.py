@@ -3,18 +3,26 @@ Rutas de Reservas (Bookings).
 Permite a los pasajeros reservar asientos en viajes ofrecidos.
 """
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.user import User
 from app.models.ride import Ride
-from app.models.booking import Booking, BookingStatus
-from app.schemas.booking import BookingCreate, BookingResponse, BookingUpdate
+from app.models.booking import Booking, BookingStatus, SEAT_HOLDING_STATUSES
+from app.models.payment import PaymentPreference
+from app.schemas.booking import BookingCreate, BookingResponse, BookingUpdate, PaymentPreferenceResponse
 
-from app.api.deps import get_current_user, get_current_admin_user
+from app.api.deps import get_current_user, get_current_admin_user, invalidate_principal
 from app import utils
 from app.services.audit_service import AuditService
+from app.services.seat_service import SeatService, BookingStatusChanged
+from app.services.payment_outbox_service import PaymentOutboxService, WORKER_NAME as OUTBOX_WORKER
+from app.core import workers
 from datetime import datetime
+from app.utils.dates import utcnow
 from app.core.logger import logger
 
 router = APIRouter(prefix="/api/bookings", tags=["bookings"])
@@ -103,9 +111,9 @@ def get_bookings(db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=List[BookingResponse])
-def get_my_bookings(
+async def get_my_bookings(
     history: bool = False,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -115,14 +123,18 @@ def get_my_bookings(
     try:
         # Mostrar reservas de viajes futuros o recientes (últimas 24hs)
         from datetime import timedelta
-        limit_date = datetime.now() - timedelta(hours=24)
+        limit_date = utcnow() - timedelta(hours=24)
         
-        query = db.query(Booking).join(Ride).filter(Booking.passenger_id == current_user.id)
+        # Viaje y conductor en el mismo SELECT (la sesión async no hace lazy load)
+        query = select(Booking).join(Booking.ride).options(
+            contains_eager(Booking.ride).joinedload(Ride.driver)
+        ).filter(Booking.passenger_id == current_user.id)
         
         if history:
-             bookings = query.filter(Ride.departure_time < limit_date).order_by(Ride.departure_time.desc()).all()
+             query = query.filter(Ride.departure_at < limit_date).order_by(Ride.departure_at.desc())
         else:
-             bookings = query.filter(Ride.departure_time >= limit_date).order_by(Ride.departure_time.asc()).all()
+             query = query.filter(Ride.departure_at >= limit_date).order_by(Ride.departure_at.asc())
+        bookings = (await db.scalars(query)).all()
 
         result = []
         for booking in bookings:
@@ -176,8 +188,8 @@ def create_booking(
     - El usuario no puede reservar en su propio viaje
     - El usuario no puede tener una reserva duplicada para el mismo viaje
     """
-    # Verificar que el viaje existe (Con bloqueo p/ evitar race conditions en asientos)
-    ride = db.query(Ride).filter(Ride.id == booking.ride_id).with_for_update().first()
+    # Verificar que el viaje existe (sin bloqueo: los asientos se reservan con un UPDATE condicional)
+    ride = db.query(Ride).filter(Ride.id == booking.ride_id).first()
     if not ride:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -191,27 +203,11 @@ def create_booking(
             detail="No puedes reservar en tu propio viaje"
         )
     
-    # Verificar asientos disponibles
-    # Contar reservas confirmadas/pendientes para este viaje
-    existing_bookings = db.query(Booking).filter(
-        Booking.ride_id == booking.ride_id,
-        Booking.status.in_([BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value])
-    ).all()
-    
-    seats_taken = sum(b.seats_booked for b in existing_bookings)
-    seats_available = ride.available_seats - seats_taken
-    
-    if seats_available < booking.seats_booked:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"No hay suficientes asientos disponibles. Disponibles: {seats_available}, Solicitados: {booking.seats_booked}"
-        )
-    
-    # Verificar que no existe una reserva pendiente/confirmada del mismo usuario
+    # Verificar que no existe una reserva activa del mismo usuario
     existing_booking = db.query(Booking).filter(
         Booking.ride_id == booking.ride_id,
         Booking.passenger_id == current_user.id,
-        Booking.status.in_([BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value])
+        Booking.status.in_(SEAT_HOLDING_STATUSES)
     ).first()
     
     if existing_booking:
@@ -220,7 +216,22 @@ def create_booking(
             detail="Ya tienes una reserva activa para este viaje"
         )
     
-    # Crear la reserva
+    # Reservar asientos: UPDATE atómico sobre rides.seats_taken
+    if not SeatService.reserve(db, ride.id, booking.seats_booked):
+        db.rollback()
+        db.refresh(ride)
+        if ride.status != "active":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El viaje no está activo"
+            )
+        seats_available = max(ride.available_seats - ride.seats_taken, 0)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No hay suficientes asientos disponibles. Disponibles: {seats_available}, Solicitados: {booking.seats_booked}"
+        )
+    
+    # Crear la reserva (misma transacción que la reserva de asientos)
     new_booking = Booking(
         ride_id=booking.ride_id,
         passenger_id=current_user.id,
@@ -231,8 +242,13 @@ def create_booking(
     )
     
     db.add(new_booking)
+    db.flush()
+
+    # MONETIZATION: la preferencia de MercadoPago se crea fuera del request (outbox)
+    PaymentOutboxService.enqueue(db, new_booking)
     db.commit()
     db.refresh(new_booking)
+    workers.wake(OUTBOX_WORKER)
     
     # Lógica de simulación para desarrollo/concurso si MP falla o no se desea usar producción
     # Si se desea forzar pago exitoso para testeo, se puede habilitar aquí
@@ -259,40 +275,46 @@ def create_booking(
         ride.destination_lng
     )
 
-    # MONETIZATION: GENERATE MERCADOPAGO PREFERENCE
-    # ---------------------------------------------------------
-    try:
-        from app.services.payment_service import PaymentService
-        payment_service = PaymentService()
-        
-        # Split name helper
-        name_parts = current_user.name.split(" ", 1) if current_user.name else ["Pasajero", "YoViajo"]
-        p_name = name_parts[0]
-        p_surname = name_parts[1] if len(name_parts) > 1 else "Usuario"
-        
-        preference = payment_service.create_preference(
-            booking_id=new_booking.id,
-            title=f"Reserva de Viaje: {ride.origin} -> {ride.destination}",
-            price=new_booking.fee_amount, # Fixed Fee (5000)
-            payer_email=current_user.email,
-            payer_name=p_name,
-            payer_surname=p_surname,
-            payer_dni=current_user.dni
-        )
-        
-        if preference:
-            booking_dict['payment_init_point'] = preference['init_point']
-            logger.info(f"MP Preference created for booking {new_booking.id}: {preference['init_point']}")
-        else:
-            logger.error(f"Failed to create MP Preference for booking {new_booking.id}")
-            
-    except Exception as e:
-        logger.error(f"Payment Integration Error: {e}")
-        # No fallamos la reserva, pero el usuario no tendrá link de pago (deberá reintentar)
+    # El link de pago llega por GET /api/bookings/{id}/payment
+    booking_dict['payment_preference_status'] = "pending"
 
     return booking_dict
 
 
+@router.get("/{booking_id}/payment", response_model=PaymentPreferenceResponse)
+async def get_booking_payment(
+    booking_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    sync_db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Estado del link de pago (preferencia de MercadoPago) de una reserva.
+    El frontend lo consulta después de reservar hasta que `status` sea 'ready'.
+    """
+    booking = await db.get(Booking, booking_id)
+    if not booking:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reserva no encontrada")
+    if booking.passenger_id != current_user.id and current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
+
+    preference = await db.scalar(select(PaymentPreference).filter(PaymentPreference.booking_id == booking_id))
+    if preference is not None and preference.status == "pending" and not workers.is_running(OUTBOX_WORKER):
+        # Sin worker en este proceso: el outbox se procesa en el momento (sync, en el threadpool)
+        preference = await run_in_threadpool(PaymentOutboxService.status, sync_db, booking_id)
+    if preference is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="La reserva no tiene un pago pendiente")
+
+    return {
+        "booking_id": booking_id,
+        "status": preference.status,
+        "payment_status": booking.payment_status,
+        "init_point": preference.init_point,
+        "sandbox_init_point": preference.sandbox_init_point,
+        "attempts": preference.attempts,
+    }
+
+
 @router.patch("/{booking_id}", response_model=BookingResponse)
 def update_booking(
     booking_id: int,
@@ -308,7 +330,8 @@ def update_booking(
     - Solo el pasajero puede cancelar su reserva
     - Solo el conductor puede confirmar/cancelar reservas de su viaje
     """
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    # Fila bloqueada hasta el commit: el barrido de vencidas o un pago no la cambian en el medio
+    booking = db.query(Booking).filter(Booking.id == booking_id).populate_existing().with_for_update().first()
     if not booking:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -356,20 +379,29 @@ def update_booking(
                 utils.apply_reputation_penalty(current_user, 20)
                 penalty_applied = True
         
-        booking.status = booking_update.status
+        # Cambiar el estado y liberar u ocupar asientos según el nuevo
+        try:
+            seats_ok = SeatService.change_status(db, booking, booking_update.status)
+        except BookingStatusChanged:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="La reserva cambió de estado mientras se actualizaba. Volvé a intentar."
+            )
+        if not seats_ok:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No hay suficientes asientos disponibles para reactivar la reserva"
+            )
     
     if booking_update.seats_booked is not None:
         # Validar asientos disponibles si se cambia la cantidad
         if booking_update.seats_booked != booking.seats_booked:
-            existing_bookings = db.query(Booking).filter(
-                Booking.ride_id == booking.ride_id,
-                Booking.id != booking_id,
-                Booking.status.in_([BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value])
-            ).all()
-            seats_taken = sum(b.seats_booked for b in existing_bookings)
-            seats_available = booking.ride.available_seats - seats_taken
-            
-            if seats_available < booking_update.seats_booked:
+            if SeatService.holds_seats(booking.status) and not SeatService.resize(db, booking, booking_update.seats_booked):
+                db.rollback()
+                db.refresh(booking.ride)
+                seats_available = max(booking.ride.available_seats - booking.ride.seats_taken, 0)
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"No hay suficientes asientos disponibles. Disponibles: {seats_available}"
@@ -379,6 +411,8 @@ def update_booking(
     booking.updated_at = datetime.utcnow()
     
     db.commit()
+    if 'penalty_applied' in locals() and penalty_applied:
+        invalidate_principal(current_user.id)
     db.refresh(booking)
     
     # AUDIT LOG
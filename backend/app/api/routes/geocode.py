@@ -1,64 +1,64 @@
 """
 Rutas de geocoding (conversión de direcciones a coordenadas).
+Las consultas a Nominatim pasan por la caché de GeocodeService.
+Son async: esperar a Nominatim no ocupa un thread del pool.
 """
-from fastapi import APIRouter, HTTPException
-import requests
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import get_db
+from app.services.geocode_service import GeocodeService, GeocodeError
 
 router = APIRouter(prefix="/api/geocode", tags=["geocoding"])
 
 
 @router.get("/geocode")
-def geocode_address(address: str):
+async def geocode_address(address: str, db: Session = Depends(get_db)):
     """
     Convierte una dirección en coordenadas (lat/lng).
     Usa OpenStreetMap Nominatim (gratuito, sin API key).
     """
     try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            "q": address,
-            "format": "json",
-            "limit": 1,
-            "addressdetails": 1
-        }
-        headers = {
-            "User-Agent": "YoViajo-App/1.0"
-        }
-        response = requests.get(url, params=params, headers=headers, timeout=5)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data and len(data) > 0:
-                result = data[0]
-                return {
-                    "address": address,
-                    "lat": float(result.get("lat", 0)),
-                    "lng": float(result.get("lon", 0)),
-                    "display_name": result.get("display_name", address)
-                }
-            else:
-                 raise HTTPException(status_code=404, detail="No se encontró la dirección")
+        data = await GeocodeService.search(db, address)
+        if data and len(data) > 0:
+            result = data[0]
+            return {
+                "address": address,
+                "lat": float(result.get("lat", 0)),
+                "lng": float(result.get("lon", 0)),
+                "display_name": result.get("display_name", address)
+            }
         else:
-             raise HTTPException(status_code=502, detail="Error al consultar el servicio de geocoding")
+             raise HTTPException(status_code=404, detail="No se encontró la dirección")
     except HTTPException:
         raise
+    except GeocodeError:
+         raise HTTPException(status_code=502, detail="Error al consultar el servicio de geocoding")
     except Exception as e:
          raise HTTPException(status_code=500, detail=str(e))
 
 
 
 from app import utils
+from app.utils.gazetteer import gazetteer
+
+AUTOCOMPLETE_LIMIT = 5
 
 @router.get("/autocomplete")
-def autocomplete_city(q: str):
+async def autocomplete_city(q: str, db: Session = Depends(get_db)):
     """
     Busca ciudades en Argentina para autocompletado.
     Retorna una lista simplificada para el frontend.
+    Primero consulta el gazetteer local; Nominatim solo si no hay resultados.
     """
     if len(q) < 3:
         return []
+
+    local_results = gazetteer.search(q, limit=AUTOCOMPLETE_LIMIT)
+    if local_results:
+        return local_results
     
-    results = utils.search_nominatim_cities(q)
+    results = await utils.search_nominatim_cities(q, limit=AUTOCOMPLETE_LIMIT, db=db)
     formatted_results = []
     
     for r in results:
@@ -74,30 +74,35 @@ def autocomplete_city(q: str):
     return formatted_results
 
 @router.get("/reverse")
-def reverse_geocode(lat: float, lng: float):
+async def reverse_geocode(lat: float, lng: float, db: Session = Depends(get_db)):
     """
     Obtiene la dirección a partir de coordenadas (lat, lng).
+    Si hay una localidad conocida a menos de REVERSE_GEOCODE_MAX_KM se
+    responde con ella sin salir del proceso; si no, se consulta a Nominatim.
     """
+    local = gazetteer.nearest(lat, lng)
+    if local is not None and local[1] <= settings.REVERSE_GEOCODE_MAX_KM:
+        entry, distance = local
+        city, _, province = entry["label"].partition(", ")
+        return {
+            "display_name": entry["label"],
+            "address": {"city": city, "state": province or None, "country": "Argentina"},
+            "lat": lat,
+            "lng": lng,
+            "source": "gazetteer",
+            "distance_km": round(distance, 2)
+        }
+
     try:
-        url = "https://nominatim.openstreetmap.org/reverse"
-        params = {
+        data = await GeocodeService.reverse(db, lat, lng)
+        return {
+            "display_name": data.get("display_name", "Ubicación seleccionada"),
+            "address": data.get("address", {}),
             "lat": lat,
-            "lon": lng,
-            "format": "json",
-            "addressdetails": 1
+            "lng": lng,
+            "source": "nominatim"
         }
-        headers = { "User-Agent": "YoViajo-App/1.0" }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "display_name": data.get("display_name", "Ubicación seleccionada"),
-                "address": data.get("address", {}),
-                "lat": lat,
-                "lng": lng
-            }
-        else:
-            raise HTTPException(status_code=502, detail="Error en servicio de geocoding")
+    except GeocodeError:
+        raise HTTPException(status_code=502, detail="Error en servicio de geocoding")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,18 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Any
-from app.database import get_db
+from app.database import get_db, get_async_db
 from app.models.user import User
 from app.api.deps import get_current_user
-from app.utils.matching import find_matches_for_ride, find_matches_for_request
+from app.services.match_service import MatchService
 from app.models.ride import Ride, RideRequest
 from app.schemas.user import UserResponse
+from app.utils.dates import utcnow, local_midnight_utc
 
 router = APIRouter(prefix="/api/matches", tags=["matches"])
 
 @router.get("", response_model=List[dict]) 
-def get_my_matches(
-    db: Session = Depends(get_db),
+async def get_my_matches(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -23,74 +26,70 @@ def get_my_matches(
     """
     matches_result = []
     
-    from datetime import datetime
-    now = datetime.now()
-
-    today_str = now.strftime("%Y-%m-%d")
-    now_iso = now.strftime("%Y-%m-%dT%H:%M")
-
     if current_user.role == 'C': # Conductor
         # 1. Obtener mis viajes activos y FUTUROS
-        my_rides = db.query(Ride).filter(
+        my_rides = (await db.scalars(select(Ride).filter(
             Ride.driver_id == current_user.id, 
             Ride.status == 'active',
-            Ride.departure_time >= now_iso # Filter expired rides (String comparison)
-        ).all()
+            Ride.departure_at >= utcnow() # Filter expired rides (indexed timestamp)
+        ))).all()
         
-        for ride in my_rides:
-            # Buscar Requests que encajen
-            candidates = find_matches_for_ride(ride, db)
-            for req in candidates:
-                passenger = req.passenger
-                matches_result.append({
-                    "type": "PASSENGER_FOUND",
-                    "match_score": 95, # Mock score por ahora
-                    "ride_id": ride.id,
-                    "request_id": req.id,
-                    "candidate_user": {
-                        "id": passenger.id,
-                        "name": passenger.name,
-                        "age": passenger.age, # Property recalculada
-                        "reputation": passenger.reputation_score,
-                        "photo": None # TODO: Avatar url
-                    },
-                    "origin": req.origin,
-                    "destination": req.destination,
-                    "date": req.date,
-                    "price_proposal": req.proposed_price
-                })
+        # Requests que encajen: lectura indexada de la tabla materializada
+        rides_by_id = {ride.id: ride for ride in my_rides}
+        for match in await MatchService.matches_for_rides(db, list(rides_by_id)):
+            ride = rides_by_id[match.ride_id]
+            req = match.request
+            passenger = req.passenger
+            matches_result.append({
+                "type": "PASSENGER_FOUND",
+                "match_score": 95, # Mock score por ahora
+                "ride_id": ride.id,
+                "request_id": req.id,
+                "candidate_user": {
+                    "id": passenger.id,
+                    "name": passenger.name,
+                    "age": passenger.age, # Property recalculada
+                    "reputation": passenger.reputation_score,
+                    "photo": None # TODO: Avatar url
+                },
+                "origin": req.origin,
+                "destination": req.destination,
+                "date": req.date,
+                "price_proposal": req.proposed_price
+            })
                 
     else: # Pasajero
-        # 1. Obtener mis solicitudes activas y FUTURAS
-        today_str = now.strftime("%Y-%m-%d")
-        my_requests = db.query(RideRequest).filter(
+        # 1. Obtener mis solicitudes activas y FUTURAS (de hoy en adelante)
+        # Las solicitudes sin ventana horaria válida nunca generan coincidencias.
+        my_requests = (await db.scalars(select(RideRequest).filter(
             RideRequest.passenger_id == current_user.id,
-            RideRequest.date >= today_str # Filter expired requests
-        ).all()
+            RideRequest.window_end_at >= local_midnight_utc() # Filter expired requests
+        ))).all()
         
-        for req in my_requests:
-            candidates = find_matches_for_request(req, db)
-            for ride in candidates:
-                driver = ride.driver
-                matches_result.append({
-                    "type": "RIDE_FOUND",
-                    "match_score": 95,
-                    "request_id": req.id,
-                    "ride_id": ride.id,
-                    "candidate_user": {
-                        "id": driver.id,
-                        "name": driver.name,
-                        "age": driver.age,
-                        "reputation": driver.reputation_score,
-                        "photo": None
-                    },
-                    "origin": ride.origin,
-                    "destination": ride.destination,
-                    "date": ride.departure_time, # ISO String
-                    "price": ride.price,
-                    "car_model": driver.car_model,
-                    "car_color": driver.car_color
-                })
+        requests_by_id = {req.id: req for req in my_requests}
+        for match in await MatchService.matches_for_requests(db, list(requests_by_id)):
+            req = requests_by_id[match.request_id]
+            ride = match.ride
+            driver = ride.driver
+            matches_result.append({
+                "type": "RIDE_FOUND",
+                "match_score": 95,
+                "request_id": req.id,
+                "ride_id": ride.id,
+                "candidate_user": {
+                    "id": driver.id,
+                    "name": driver.name,
+                    "age": driver.age,
+                    "reputation": driver.reputation_score,
+                    "photo": None
+                },
+                "origin": ride.origin,
+                "destination": ride.destination,
+                "date": ride.departure_time, # ISO String
+                "price": ride.price,
+                "car_model": driver.car_model,
+                "car_color": driver.car_color
+            })
     
     return matches_result
 
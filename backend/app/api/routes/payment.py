@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db, get_async_db
 from app.api.deps import get_current_user
 from app.models.user import User
-from app.models.booking import Booking, BookingStatus
-from app.models.payment import Payment
+from app.models.booking import Booking
+from app.models.payment import Payment, PaymentSyncState
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -15,122 +16,83 @@ class PaymentRequest(BaseModel):
 
 
 from app.services.payment_service import PaymentService
+from app.services.seat_service import SeatService
+from app.services.payment_webhook_service import PaymentWebhookService, WORKER_NAME as WEBHOOK_WORKER
+from app.services.payment_reconciliation_service import PaymentReconciliationService, WORKER_NAME as RECONCILE_WORKER, SOURCE as RECONCILE_SOURCE
+from app.core import workers
 from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
 
 @router.post("/check/{booking_id}")
-def check_payment_status(
+async def check_payment_status(
     booking_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    sync_db: Session = Depends(get_db)
 ):
     """
-    Busca activamente si existe un pago aprobado para esta reserva.
-    Útil si el webhook falla o tarda.
+    Estado del pago de una reserva según la base local.
+    Los pagos aprobados los trae la conciliación masiva (worker
+    "payment_reconciliation") y el webhook; `synced_until` indica hasta
+    cuándo está conciliada la base.
     """
-    # 1. Verificar Booking existente
-    booking = db.query(Booking).filter(Booking.id == booking_id).first()
+    booking = await db.get(Booking, booking_id)
     if not booking:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
-        
-    if booking.payment_status == "paid":
-        return {"status": "paid", "message": "La reserva ya está pagada."}
 
-    # 2. Consultar a Mercado Pago
-    service = PaymentService()
-    payment_data = service.search_payment_by_reference(str(booking_id))
-    
-    if payment_data and payment_data.get("status") == "approved":
-        print(f"✅ Active Check: Payment Found for Booking {booking_id}")
-        
-        # 3. Actualizar Booking
-        booking.payment_status = "paid"
-        booking.status = BookingStatus.CONFIRMED.value
-        booking.updated_at = datetime.utcnow()
-        
-        # 4. Crear Registro de Pago si no existe
-        existing_payment = db.query(Payment).filter(Payment.booking_id == booking.id).first()
-        
-        if not existing_payment:
-            new_payment = Payment(
-                booking_id=booking.id,
-                external_id=str(payment_data.get("id")),
-                status="approved",
-                amount=payment_data.get("transaction_amount", 0.0),
-                currency=payment_data.get("currency_id", "ARS"),
-                payment_url=None,
-                created_at=datetime.utcnow()
-            )
-            db.add(new_payment)
-        
-        db.commit()
-        db.refresh(booking)
-        
-        return {"status": "paid", "message": "Pago verificado y reserva confirmada."}
-    
-    return {"status": booking.payment_status, "message": "No se encontró pago aprobado aún."}
+    freshness = PaymentReconciliationService.state_freshness(await db.get(PaymentSyncState, RECONCILE_SOURCE))
+    if booking.payment_status != "paid" and freshness["stale"] and not workers.is_running(RECONCILE_WORKER):
+        # Sin worker en este proceso (desarrollo, tests): conciliar en el momento (sync, en el threadpool)
+        freshness = await run_in_threadpool(PaymentReconciliationService.reconcile, sync_db)
+        await db.refresh(booking)
 
+    if booking.payment_status == "paid":
+        message = "Pago verificado y reserva confirmada."
+    else:
+        message = "No se encontró pago aprobado aún."
+    return {
+        "status": booking.payment_status,
+        "message": message,
+        "synced_until": freshness["synced_until"],
+        "stale": freshness["stale"],
+    }
 
 
 @router.post("/webhook")
 async def payment_webhook(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    sync_db: Session = Depends(get_db)
 ):
     """
     Webhook para recibir notificaciones de MercadoPago.
+    Solo guarda la notificación y responde; el worker "payment_webhooks"
+    consulta el pago y confirma la reserva (ver PaymentWebhookService).
     """
     try:
         # 1. Obtener parámetros (query o body)
-        # MP suele mandar ?topic=payment&id=123 o type=payment
-        params = request.query_params
-        topic = params.get("topic") or params.get("type")
-        payment_id = params.get("id") or params.get("data.id")
-
-        print(f"🔔 Webhook received: {params}")
-
-        if topic == "payment" and payment_id:
-            # 2. Consultar estado real a MP
-            service = PaymentService()
-            payment_info = service.get_payment_info(payment_id)
-            
-            if payment_info and payment_info.get("status") == "approved":
-                # 3. Identificar la Reserva (external_reference)
-                external_ref = payment_info.get("external_reference")
-                if external_ref:
-                    booking_id = int(external_ref)
-                    booking = db.query(Booking).filter(Booking.id == booking_id).first()
-                    
-                    if booking and booking.payment_status != "paid":
-                        print(f"💰 Payment Approved for Booking {booking_id}")
-                        
-                        # 4. Actualizar Booking
-                        booking.payment_status = "paid"
-                        booking.status = BookingStatus.CONFIRMED.value
-                        booking.updated_at = datetime.utcnow()
-                        
-                        # 5. Crear Registro de Pago (Payment)
-                        # Verificamos si ya existe para evitar duplicados
-                        existing_payment = db.query(Payment).filter(Payment.booking_id == booking.id).first()
-                        
-                        if not existing_payment:
-                            new_payment = Payment(
-                                booking_id=booking.id,
-                                external_id=str(payment_id),
-                                status="approved",
-                                amount=payment_info.get("transaction_amount", 0.0),
-                                currency=payment_info.get("currency_id", "ARS"),
-                                payment_url=None, # Ya se pagó
-                                created_at=datetime.utcnow()
-                            )
-                            db.add(new_payment)
-                            print(f"✅ Payment Record created: {new_payment.id}")
-                        
-                        db.commit()
-                        db.refresh(booking)
-                        
-                        return {"status": "success", "message": "Booking confirmed & Payment recorded"}
-            
-        return {"status": "ignored"}
-
+        # MP suele mandar ?topic=payment&id=123 o type=payment (+ body {"data": {"id": ...}})
+        params = dict(request.query_params)
+        try:
+            body = await request.json()
+        except Exception:
+            body = {}
+        if not isinstance(body, dict):
+            body = {}
+
+        topic = params.get("topic") or params.get("type") or body.get("type") or body.get("topic")
+        payment_id = params.get("id") or params.get("data.id") or (body.get("data") or {}).get("id")
+
+        if topic != "payment" or not payment_id:
+            return {"status": "ignored"}
+
+        # 2. Persistir (dedupe por id de pago) y responder
+        event_id = await PaymentWebhookService.ingest_async(db, topic, str(payment_id), {"params": params, "body": body})
+        if workers.is_running(WEBHOOK_WORKER):
+            workers.wake(WEBHOOK_WORKER)
+        else:
+            # Sin worker en este proceso: procesar en el momento (comportamiento anterior)
+            await run_in_threadpool(PaymentWebhookService.process_batch, sync_db, None, 1, event_id)
+        return {"status": "queued", "event_id": event_id}
 
     except Exception as e:
         print(f"❌ Webhook Error: {e}")
@@ -193,13 +155,14 @@ def simulate_payment(
     SIMULACIÓN DE PAGO: Para demos, presentaciones y MVP sin MP productivo.
     Confirma la reserva y desbloquea los datos de contacto.
     """
-    booking = db.query(Booking).filter(Booking.id == request.booking_id).first()
+    # Bloqueada: el barrido de vencidas no la cambia hasta el commit
+    booking = db.query(Booking).filter(Booking.id == request.booking_id).populate_existing().with_for_update().first()
     if not booking:
         raise HTTPException(status_code=404, detail="Reserva no encontrada")
     
-    # 1. Actualizar estado del pago y de la reserva
+    # 1. Actualizar estado del pago y de la reserva (asientos según el estado bloqueado)
+    SeatService.confirm_paid(db, booking)
     booking.payment_status = "paid"
-    booking.status = BookingStatus.CONFIRMED.value
     booking.updated_at = datetime.utcnow()
     
     # 2. Registrar el pago en la base de datos
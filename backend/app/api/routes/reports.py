@@ -5,7 +5,7 @@ from app.database import get_db
 from app.models.user import User
 from app.models.ride import Ride
 from app.models.booking import Booking, BookingStatus
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, invalidate_principal
 from app import utils
 from datetime import datetime, timedelta
 from pydantic import BaseModel
@@ -101,6 +101,7 @@ def report_user(
     # Podríamos sumar cancellation_count o tener un 'report_count'
     
     db.commit()
+    invalidate_principal(target_user.id)
     
     # 6. Audit Log
     utils.log_audit(db, "USER_REPORTED_NOSHOW", {
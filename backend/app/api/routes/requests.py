@@ -10,6 +10,8 @@ from app.models.ride import RideRequest, Ride
 from app.schemas.request import RequestCreate, RequestResponse
 from app.api.deps import get_current_user
 from app import utils
+from app.utils.matching import request_index
+from app.services.match_service import MatchService
 
 router = APIRouter(prefix="/api/requests", tags=["requests"])
 
@@ -108,6 +110,8 @@ def create_request(
     db.add(new_req)
     db.commit()
     db.refresh(new_req)
+    request_index.add(new_req)
+    MatchService.on_request_created(db, new_req)
     
     # Agregar enlace de Maps a la respuesta
     result = RequestResponse.from_orm(new_req).dict()
@@ -145,6 +149,8 @@ def delete_request(
             detail="No tienes permiso para eliminar esta solicitud"
         )
     
+    MatchService.on_request_deleted(db, request.id)
     db.delete(request)
     db.commit()
+    request_index.remove(request_id)
     return None
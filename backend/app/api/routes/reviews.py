@@ -10,7 +10,7 @@ from app.models.user import User
 from app.models.booking import Booking
 from app.models.review import Review
 from app.models.ride import Ride
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, invalidate_principal
 
 router = APIRouter(
     prefix="/reviews",
@@ -109,6 +109,7 @@ def create_review(
         if reviewee:
             reviewee.reputation_score = new_score
             db.commit()
+            invalidate_principal(reviewee.id)
 
     return {
         "id": new_review.id,
@@ -1,110 +1,261 @@
 """
 Rutas de Viajes (Ofertas de conductores).
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import cast, TIMESTAMP
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, or_, and_, select
+from typing import List, Optional
+from app.database import get_db, get_async_db
 from app.models.user import User
 from app.models.ride import Ride, RideRequest
-from app.schemas.ride import RideCreate, RideResponse
-from app.api.deps import get_current_user
+from app.schemas.ride import RideCreate, RideResponse, RideNearResponse
+from app.api.deps import get_current_user, invalidate_principal
 from app import utils
 from datetime import datetime, timedelta
-from app.models.booking import Booking, BookingStatus
+from app.config import settings
+from app.models.booking import Booking, BookingStatus, SEAT_HOLDING_STATUSES
 from app.services.audit_service import AuditService
+from app.utils.matching import ride_index, bounding_box, haversine_distance
+from app.services.match_service import MatchService
+from app.utils.dates import utcnow
+from app.utils.pagination import encode_cursor, decode_cursor
 
 router = APIRouter(prefix="/api/rides", tags=["rides"])
 
+# Radio máximo (km) para la búsqueda por cercanía
+MAX_SEARCH_RADIUS_KM = 200
+
+
+def active_bookings_count(db: Session, ride_ids: List[int]) -> dict:
+    """
+    {ride_id: reservas que ocupan asiento} para varios viajes en una sola consulta
+    (GROUP BY ride_id), en lugar de recorrer `ride.bookings` viaje por viaje.
+    """
+    if not ride_ids:
+        return {}
+    rows = db.query(Booking.ride_id, func.count(Booking.id)).filter(
+        Booking.ride_id.in_(ride_ids),
+        Booking.status.in_(SEAT_HOLDING_STATUSES)
+    ).group_by(Booking.ride_id).all()
+    return {ride_id: count for ride_id, count in rows}
+
+
+def _public_rides_query():
+    """
+    SELECT base del buscador público: filas (Ride, reservas activas) con el
+    conductor cargado en el mismo SELECT (la sesión async no hace lazy load).
+    """
+    # Reservas activas por viaje, agregadas en un subquery (sin cargar ride.bookings)
+    bookings_sq = select(
+        Booking.ride_id.label("ride_id"),
+        func.count(Booking.id).label("bookings_count")
+    ).filter(
+        Booking.status.in_(SEAT_HOLDING_STATUSES)
+    ).group_by(Booking.ride_id).subquery()
+
+    return select(Ride, func.coalesce(bookings_sq.c.bookings_count, 0)).outerjoin(
+        bookings_sq, bookings_sq.c.ride_id == Ride.id
+    ).options(joinedload(Ride.driver))
+
+
+def _apply_search_filters(query, current_user: User, women_only: bool, allow_pets: bool, allow_smoking: bool):
+    """
+    Filtros de confianza + solo viajes futuros. Retorna None si la búsqueda
+    no puede devolver nada (hombre pidiendo 'Solo Mujeres').
+    """
+    # 1. Filtros básicos
+    if allow_pets:
+        query = query.filter(Ride.allow_pets == True)
+    if allow_smoking:
+        query = query.filter(Ride.allow_smoking == True)
+
+    # 2. Women Only Logic (Bidirectional Safe Space)
+    
+        # A) Safety Rule: Hombres NUNCA ven viajes marcados como 'women_only'
+    if current_user.gender == 'M':
+         query = query.filter(Ride.women_only == False)
+         # Si un hombre intenta forzar el filtro, lo ignoramos o retornamos vacío
+         if women_only:
+             return None
+
+    # B) Search Filter: Pasajera busca "Solo Conductoras" o Viajes Seguros
+    if women_only:
+        if current_user.gender != 'F':
+            # Protección extra: Solo mujeres pueden activar este filtro activamente
+             raise HTTPException(status_code=400, detail="El filtro 'Solo Mujeres' es exclusivo para usuarias.")
+        
+        # Filtrar: 
+        # 1. Viajes marcados como women_only=True (Exclusivos)
+        # OR
+        # 2. Viajes donde la conductora es Mujer (aunque sea abierto)
+        # La consigna dice: "viajar solo con un conductor mujer".
+        # Así que filtramos por género del conductor.
+        query = query.join(User, Ride.driver_id == User.id).filter(User.gender == 'F')
+
+    # C) Time Filter: Solo viajes FUTUROS para el buscador público
+    # departure_at es la columna tipada (UTC) e indexada
+    return query.filter(Ride.departure_at >= utcnow())
+
+
+def _public_ride_dict(ride: Ride, bookings_count: int) -> dict:
+    """Viaje + datos del conductor, tal como lo muestra el buscador."""
+    ride_dict = RideResponse.model_validate(ride).model_dump()
+    ride_dict['maps_url'] = utils.generate_google_maps_url(
+        ride.origin,
+        ride.destination,
+        ride.origin_lat,
+        ride.origin_lng,
+        ride.destination_lat,
+        ride.destination_lng
+
+    )
+    # Reservas activas (calculadas en el subquery)
+    ride_dict['bookings_count'] = bookings_count
+    
+    # Driver Info Inclusion
+    if ride.driver:
+        ride_dict['driver_name'] = ride.driver.name
+        ride_dict['driver_verified'] = ride.driver.is_verified
+        ride_dict['driver_photo'] = ride.driver.profile_picture
+        ride_dict['driver_phone'] = ride.driver.phone
+        ride_dict['car_model'] = ride.driver.car_model
+        ride_dict['car_color'] = ride.driver.car_color
+    return ride_dict
+
 
 @router.get("", response_model=List[RideResponse])
-def get_rides(
+async def get_rides(
+    response: Response,
     women_only: bool = False,
     allow_pets: bool = False,
     allow_smoking: bool = False,
-    db: Session = Depends(get_db),
+    origin: Optional[str] = None,
+    destination: Optional[str] = None,
+    date: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}-\d{2}$"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.RIDES_PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user) # Now we need user to filter women_only safety
 ):
     """
-    Obtener todas las ofertas de viajes activas.
-    Soporta filtros por atributos de confianza.
+    Obtener las ofertas de viajes futuras, ordenadas por salida.
+    Soporta filtros por atributos de confianza y por texto de origen /
+    destino y fecha (YYYY-MM-DD), aplicados antes de paginar.
+
+    Paginado por cursor (keyset sobre departure_at, id): si hay más resultados,
+    la respuesta trae el header `X-Next-Cursor` para pedir la página siguiente
+    con `?cursor=...`. El tamaño de página es `limit` o `RIDES_PAGE_SIZE`.
     """
     try:
-        query = db.query(Ride)
-        
-        # 1. Filtros básicos
-        if allow_pets:
-            query = query.filter(Ride.allow_pets == True)
-        if allow_smoking:
-            query = query.filter(Ride.allow_smoking == True)
+        page_size = limit or settings.RIDES_PAGE_SIZE
 
-        # 2. Women Only Logic (Bidirectional Safe Space)
-        
-            # A) Safety Rule: Hombres NUNCA ven viajes marcados como 'women_only'
-        if current_user.gender == 'M':
-             query = query.filter(Ride.women_only == False)
-             # Si un hombre intenta forzar el filtro, lo ignoramos o retornamos vacío
-             if women_only:
-                 return []
-
-        # B) Search Filter: Pasajera busca "Solo Conductoras" o Viajes Seguros
-        if women_only:
-            if current_user.gender != 'F':
-                # Protección extra: Solo mujeres pueden activar este filtro activamente
-                 raise HTTPException(status_code=400, detail="El filtro 'Solo Mujeres' es exclusivo para usuarias.")
-            
-            # Filtrar: 
-            # 1. Viajes marcados como women_only=True (Exclusivos)
-            # OR
-            # 2. Viajes donde la conductora es Mujer (aunque sea abierto)
-            # La consigna dice: "viajar solo con un conductor mujer".
-            # Así que filtramos por género del conductor.
-            query = query.join(User, Ride.driver_id == User.id).filter(User.gender == 'F')
-
-        # C) Time Filter: Solo viajes FUTUROS para el buscador público
-        # Usamos datetime.utcnow() para evitar problemas de timezone naive
-        # CAST column to TIMESTAMP to avoid 'operator does not exist: character varying >= timestamp' error
-        query = query.filter(cast(Ride.departure_time, TIMESTAMP) >= datetime.now())
-
-        rides = query.all()
+        query = _apply_search_filters(_public_rides_query(), current_user, women_only, allow_pets, allow_smoking)
+        if query is None:
+            return []
+        if origin:
+            query = query.filter(Ride.origin.icontains(origin.strip(), autoescape=True))
+        if destination:
+            query = query.filter(Ride.destination.icontains(destination.strip(), autoescape=True))
+        if date:
+            query = query.filter(Ride.departure_time.startswith(date))
+
+        # Keyset: seguir después del último viaje de la página anterior
+        if cursor:
+            after_departure, after_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Ride.departure_at > after_departure,
+                and_(Ride.departure_at == after_departure, Ride.id > after_id)
+            ))
+
+        # Una fila de más para saber si hay página siguiente
+        rows = (await db.execute(query.order_by(Ride.departure_at, Ride.id).limit(page_size + 1))).all()
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last_ride = rows[-1][0]
+            response.headers["X-Next-Cursor"] = encode_cursor(last_ride.departure_at, last_ride.id)
         
         result = []
-        for ride in rides:
+        for ride, bookings_count in rows:
             try:
-                ride_dict = RideResponse.from_orm(ride).dict()
-                ride_dict['maps_url'] = utils.generate_google_maps_url(
-                    ride.origin,
-                    ride.destination,
-                    ride.origin_lat,
-                    ride.origin_lng,
-                    ride.destination_lat,
-                    ride.destination_lng
-
-                )
-                # Calcular reservas activas
-                # Calcular reservas activas
-                active_bookings = [b for b in ride.bookings if b.status != BookingStatus.CANCELLED.value]
-                ride_dict['bookings_count'] = len(active_bookings)
-                
-                # Driver Info Inclusion
-                if ride.driver:
-                    ride_dict['driver_name'] = ride.driver.name
-                    ride_dict['driver_verified'] = ride.driver.is_verified
-                    ride_dict['driver_photo'] = ride.driver.profile_picture
-                    ride_dict['driver_phone'] = ride.driver.phone
-                    ride_dict['car_model'] = ride.driver.car_model
-                    ride_dict['car_color'] = ride.driver.car_color
-                    
-                result.append(ride_dict)
+                result.append(_public_ride_dict(ride, bookings_count))
             except Exception as e:
                 print(f"Skipping corrupt ride {ride.id}: {e}")
                 continue
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"CRITICAL ERROR in get_rides: {e}")
         raise HTTPException(status_code=500, detail=f"Debug Error: {str(e)}")
 
+
+@router.get("/near", response_model=List[RideNearResponse])
+async def get_rides_near(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(20, gt=0, le=MAX_SEARCH_RADIUS_KM),
+    dest_lat: Optional[float] = Query(None, ge=-90, le=90),
+    dest_lng: Optional[float] = Query(None, ge=-180, le=180),
+    women_only: bool = False,
+    allow_pets: bool = False,
+    allow_smoking: bool = False,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=settings.RIDES_PAGE_SIZE_MAX),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Viajes futuros que salen a menos de `radius_km` de (lat, lng), ordenados
+    por distancia. Con `dest_lat`/`dest_lng` el destino también tiene que
+    quedar dentro del radio (mismo criterio que el matching).
+
+    El SQL solo filtra por la caja (lat/lng indexados) que contiene el
+    círculo; la distancia exacta (haversine) se calcula acá.
+    """
+    if (dest_lat is None) != (dest_lng is None):
+        raise HTTPException(status_code=400, detail="Indicá dest_lat y dest_lng juntos")
+
+    query = _apply_search_filters(_public_rides_query(), current_user, women_only, allow_pets, allow_smoking)
+    if query is None:
+        return []
+
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    query = query.filter(
+        Ride.origin_lat.between(min_lat, max_lat),
+        Ride.origin_lng.between(min_lng, max_lng)
+    )
+    if dest_lat is not None:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(dest_lat, dest_lng, radius_km)
+        query = query.filter(
+            Ride.destination_lat.between(min_lat, max_lat),
+            Ride.destination_lng.between(min_lng, max_lng)
+        )
+
+    nearby = []
+    for ride, bookings_count in (await db.execute(query)).all():
+        distance = haversine_distance(lat, lng, ride.origin_lat, ride.origin_lng)
+        if distance > radius_km:
+            continue
+        dest_distance = None
+        if dest_lat is not None:
+            dest_distance = haversine_distance(dest_lat, dest_lng, ride.destination_lat, ride.destination_lng)
+            if dest_distance > radius_km:
+                continue
+        nearby.append((distance, dest_distance, ride, bookings_count))
+
+    # Orden estable: distancia, luego salida e id
+    nearby.sort(key=lambda item: (item[0], item[2].departure_at, item[2].id))
+    page = nearby[skip:skip + (limit or settings.RIDES_PAGE_SIZE)]
+
+    result = []
+    for distance, dest_distance, ride, bookings_count in page:
+        ride_dict = _public_ride_dict(ride, bookings_count)
+        ride_dict['distance_km'] = round(distance, 2)
+        ride_dict['dest_distance_km'] = round(dest_distance, 2) if dest_distance is not None else None
+        result.append(ride_dict)
+    return result
+
 @router.post("", response_model=RideResponse, status_code=201)
 def create_ride(
     ride: RideCreate, 
@@ -143,6 +294,8 @@ def create_ride(
         db.add(new_ride)
         db.commit()
         db.refresh(new_ride)
+        ride_index.add(new_ride)
+        MatchService.on_ride_created(db, new_ride)
         
         # AUDIT LOG
         AuditService.log(db, "RIDE_CREATED", user_id=current_user.id, details={"ride_id": new_ride.id, "origin": new_ride.origin, "women_only": new_ride.women_only})
@@ -193,12 +346,14 @@ def cancel_ride(
     # Cancelar el viaje
     ride.status = "cancelled"
     
-    # Cancelar todas las reservas asociadas
-    bookings = db.query(Booking).filter(Booking.ride_id == ride.id, Booking.status != BookingStatus.CANCELLED.value).all()
+    # Cancelar todas las reservas asociadas (las vencidas o ya canceladas no ocupan asiento)
+    bookings = db.query(Booking).filter(Booking.ride_id == ride.id, Booking.status.in_(SEAT_HOLDING_STATUSES)).all()
     count_affected = 0
     for booking in bookings:
         booking.status = BookingStatus.CANCELLED.value
         count_affected += 1
+    # Sin reservas activas no queda ningún asiento ocupado
+    ride.seats_taken = 0
         
     # Verificar ventana de tiempo para penalización
     # Convertir string ISO a datetime si es necesario
@@ -221,7 +376,11 @@ def cancel_ride(
         new_reputation = utils.apply_reputation_penalty(current_user, 20)
         penalty_applied = True
         
+    MatchService.on_ride_closed(db, ride.id)
     db.commit()
+    ride_index.remove(ride.id)
+    if penalty_applied:
+        invalidate_principal(current_user.id)
     
     # AUDIT LOG
     # AUDIT LOG
@@ -260,16 +419,25 @@ def get_my_rides(
     """
     try:
         # Mostrar viajes futuros o recientes (últimas 24hs) vs Historial
-        limit_date = datetime.now() - timedelta(hours=24)
+        limit_date = utcnow() - timedelta(hours=24)
         
         query = db.query(Ride).filter(Ride.driver_id == current_user.id)
         
         if history:
             # Historial: Viajes antiguos
-            rides = query.filter(cast(Ride.departure_time, TIMESTAMP) < limit_date).order_by(Ride.departure_time.desc()).all()
+            rides = query.filter(Ride.departure_at < limit_date).order_by(Ride.departure_at.desc()).all()
         else:
             # Activos: Futuros o recientes
-            rides = query.filter(cast(Ride.departure_time, TIMESTAMP) >= limit_date).order_by(Ride.departure_time.asc()).all()
+            rides = query.filter(Ride.departure_at >= limit_date).order_by(Ride.departure_at.asc()).all()
+
+        ride_ids = [ride.id for ride in rides]
+
+        # Reservas activas de todos los viajes en una consulta agrupada
+        bookings_count = active_bookings_count(db, ride_ids)
+
+        # Coincidencias REALES (Smart Matching), leídas de la tabla materializada
+        # Esto asegura que el badge rojo coincida con la lista despliegue
+        matches_count = MatchService.counts_for_rides(db, ride_ids)
 
         result = []
         for ride in rides:
@@ -284,15 +452,8 @@ def get_my_rides(
                     ride.destination_lng
                 )
 
-                # Calcular reservas activas
-                active_bookings = [b for b in ride.bookings if b.status != BookingStatus.CANCELLED.value]
-                ride_dict['bookings_count'] = len(active_bookings)
-                
-                # Calcular coincidencias REALES (Smart Matching)
-                # Esto asegura que el badge rojo coincida con la lista despliegue
-                from app.utils.matching import find_matches_for_ride
-                candidates = find_matches_for_ride(ride, db)
-                ride_dict['matches_count'] = len(candidates)
+                ride_dict['bookings_count'] = bookings_count.get(ride.id, 0)
+                ride_dict['matches_count'] = matches_count.get(ride.id, 0)
 
                 result.append(ride_dict)
             except Exception as e:
@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserResponse, UserUpdate
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, invalidate_principal
 from app import utils
 from app.services.image_service import ImageService
 
@@ -39,6 +39,7 @@ def update_my_profile(
         setattr(current_user, key, value)
         
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(current_user)
     
     # AUDIT LOG
@@ -82,6 +83,7 @@ def verify_identity(
     current_user.verification_status = 'pending'
     
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(current_user)
     
     # 4. Audit Log
@@ -124,6 +126,7 @@ def upload_profile_photo(
     # Actualizar DB
     current_user.profile_picture = url
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(current_user)
     
     
@@ -163,6 +166,7 @@ def upload_driver_license(
         current_user.verification_status = 'pending'
 
     db.commit()
+    invalidate_principal(current_user.id)
     db.refresh(current_user)
     
     # Audit
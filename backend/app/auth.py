@@ -1,33 +1,28 @@
 """
 Utilidades de autenticación: hashing de contraseñas y tokens JWT.
 """
-import bcrypt
 from jose import jwt
 from datetime import datetime, timedelta
 from app.config import settings
+from app.core.password_hasher import password_hasher
 
 # pwd_context removed because passlib is broken on this env
+# bcrypt corre en el pool de app.core.password_hasher (lanza HasherBusy si está saturado)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica una contraseña contra su hash."""
-    # Convertir a bytes para bcrypt
-    if isinstance(plain_password, str):
-        plain_password = plain_password.encode('utf-8')
-    if isinstance(hashed_password, str):
-        hashed_password = hashed_password.encode('utf-8')
-    
-    return bcrypt.checkpw(plain_password, hashed_password)
+    return password_hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Genera el hash de una contraseña."""
-    if isinstance(password, str):
-        password = password.encode('utf-8')
-    
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password, salt)
-    return hashed.decode('utf-8')
+    """Genera el hash de una contraseña (con PASSWORD_HASH_ROUNDS)."""
+    return password_hasher.hash(password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True si el hash se hizo con un costo distinto del configurado."""
+    return password_hasher.needs_rehash(hashed_password)
 
 
 def create_access_token(data: dict) -> str:
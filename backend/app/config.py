@@ -23,12 +23,76 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite:///./yoviajo.db"
+    # Pool de conexiones (ver app.core.db_pool). Vale por motor y por worker:
+    # hay dos motores (sync y async), así que cada worker de uvicorn puede
+    # abrir hasta 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW) conexiones.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0  # Espera máxima por una conexión libre
+    DB_POOL_PRE_PING: bool = True  # Descarta conexiones que Postgres cerró por inactividad
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # 0 = nunca
+    # SQLite (modo local)
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
     
     # Security
     SECRET_KEY: str = "fallback_secret_key_for_demo_only_12345" 
     
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080 # 7 días
+    # Caché del usuario autenticado (get_current_user). Un cambio hecho en otro
+    # proceso (o un bloqueo) tarda a lo sumo el TTL en verse.
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 10000
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 30
+    # bcrypt: costo (los hashes con otro costo se rehacen en el próximo login)
+    # y pool propio, para que una ráfaga de logins no se coma toda la CPU.
+    # Con la cola llena se responde 503 en el acto (workers + cola <= 10)
+    PASSWORD_HASH_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_MAX: int = 8
+
+    # Paginación del buscador público de viajes (GET /api/rides)
+    RIDES_PAGE_SIZE: int = 50
+    RIDES_PAGE_SIZE_MAX: int = 200
+
+    # Tareas en segundo plano (barrido de reservas, etc.). Los tests las apagan.
+    BACKGROUND_WORKERS_ENABLED: bool = True
+
+    # Auditoría: cola en memoria + INSERT en bloque (ver app.core.audit_writer)
+    AUDIT_QUEUE_MAX: int = 10000
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_INTERVAL_MS: int = 500
+    AUDIT_QUEUE_POLICY: str = "block"  # block (espera AUDIT_ENQUEUE_TIMEOUT_MS y descarta) | drop
+    AUDIT_ENQUEUE_TIMEOUT_MS: int = 50
+    # Retención: los meses completos más viejos que esto se archivan (JSONL gzip) y se borran
+    AUDIT_RETENTION_DAYS: int = 180
+    AUDIT_ARCHIVE_DIR: str = "./audit_archive"
+    AUDIT_RETENTION_INTERVAL_SECONDS: int = 24 * 3600
+    AUDIT_ADMIN_PAGE_SIZE_MAX: int = 500
+
+    # Reservas sin pagar: se vencen después de esta ventana y liberan sus asientos
+    BOOKING_PAYMENT_HOLD_MINUTES: int = 30
+    BOOKING_SWEEP_INTERVAL_SECONDS: int = 60
+    BOOKING_SWEEP_BATCH_SIZE: int = 200
+
+    # Geocoding (Nominatim): caché en memoria + tabla geocode_cache
+    GEOCODE_CACHE_SIZE: int = 2048
+    GEOCODE_CACHE_TTL_SECONDS: int = 6 * 3600
+    GEOCODE_DB_TTL_DAYS: int = 30
+    GEOCODE_REVERSE_DECIMALS: int = 4  # ~11 m: clave de caché para /reverse
+    # Política de uso de Nominatim: ~1 request/s (por proceso)
+    GEOCODE_UPSTREAM_RATE: float = 1.0
+    GEOCODE_UPSTREAM_BURST: int = 1
+    GEOCODE_QUEUE_MAX: int = 100
+    GEOCODE_AUTOCOMPLETE_MAX_WAIT: float = 3.0  # Segundos en cola antes de descartarse
+
+    # Gazetteer offline para /api/geocode/autocomplete (None = app/data/argentina_cities.json)
+    GAZETTEER_PATH: str | None = None
+    GAZETTEER_EXTRA_PATH: str | None = None  # Localidades adicionales, mismo formato JSON
+    # /api/geocode/reverse responde con la localidad del gazetteer si está a
+    # menos de esta distancia; más lejos consulta a Nominatim
+    REVERSE_GEOCODE_MAX_KM: float = 5.0
     
     # CORS
     # En producción idealmente se usa una lista estricta, pero para este MVP en Render
@@ -49,6 +113,23 @@ class Settings(BaseSettings):
 
     # MercadoPago
     MP_ACCESS_TOKEN: str = "TEST-PLACEHOLDER-POR-AHORA"
+    # Otra URL para la API de MercadoPago (servidor falso: scripts/fake_mercadopago.py)
+    MP_API_BASE_URL: str | None = None
+    # Conexiones keep-alive del SDK compartido
+    MP_HTTP_POOL_SIZE: int = 10
+    # Outbox de preferencias de pago (ver PaymentOutboxService)
+    PAYMENT_OUTBOX_INTERVAL_SECONDS: int = 5
+    PAYMENT_OUTBOX_BATCH_SIZE: int = 20
+    PAYMENT_OUTBOX_MAX_ATTEMPTS: int = 5
+    # Cola de notificaciones del webhook (ver PaymentWebhookService)
+    PAYMENT_WEBHOOK_INTERVAL_SECONDS: int = 5
+    PAYMENT_WEBHOOK_BATCH_SIZE: int = 50
+    PAYMENT_WEBHOOK_MAX_ATTEMPTS: int = 8
+    # Conciliación masiva de pagos aprobados (ver PaymentReconciliationService)
+    PAYMENT_RECONCILE_INTERVAL_SECONDS: int = 120
+    PAYMENT_RECONCILE_LOOKBACK_HOURS: int = 48  # Primera corrida
+    PAYMENT_RECONCILE_OVERLAP_MINUTES: int = 10  # Solape entre ventanas (pagos que MP indexa tarde)
+    PAYMENT_RECONCILE_PAGE_SIZE: int = 100
 
     # Emails (Resend)
     RESEND_API_KEY: str | None = None
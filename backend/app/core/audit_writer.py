@@ -0,0 +1,206 @@
+"""
+Escritura de auditoría en segundo plano.
+
+`AuditService.log` encola el evento en memoria y vuelve: un thread los junta
+y los inserta en bloque (un INSERT multi-fila + un commit) cada
+`batch_size` eventos o cada `flush_interval` segundos, lo que ocurra primero.
+El request ya no paga un commit extra por cada evento auditado.
+
+La cola es acotada. Si está llena:
+  - policy "block": el request espera hasta `enqueue_timeout` (cuenta como
+    `delayed`); si sigue llena, el evento se descarta (`dropped`).
+  - policy "drop": se descarta enseguida.
+Los eventos descartados o que no se pudieron escribir van al log de la app,
+para no perderlos del todo.
+
+`stop()` vacía la cola antes de terminar (shutdown de la app y atexit).
+Si el writer no está corriendo (tests, scripts), AuditService escribe en línea.
+"""
+from typing import Callable, Optional
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class AuditWriter:
+    def __init__(self, max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 0.5,
+                 policy: str = "block", enqueue_timeout: float = 0.05, session_factory: Optional[Callable] = None):
+        if policy not in ("block", "drop"):
+            raise ValueError(f"Unknown audit queue policy: {policy}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.enqueue_timeout = enqueue_timeout
+        self.session_factory = session_factory
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.delayed = 0
+        self.failed = 0
+        self.flushes = 0
+        self.max_lag_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --- Productores --------------------------------------------------------
+
+    def enqueue(self, row: dict) -> bool:
+        """Encola una fila de audit_logs. Retorna False si se descartó."""
+        item = (time.monotonic(), row)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.policy == "drop":
+                return self._drop(row)
+            try:
+                self._queue.put(item, timeout=self.enqueue_timeout)
+                with self._lock:
+                    self.delayed += 1
+            except queue.Full:
+                return self._drop(row)
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _drop(self, row: dict) -> bool:
+        with self._lock:
+            self.dropped += 1
+        logger.error(f"AUDITORÍA DESCARTADA (cola llena): {row}")
+        return False
+
+    # --- Consumidor ---------------------------------------------------------
+
+    def _take_batch(self, first):
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Se vuelve a encolar para que el loop lo vea después de escribir
+                self._queue.task_done()
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _write(self, batch):
+        from sqlalchemy import insert
+        from app.models.audit import AuditLog
+
+        rows = [row for _, row in batch]
+        factory = self.session_factory
+        if factory is None:
+            from app.database import SessionLocal
+            factory = SessionLocal
+        db = factory()
+        try:
+            db.execute(insert(AuditLog), rows)
+            db.commit()
+            lag = (time.monotonic() - min(enqueued_at for enqueued_at, _ in batch)) * 1000
+            with self._lock:
+                self.written += len(rows)
+                self.flushes += 1
+                self.max_lag_ms = max(self.max_lag_ms, lag)
+        except Exception as e:
+            db.rollback()
+            with self._lock:
+                self.failed += len(rows)
+            logger.error(f"FALLO DE AUDITORÍA ({len(rows)} eventos): {e}")
+            for row in rows:
+                logger.error(f"AUDITORÍA NO GUARDADA: {row}")
+        finally:
+            db.close()
+            for _ in batch:
+                self._queue.task_done()
+
+    def _loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            # Esperar un poco a que se junte el lote (sin pasar flush_interval)
+            deadline = time.monotonic() + self.flush_interval
+            while self._queue.qsize() < self.batch_size - 1 and time.monotonic() < deadline:
+                time.sleep(min(0.01, self.flush_interval))
+            self._write(self._take_batch(item))
+
+    def start(self):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._loop, name="audit-writer", daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+        logger.info("Audit writer iniciado")
+
+    def flush(self):
+        """Espera a que todo lo encolado hasta ahora esté escrito."""
+        if self.running:
+            self._queue.join()
+
+    def stop(self, timeout: float = 10):
+        """Escribe lo pendiente y detiene el thread."""
+        if self.running:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+        # Lo que haya quedado (writer nunca arrancado, o encolado tarde) se escribe acá
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.task_done()
+                continue
+            self._write(self._take_batch(item))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "policy": self.policy,
+                "queue_depth": self._queue.qsize(),
+                "queue_max": self._queue.maxsize,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "delayed": self.delayed,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "max_lag_ms": round(self.max_lag_ms, 1),
+            }
+
+
+def _from_settings() -> AuditWriter:
+    from app.config import settings
+    return AuditWriter(
+        max_queue=settings.AUDIT_QUEUE_MAX,
+        batch_size=settings.AUDIT_BATCH_SIZE,
+        flush_interval=settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+        policy=settings.AUDIT_QUEUE_POLICY,
+        enqueue_timeout=settings.AUDIT_ENQUEUE_TIMEOUT_MS / 1000,
+    )
+
+
+# Writer del proceso (lo arranca/detiene main.py junto con los workers)
+audit_writer = _from_settings()
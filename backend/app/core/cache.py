@@ -0,0 +1,117 @@
+"""
+Caché en memoria del proceso: LRU con vencimiento (TTL) y contadores.
+"""
+from collections import OrderedDict
+import asyncio
+import threading
+import time
+
+# Distingue "no está en caché" de un valor None guardado
+MISSING = object()
+# SingleFlight: el que ejecutaba se canceló, los que esperaban reintentan
+_RETRY = object()
+
+
+class TTLCache:
+    """
+    LRU acotado a `maxsize` entradas; cada entrada vence `ttl` segundos
+    después de guardada. Es thread-safe (las rutas sync corren en el
+    threadpool de FastAPI).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Saca `key` de la caché (si estaba)."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas async concurrentes con la misma clave: la primera ejecuta
+    la corrutina y las demás esperan su resultado (o su excepción). Si la
+    primera se cancela (el cliente se desconectó), la cancelación no se
+    comparte: una de las que esperaban vuelve a ejecutar. Nada queda
+    guardado al terminar; para eso está la caché.
+    """
+
+    def __init__(self):
+        self._inflight = {}  # key -> asyncio.Future
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        while (future := self._inflight.get(key)) is not None:
+            # shield: si se cancela un request que espera, no se cancela el resto
+            result = await asyncio.shield(future)
+            if result is not _RETRY:
+                self.coalesced += 1
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+        except Exception as e:
+            future.set_exception(e)
+            # Marca la excepción como consumida si nadie más estaba esperando
+            future.exception()
+            raise
+        except BaseException:
+            # Cancelación: se propaga solo en este request
+            future.set_result(_RETRY)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,164 @@
+"""
+Pool de conexiones: parámetros desde Settings y métricas.
+
+`engine_kwargs(url)` arma los argumentos de create_engine / create_async_engine
+(tamaño, overflow, timeout, pre_ping, recycle). No se aplican a SQLite en
+memoria, que usa su propio pool de una sola conexión.
+
+`PoolMetrics.attach(engine)` cambia la clase del pool por una que mide cuánto
+espera cada checkout y escucha los eventos del pool (connect, checkout,
+invalidate). `stats()` junta eso con el estado actual del pool
+(en uso, overflow). Sobrevive a `engine.dispose()`: el pool nuevo se crea con
+la misma clase y los mismos listeners.
+
+`apply_sqlite_pragmas(engine)` deja las conexiones SQLite en modo local
+razonable: WAL (lecturas que no bloquean a la escritura), synchronous=NORMAL
+y busy_timeout (esperar el lock en vez de fallar con "database is locked").
+"""
+from collections import deque
+from typing import Optional
+import logging
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Esperas recientes que se guardan para el p95
+WAIT_WINDOW = 1000
+
+
+def _in_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (":memory:" in url or "mode=memory" in url or url.rstrip("/").endswith(":"))
+
+
+def engine_kwargs(url: str) -> dict:
+    """Argumentos del pool para `url` (vacío para SQLite en memoria)."""
+    if _in_memory_sqlite(url):
+        return {}
+    kwargs = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_POOL_RECYCLE_SECONDS > 0:
+        kwargs["pool_recycle"] = settings.DB_POOL_RECYCLE_SECONDS
+    return kwargs
+
+
+def apply_sqlite_pragmas(engine):
+    """PRAGMAs en cada conexión nueva (sync o `async_engine.sync_engine`)."""
+    in_memory = _in_memory_sqlite(str(engine.url))
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # WAL no existe en memoria
+            if not in_memory and settings.SQLITE_JOURNAL_MODE:
+                cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+            if settings.SQLITE_SYNCHRONOUS:
+                cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        finally:
+            cursor.close()
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self.pool_class = None
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_WINDOW)
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def record_wait(self, wait_ms: float):
+        with self._lock:
+            self._waits.append(wait_ms)
+            self.waits += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def record_timeout(self, wait_ms: float):
+        with self._lock:
+            self.timeouts += 1
+        logger.warning(f"⏳ Pool '{self.name}': sin conexión libre después de {wait_ms:.0f} ms")
+
+    def _timed_pool_class(self, base):
+        metrics = self
+
+        def _do_get(pool):
+            started = time.monotonic()
+            try:
+                conn = base._do_get(pool)
+            except PoolTimeout:
+                metrics.record_timeout((time.monotonic() - started) * 1000)
+                raise
+            metrics.record_wait((time.monotonic() - started) * 1000)
+            return conn
+
+        return type(f"Timed{base.__name__}", (base,), {"_do_get": _do_get})
+
+    def attach(self, engine):
+        """Mide el pool de `engine` (sync; para async, `async_engine.sync_engine`)."""
+        pool = engine.pool
+        self.pool_class = type(pool).__name__
+        pool.__class__ = self._timed_pool_class(type(pool))
+        self.engine = engine
+
+        @event.listens_for(pool, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(pool, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+
+        @event.listens_for(pool, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+        return self
+
+    def _pool_state(self) -> dict:
+        pool = self.engine.pool if self.engine is not None else None
+        if pool is None or not hasattr(pool, "checkedout"):
+            # StaticPool / SingletonThreadPool: una conexión, sin overflow
+            return {"pool": self.pool_class}
+        return {
+            "pool": self.pool_class,
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        }
+
+    def stats(self) -> dict:
+        state = self._pool_state()
+        with self._lock:
+            waits = sorted(self._waits)
+            p95: Optional[float] = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else None
+            return {
+                **state,
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.total_wait_ms / self.waits, 2) if self.waits else None,
+                "wait_ms_p95": round(p95, 2) if p95 is not None else None,
+                "wait_ms_max": round(self.max_wait_ms, 2),
+            }
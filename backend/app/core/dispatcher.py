@@ -0,0 +1,193 @@
+"""
+Despachador con límite de tasa (token bucket) y cola con prioridades para
+llamadas a servicios externos que imponen un máximo de requests por segundo.
+
+- Prioridad: número menor = sale antes (a igual prioridad, orden de llegada).
+- Deduplicación: un trabajo con la misma clave que uno ya encolado comparte
+  su resultado en vez de ocupar otro lugar.
+- Descarte: los trabajos con `max_wait` que esperaron de más se descartan sin
+  llamar al servicio (ej. autocompletado que el usuario ya dejó de tipear).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class DispatchRejected(Exception):
+    """El trabajo no se ejecutó: cola llena (`queue_full`) o esperó de más (`shed`)."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class TokenBucket:
+    """`rate` tokens por segundo, acumulando como mucho `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Segundos hasta que haya un token disponible (0 si ya hay)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    key: Any = field(compare=False)
+    fn: Callable[[], Awaitable] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    max_wait: Optional[float] = field(compare=False, default=None)
+
+    def is_stale(self, now: float) -> bool:
+        return self.max_wait is not None and now - self.enqueued_at > self.max_wait
+
+
+class PriorityDispatcher:
+    """
+    Ejecuta corrutinas respetando `rate` llamadas por segundo (por proceso).
+    El worker es una tarea del event loop que se crea en el primer `submit`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, max_queue: int = 100):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_queue = max_queue
+        self._seq = itertools.count()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._heap = []
+        self._pending = {}  # key -> _Job encolado
+        self._loop = None
+        self._worker = None
+        self._wakeup = None
+        self._running = set()  # tareas en curso (referencia para que no las recolecte el GC)
+        self.dispatched = 0
+        self.deduplicated = 0
+        self.shed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self._total_wait = 0.0
+
+    def reset(self):
+        """Vacía la cola y los contadores (tests)."""
+        for job in self._heap:
+            if not job.future.done():
+                job.future.cancel()
+        self._reset_state()
+        self.bucket.tokens = self.bucket.capacity
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Otro event loop (tests, reinicio): lo encolado en el anterior ya no sirve
+            self._heap, self._pending = [], {}
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, key, fn: Callable[[], Awaitable], priority: int = 0, max_wait: Optional[float] = None):
+        """Encola `fn()` y espera su resultado."""
+        self._ensure_worker()
+        job = self._pending.get(key)
+        if job is not None:
+            self.deduplicated += 1
+        else:
+            if len(self._heap) >= self.max_queue:
+                self.rejected += 1
+                raise DispatchRejected("queue_full")
+            job = _Job(priority, next(self._seq), key, fn, self._loop.create_future(), self._loop.time(), max_wait)
+            heapq.heappush(self._heap, job)
+            self._pending[key] = job
+            self.max_depth = max(self.max_depth, len(self._heap))
+            self._wakeup.set()
+        # shield: si el request que espera se cancela, el trabajo sigue para los demás
+        return await asyncio.shield(job.future)
+
+    def _finish(self, job: _Job, result=None, error: Optional[BaseException] = None):
+        if job.future.done():
+            return
+        if error is not None:
+            job.future.set_exception(error)
+            job.future.exception()  # evita el warning si ya nadie espera
+        else:
+            job.future.set_result(result)
+
+    def _shed_stale(self):
+        now = self._loop.time()
+        stale = [job for job in self._heap if job.is_stale(now)]
+        if not stale:
+            return
+        self._heap = [job for job in self._heap if not job.is_stale(now)]
+        heapq.heapify(self._heap)
+        for job in stale:
+            self._pending.pop(job.key, None)
+            self.shed += 1
+            self._finish(job, error=DispatchRejected("shed"))
+
+    async def _execute(self, job: _Job):
+        try:
+            result = await job.fn()
+        except Exception as e:
+            self._finish(job, error=e)
+        else:
+            self._finish(job, result)
+
+    async def _run(self):
+        while True:
+            self._shed_stale()
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self.bucket.wait_time()
+            if delay > 0:
+                # Mientras tanto pueden llegar trabajos más prioritarios o vencer otros
+                await asyncio.sleep(delay)
+                continue
+            job = heapq.heappop(self._heap)
+            self._pending.pop(job.key, None)
+            self.bucket.take()
+            self.dispatched += 1
+            self._total_wait += self._loop.time() - job.enqueued_at
+            # Sin await: la tasa limita cuántas llamadas empiezan, no cuántas hay en curso
+            task = self._loop.create_task(self._execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    def stats(self) -> dict:
+        by_priority = {}
+        for job in self._heap:
+            by_priority[job.priority] = by_priority.get(job.priority, 0) + 1
+        return {
+            "queue_depth": len(self._heap),
+            "queue_depth_by_priority": by_priority,
+            "max_queue_depth": self.max_depth,
+            "dispatched": self.dispatched,
+            "deduplicated": self.deduplicated,
+            "shed": self.shed,
+            "rejected": self.rejected,
+            "avg_wait_s": round(self._total_wait / self.dispatched, 3) if self.dispatched else 0.0,
+            "rate_per_s": self.bucket.rate,
+        }
@@ -0,0 +1,34 @@
+"""
+Cliente HTTP async compartido (keep-alive) para servicios externos.
+
+Una sola instancia por proceso: reutiliza conexiones TCP/TLS entre requests
+en lugar de abrir una nueva por llamada. Se crea en el primer uso y se
+cierra en el shutdown de la app.
+"""
+from typing import Optional
+import httpx
+
+HTTP_TIMEOUT = httpx.Timeout(5.0)
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(timeout=HTTP_TIMEOUT, limits=HTTP_LIMITS)
+    return _client
+
+
+def set_http_client(client: Optional[httpx.AsyncClient]):
+    """Reemplaza el cliente compartido (tests: httpx.MockTransport)."""
+    global _client
+    _client = client
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
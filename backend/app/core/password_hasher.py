@@ -0,0 +1,138 @@
+"""
+Hashing de contraseñas (bcrypt) fuera del thread del request.
+
+bcrypt es CPU puro a propósito: una ráfaga de logins, cada uno en su thread
+del threadpool, ocupa todos los núcleos y deja sin CPU al resto de los
+requests. Acá los hashes corren en un pool propio de `max_workers` threads
+(bcrypt suelta el GIL, así que un pool de threads alcanza para usar varios
+núcleos sin el costo de un pool de procesos) y con a lo sumo `max_queue`
+trabajos esperando. Si la cola está llena, el request se rechaza en el acto
+(`HasherBusy` -> 503): mejor que un login falle a que la API entera deje de
+responder.
+
+Las rutas que llaman acá son `def`: cada llamador en espera ocupa un thread
+del threadpool de AnyIO (40 en total, compartido con todas las rutas sync).
+Por eso `max_workers + max_queue` tiene que quedar muy por debajo de ese
+límite (ver MAX_BLOCKED_THREADS).
+
+El costo (`rounds`) es configurable. `needs_rehash` detecta hashes hechos con
+otro costo, para rehacerlos en el próximo login exitoso.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import logging
+import threading
+import time
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# Threads del threadpool de AnyIO (40) que el hashing puede tener bloqueados
+MAX_BLOCKED_THREADS = 10
+
+
+class HasherBusy(Exception):
+    """La cola de hashing está llena."""
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_queue: int = 8):
+        if not 4 <= rounds <= 31:
+            raise ValueError(f"bcrypt rounds must be between 4 and 31, got {rounds}")
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        # En ejecución + en cola
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.max_wait_ms = 0.0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HasherBusy("password hashing queue is full")
+        submitted = time.monotonic()
+
+        def task():
+            with self._lock:
+                self.max_wait_ms = max(self.max_wait_ms, (time.monotonic() - submitted) * 1000)
+            return fn(*args)
+
+        try:
+            return self._pool().submit(task).result()
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.completed += 1
+
+    @staticmethod
+    def _bytes(value) -> bytes:
+        return value.encode("utf-8") if isinstance(value, str) else value
+
+    def hash(self, password: str, rounds: Optional[int] = None) -> str:
+        salt = bcrypt.gensalt(rounds or self.rounds)
+        return self._run(bcrypt.hashpw, self._bytes(password), salt).decode("utf-8")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run(bcrypt.checkpw, self._bytes(password), self._bytes(hashed))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True si el hash es de otro costo (o no es un hash bcrypt reconocible)."""
+        try:
+            # "$2b$12$..." -> 12
+            return int(hashed.split("$")[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return True
+
+    def record_rehash(self):
+        with self._lock:
+            self.rehashed += 1
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        in_flight = self.max_workers + self.max_queue - self._slots._value
+        with self._lock:
+            return {
+                "rounds": self.rounds,
+                "workers": self.max_workers,
+                "queue_max": self.max_queue,
+                "in_flight": in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "max_wait_ms": round(self.max_wait_ms, 1),
+            }
+
+
+def _from_settings() -> PasswordHasher:
+    from app.config import settings
+    max_queue = settings.PASSWORD_HASH_QUEUE_MAX
+    limit = max(MAX_BLOCKED_THREADS - settings.PASSWORD_HASH_WORKERS, 0)
+    if max_queue > limit:
+        logger.warning(f"⚠️ PASSWORD_HASH_QUEUE_MAX={max_queue} bloquearía demasiados threads del threadpool; se usa {limit}")
+        max_queue = limit
+    return PasswordHasher(
+        rounds=settings.PASSWORD_HASH_ROUNDS,
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        max_queue=max_queue,
+    )
+
+
+# Pool del proceso (se cierra en el shutdown de la app)
+password_hasher = _from_settings()
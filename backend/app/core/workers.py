@@ -0,0 +1,102 @@
+"""
+Tareas periódicas en segundo plano dentro del proceso de la API.
+
+Cada `PeriodicWorker` es un thread daemon que ejecuta `fn()` cada `interval`
+segundos hasta que se detiene (o antes, si alguien lo despierta con `wake`,
+p. ej. al encolar trabajo nuevo). Se registran con `register` y se arrancan /
+detienen juntos desde los eventos de startup / shutdown de la app
+(si BACKGROUND_WORKERS_ENABLED está activo).
+"""
+from typing import Callable, Dict
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker:
+    def __init__(self, name: str, interval: float, fn: Callable[[], object]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.runs = 0
+        self.errors = 0
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_once(self):
+        """Una pasada; los errores se registran y no detienen el worker."""
+        try:
+            self.fn()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Worker '{self.name}' falló: {e}")
+        finally:
+            self.runs += 1
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self.run_once()
+            self._wake.wait(self.interval)
+
+    def wake(self):
+        """Adelanta la próxima pasada (no espera a que termine)."""
+        self._wake.set()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"worker-{self.name}", daemon=True)
+        self._thread.start()
+        logger.info(f"Worker '{self.name}' iniciado (cada {self.interval}s)")
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {"running": self.running, "interval_s": self.interval, "runs": self.runs, "errors": self.errors}
+
+
+_workers: Dict[str, PeriodicWorker] = {}
+
+
+def register(name: str, interval: float, fn: Callable[[], object]) -> PeriodicWorker:
+    worker = PeriodicWorker(name, interval, fn)
+    _workers[name] = worker
+    return worker
+
+
+def is_running(name: str) -> bool:
+    worker = _workers.get(name)
+    return worker is not None and worker.running
+
+
+def wake(name: str):
+    worker = _workers.get(name)
+    if worker is not None:
+        worker.wake()
+
+
+def start_all():
+    for worker in _workers.values():
+        worker.start()
+
+
+def stop_all():
+    for worker in _workers.values():
+        worker.stop()
+
+
+def stats() -> dict:
+    return {name: worker.stats() for name, worker in _workers.items()}
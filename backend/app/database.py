@@ -1,25 +1,94 @@
 """
 Configuración de base de datos con SQLAlchemy.
+
+Dos motores sobre la misma base:
+  - `engine` / `SessionLocal` (sync): rutas `def`, servicios, workers y scripts.
+  - `async_engine` / `AsyncSessionLocal` (asyncpg / aiosqlite): rutas
+    `async def` de lectura frecuente, que así no ocupan un thread del
+    threadpool mientras esperan a la base.
+
+Los dos comparten la configuración del pool (DB_POOL_*) y exportan sus
+métricas (`pool_stats`, ver app.core.db_pool).
 """
+import logging
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.core.db_pool import PoolMetrics, apply_sqlite_pragmas, engine_kwargs
+
+logger = logging.getLogger(__name__)
 
 # Fix for Render (postgres:// is deprecated in SQLAlchemy)
 db_url = settings.DATABASE_URL
 if db_url and db_url.startswith("postgres://"):
     db_url = db_url.replace("postgres://", "postgresql://", 1)
 
+
+# Parámetros de la URL que asyncpg acepta tal cual (SQLAlchemy los pasa como
+# kwargs de asyncpg.connect). Los de libpq (sslmode, connect_timeout,
+# application_name, ...) hacen fallar la conexión async.
+ASYNCPG_QUERY_PARAMS = {"prepared_statement_cache_size", "target_session_attrs"}
+
+
+def async_url(url: str) -> str:
+    """URL sync -> mismo destino con driver async (asyncpg / aiosqlite)."""
+    if url.startswith("sqlite+aiosqlite://"):
+        return url
+    if url.startswith("postgresql"):
+        # postgresql://, postgresql+psycopg2:// o postgresql+asyncpg://
+        parsed = make_url(url)
+        dropped = sorted(set(parsed.query) - ASYNCPG_QUERY_PARAMS - {"sslmode"})
+        if dropped:
+            logger.warning(f"⚠️ Parámetros de DATABASE_URL ignorados en el motor async: {', '.join(dropped)}")
+        parsed = parsed.set(
+            drivername="postgresql+asyncpg",
+            query={k: v for k, v in parsed.query.items() if k in ASYNCPG_QUERY_PARAMS},
+        )
+        return parsed.render_as_string(hide_password=False)
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+def async_connect_args(url: str) -> dict:
+    """`sslmode` de libpq -> `ssl` de asyncpg (acepta los mismos valores)."""
+    if not url.startswith("postgresql"):
+        return {}
+    sslmode = make_url(url).query.get("sslmode")
+    if isinstance(sslmode, tuple):
+        sslmode = sslmode[-1]
+    return {"ssl": sslmode} if sslmode else {}
+
+
 engine = create_engine(
-    db_url, 
-    connect_args={"check_same_thread": False} if "sqlite" in str(db_url) else {}
+    db_url,
+    connect_args={"check_same_thread": False} if "sqlite" in str(db_url) else {},
+    **engine_kwargs(db_url)
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(async_url(db_url), connect_args=async_connect_args(db_url), **engine_kwargs(db_url))
+# expire_on_commit=False: después del commit no se puede recargar en forma implícita
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if db_url.startswith("sqlite"):
+    apply_sqlite_pragmas(engine)
+    apply_sqlite_pragmas(async_engine.sync_engine)
+
+sync_pool_metrics = PoolMetrics("sync").attach(engine)
+async_pool_metrics = PoolMetrics("async").attach(async_engine.sync_engine)
+
 Base = declarative_base()
 
 
+def pool_stats() -> dict:
+    """Estado y esperas de los dos pools (por worker)."""
+    return {"sync": sync_pool_metrics.stats(), "async": async_pool_metrics.stats()}
+
+
 def get_db():
     """
     Dependencia para obtener la sesión de base de datos.
@@ -31,3 +100,11 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """
+    Dependencia para rutas `async def`: sesión async. Las relaciones no se
+    cargan solas (lazy load) en una AsyncSession: hay que pedirlas en la
+    consulta (joinedload / selectinload).
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
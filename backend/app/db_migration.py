@@ -1,326 +1,292 @@
+"""
+Migraciones versionadas del esquema.
 
-from sqlalchemy import text
-from app.database import engine
+`MIGRATIONS` es la lista ordenada de pasos (`@migration(version, name)`). La
+tabla `schema_migrations` guarda los que ya se aplicaron. Al arrancar,
+`run_migrations` lee la versión actual (una sola consulta) y, si el esquema
+está al día, no hace nada más. Si no, aplica en orden solo los pasos
+pendientes y registra cada uno al terminarlo.
+
+Los pasos son idempotentes (las columnas se agregan solo si faltan, los
+índices con IF NOT EXISTS). Así una base anterior a este esquema (versión 0)
+puede pasar por todos, y dos workers que arrancan a la vez no se pisan.
+
+Para cambiar el esquema, agregar un paso al final con la versión siguiente.
+Un paso ya publicado no se edita. Las tablas nuevas también necesitan un
+paso que llame a `_create_tables`, porque `create_all` ya no corre en cada
+arranque.
+"""
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, func, insert, select, text
+from sqlalchemy.exc import IntegrityError
+from app.database import engine, Base
 from app.core.logger import logger
+from app.utils.dates import parse_departure_time, parse_request_window
+
+# Fuera de Base.metadata: se lee antes de crear el resto de las tablas
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, name: str):
+    """Registra un paso. Las versiones van en orden estricto."""
+    def register(fn):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} is out of order (last: {MIGRATIONS[-1].version})")
+        MIGRATIONS.append(Migration(version, name, fn))
+        return fn
+    return register
+
 
-def run_migrations():
+def _ensure_column(connection, table: str, column: str, ddl_type: str):
     """
-    Checks for missing columns in existing tables and adds them via ALTER TABLE.
-    This is a poor-man's migration system for the MVP.
+    Agrega `column` a `table` si no existe. Retorna True si la columna se creó
+    ahora. Si el ALTER falla, la excepción corta la migración.
     """
-    logger.info("🛠️ Running Auto-Migrations...")
-    
-    with engine.connect() as connection:
+    try:
+        connection.execute(text(f"SELECT {column} FROM {table} LIMIT 1"))
+        return False
+    except Exception:
+        logger.warning(f"⚠️ Column '{column}' missing in '{table}'. Adding it...")
+    # En Postgres la transacción quedó abortada por el SELECT fallido
+    connection.rollback()
+    connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+    connection.commit()
+    logger.info(f"✅ Added '{column}' column to {table}.")
+    return True
+
+
+def _ensure_index(connection, name: str, table: str, columns: str):
+    """Crea un índice si no existe (Postgres y SQLite soportan IF NOT EXISTS)."""
+    connection.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+    connection.commit()
+
+
+def _backfill_departure_timestamps(connection):
+    """
+    Completa departure_at / window_*_at en filas creadas antes de que existieran
+    esas columnas, parseando los strings en Python (mismo parser que los modelos).
+    """
+    from app.models.ride import Ride, RideRequest
+
+    rides = Ride.__table__
+    rows = connection.execute(
+        text("SELECT id, departure_time FROM rides WHERE departure_at IS NULL AND departure_time IS NOT NULL")
+    ).fetchall()
+    updates = [
+        {"_id": row[0], "_departure_at": dt}
+        for row in rows
+        if (dt := parse_departure_time(row[1])) is not None
+    ]
+    if updates:
+        connection.execute(
+            rides.update().where(rides.c.id == bindparam("_id")).values(departure_at=bindparam("_departure_at")),
+            updates
+        )
+        logger.info(f"✅ Backfilled departure_at on {len(updates)} rides.")
+
+    requests_table = RideRequest.__table__
+    rows = connection.execute(
+        text("SELECT id, date, time_window_start, time_window_end FROM requests WHERE window_start_at IS NULL")
+    ).fetchall()
+    updates = []
+    for row in rows:
+        start, end = parse_request_window(row[1], row[2], row[3])
+        if start is not None:
+            updates.append({"_id": row[0], "_start": start, "_end": end})
+    if updates:
+        connection.execute(
+            requests_table.update().where(requests_table.c.id == bindparam("_id")).values(
+                window_start_at=bindparam("_start"), window_end_at=bindparam("_end")
+            ),
+            updates
+        )
+        logger.info(f"✅ Backfilled time windows on {len(updates)} requests.")
+    connection.commit()
+
+
+def _create_tables(connection):
+    # Los modelos se registran en Base al importarse
+    import app.models  # noqa: F401
+    import app.models.audit  # noqa: F401
+    import app.models.stats  # noqa: F401
+    Base.metadata.create_all(bind=connection)
+    connection.commit()
+
+
+@migration(1, "create tables")
+def _m001_create_tables(connection):
+    _create_tables(connection)
+
+
+@migration(2, "bookings: payment and contact columns")
+def _m002_booking_columns(connection):
+    _ensure_column(connection, "bookings", "payment_status", "VARCHAR DEFAULT 'unpaid'")
+    _ensure_column(connection, "bookings", "fee_amount", "FLOAT DEFAULT 5000.0")
+    # Contact Lock
+    _ensure_column(connection, "bookings", "driver_phone", "VARCHAR DEFAULT NULL")
+    _ensure_column(connection, "bookings", "passenger_phone", "VARCHAR DEFAULT NULL")
+    # MP Integration
+    _ensure_column(connection, "bookings", "payment_init_point", "VARCHAR DEFAULT NULL")
+    _ensure_column(connection, "bookings", "payment_id", "VARCHAR DEFAULT NULL")
+
+
+@migration(3, "users: identity and trust & safety columns")
+def _m003_user_columns(connection):
+    _ensure_column(connection, "users", "phone", "VARCHAR DEFAULT NULL")
+    _ensure_column(connection, "users", "profile_picture", "VARCHAR DEFAULT NULL")  # Cloudinary
+    _ensure_column(connection, "users", "verification_document", "VARCHAR DEFAULT NULL")
+    _ensure_column(connection, "users", "verification_status", "VARCHAR DEFAULT 'unverified'")
+    _ensure_column(connection, "users", "driver_license", "VARCHAR DEFAULT NULL")
+    _ensure_column(connection, "users", "gender", "VARCHAR DEFAULT 'O'")
+    _ensure_column(connection, "users", "is_verified", "BOOLEAN DEFAULT FALSE")
+    _ensure_column(connection, "users", "car_color", "VARCHAR DEFAULT NULL")
+    _ensure_column(connection, "users", "phone_verified", "BOOLEAN DEFAULT FALSE")
+    _ensure_column(connection, "users", "email_verified", "BOOLEAN DEFAULT FALSE")
+    _ensure_column(connection, "users", "birth_date", "DATE DEFAULT NULL")
+    _ensure_column(connection, "users", "address", "VARCHAR DEFAULT NULL")
+
+
+@migration(4, "rides: fuel standard columns")
+def _m004_ride_fuel_columns(connection):
+    _ensure_column(connection, "rides", "fuel_liters_total", "FLOAT DEFAULT 0.0")
+    _ensure_column(connection, "rides", "price_per_seat_liters", "FLOAT DEFAULT 0.0")
+
+
+@migration(5, "typed departure timestamps, search indexes and backfill")
+def _m005_departure_timestamps(connection):
+    _ensure_column(connection, "rides", "departure_at", "TIMESTAMP WITH TIME ZONE")
+    _ensure_column(connection, "requests", "window_start_at", "TIMESTAMP WITH TIME ZONE")
+    _ensure_column(connection, "requests", "window_end_at", "TIMESTAMP WITH TIME ZONE")
+    _ensure_index(connection, "ix_rides_departure_at", "rides", "departure_at")
+    _ensure_index(connection, "ix_requests_window_start_at", "requests", "window_start_at")
+    _ensure_index(connection, "ix_requests_window_end_at", "requests", "window_end_at")
+    # Cursor (keyset) del buscador público de viajes
+    _ensure_index(connection, "ix_rides_departure_at_id", "rides", "departure_at, id")
+    # Búsqueda por cercanía (bounding box sobre lat/lng)
+    _ensure_index(connection, "ix_rides_origin_lat_lng", "rides", "origin_lat, origin_lng")
+    _ensure_index(connection, "ix_rides_destination_lat_lng", "rides", "destination_lat, destination_lng")
+    _backfill_departure_timestamps(connection)
+
+
+@migration(6, "initial fill of ride_request_matches")
+def _m006_fill_matches(connection):
+    has_matches = connection.execute(text("SELECT 1 FROM ride_request_matches LIMIT 1")).first()
+    has_rides = connection.execute(text("SELECT 1 FROM rides WHERE status = 'active' LIMIT 1")).first()
+    connection.commit()
+    if not has_matches and has_rides:
+        from app.database import SessionLocal
+        from app.services.match_service import MatchService
+        db = SessionLocal()
         try:
-            # 1. Check 'bookings' table for 'payment_status'
-            # Note: Postgres vs SQLite syntax differs slightly for checking columns, 
-            # but usually selecting from information_schema is safest for Postgres.
-            # However, for simplicity and cross-compat, we try to Select header.
-            
-            # Strategy: Try to select the column. If it fails, add it.
-            try:
-                connection.execute(text("SELECT payment_status FROM bookings LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'payment_status' missing in 'bookings'. Adding it...")
-                try:
-                    # Rollback previous transaction if it failed
-                    try:
-                        connection.rollback()
-                    except:
-                        pass
-                    
-                    # Add Column
-                    # Postgres syntax: ALTER TABLE bookings ADD COLUMN payment_status VARCHAR DEFAULT 'unpaid'
-                    # SQLite syntax: Same
-                    connection.execute(text("ALTER TABLE bookings ADD COLUMN payment_status VARCHAR DEFAULT 'unpaid'"))
-                    connection.commit()
-                    logger.info("✅ Added 'payment_status' column.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'payment_status': {e}")
-            
-            # 2. Check 'fee_amount'
-            try:
-                connection.execute(text("SELECT fee_amount FROM bookings LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'fee_amount' missing in 'bookings'. Adding it...")
-                try:
-                    try:
-                        connection.rollback()
-                    except:
-                        pass
-                    connection.execute(text("ALTER TABLE bookings ADD COLUMN fee_amount FLOAT DEFAULT 5000.0"))
-                    connection.commit()
-                    logger.info("✅ Added 'fee_amount' column.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'fee_amount': {e}")
-            
-            # 3. Check 'driver_phone' in 'bookings' (Contact Lock)
-            try:
-                connection.execute(text("SELECT driver_phone FROM bookings LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'driver_phone' missing in 'bookings'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE bookings ADD COLUMN driver_phone VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'driver_phone' column.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'driver_phone': {e}")
-
-            # 4. Check 'passenger_phone' in 'bookings' (Contact Lock)
-            try:
-                connection.execute(text("SELECT passenger_phone FROM bookings LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'passenger_phone' missing in 'bookings'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE bookings ADD COLUMN passenger_phone VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'passenger_phone' column.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'passenger_phone': {e}")
-
-            # 5. Check 'payment_init_point' in 'bookings' (MP Integration)
-            try:
-                connection.execute(text("SELECT payment_init_point FROM bookings LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'payment_init_point' missing in 'bookings'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE bookings ADD COLUMN payment_init_point VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'payment_init_point' column.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'payment_init_point': {e}")
-
-            # 6. Check 'payment_id' in 'bookings' (MP Integration)
-            try:
-                connection.execute(text("SELECT payment_id FROM bookings LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'payment_id' missing in 'bookings'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE bookings ADD COLUMN payment_id VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'payment_id' column.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'payment_id': {e}")
-
-            # 7. Check 'phone' in 'users' (Identity)
-            try:
-                connection.execute(text("SELECT phone FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'phone' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN phone VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'phone' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'phone' to users: {e}")
-
-            # 8. Check 'profile_picture' in 'users' (Cloudinary)
-            try:
-                connection.execute(text("SELECT profile_picture FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'profile_picture' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN profile_picture VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'profile_picture' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'profile_picture' to users: {e}")
-
-            # 9. Check 'verification_document' in 'users' (Trust & Safety)
-            try:
-                connection.execute(text("SELECT verification_document FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'verification_document' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN verification_document VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'verification_document' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'verification_document' to users: {e}")
-
-            # 10. Check 'verification_status' in 'users' (Trust & Safety)
-            try:
-                connection.execute(text("SELECT verification_status FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'verification_status' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN verification_status VARCHAR DEFAULT 'unverified'"))
-                    connection.commit()
-                    logger.info("✅ Added 'verification_status' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'verification_status' to users: {e}")
-
-            # 11. Check 'driver_license' in 'users' (Trust & Safety)
-            try:
-                connection.execute(text("SELECT driver_license FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'driver_license' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN driver_license VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'driver_license' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'driver_license' to users: {e}")
-
-            # 12. Check 'gender' in 'users'
-            try:
-                connection.execute(text("SELECT gender FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'gender' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN gender VARCHAR DEFAULT 'O'"))
-                    connection.commit()
-                    logger.info("✅ Added 'gender' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'gender' to users: {e}")
-
-            # 13. Check 'is_verified' in 'users'
-            try:
-                connection.execute(text("SELECT is_verified FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'is_verified' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN is_verified BOOLEAN DEFAULT FALSE"))
-                    connection.commit()
-                    logger.info("✅ Added 'is_verified' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'is_verified' to users: {e}")
-
-            # 14. Check 'car_color' in 'users'
-            try:
-                connection.execute(text("SELECT car_color FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'car_color' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN car_color VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'car_color' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'car_color' to users: {e}")
-
-            # 15. Check 'phone_verified' in 'users'
-            try:
-                connection.execute(text("SELECT phone_verified FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'phone_verified' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN phone_verified BOOLEAN DEFAULT FALSE"))
-                    connection.commit()
-                    logger.info("✅ Added 'phone_verified' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'phone_verified' to users: {e}")
-
-            # 16. Check 'email_verified' in 'users'
-            try:
-                connection.execute(text("SELECT email_verified FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'email_verified' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN email_verified BOOLEAN DEFAULT FALSE"))
-                    connection.commit()
-                    logger.info("✅ Added 'email_verified' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'email_verified' to users: {e}")
-
-            # 17. Check 'birth_date' in 'users'
-            try:
-                connection.execute(text("SELECT birth_date FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'birth_date' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN birth_date DATE DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'birth_date' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'birth_date' to users: {e}")
-
-            # 18. Check 'address' in 'users'
-            try:
-                connection.execute(text("SELECT address FROM users LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'address' missing in 'users'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE users ADD COLUMN address VARCHAR DEFAULT NULL"))
-                    connection.commit()
-                    logger.info("✅ Added 'address' column to users.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'address' to users: {e}")
-
-            # 19. Check 'fuel_liters_total' in 'rides'
-            try:
-                connection.execute(text("SELECT fuel_liters_total FROM rides LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'fuel_liters_total' missing in 'rides'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE rides ADD COLUMN fuel_liters_total FLOAT DEFAULT 0.0"))
-                    connection.commit()
-                    logger.info("✅ Added 'fuel_liters_total' column to rides.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'fuel_liters_total' to rides: {e}")
-
-            # 20. Check 'price_per_seat_liters' in 'rides'
-            try:
-                connection.execute(text("SELECT price_per_seat_liters FROM rides LIMIT 1"))
-            except Exception:
-                logger.warning("⚠️ Column 'price_per_seat_liters' missing in 'rides'. Adding it...")
-                try:
-                    try: connection.rollback()
-                    except: pass
-                    connection.execute(text("ALTER TABLE rides ADD COLUMN price_per_seat_liters FLOAT DEFAULT 0.0"))
-                    connection.commit()
-                    logger.info("✅ Added 'price_per_seat_liters' column to rides.")
-                except Exception as e:
-                    logger.error(f"❌ Failed to add 'price_per_seat_liters' to rides: {e}")
-
-            # 21. DATA FIX: Ensure 'juan pablo' is a Driver (C)
-            try:
-                connection.execute(text("UPDATE users SET role = 'C' WHERE lower(name) LIKE '%juan pablo%' AND role != 'C'"))
-                connection.commit()
-            except: pass
-            
-            # 13. DATA FIX: Promote 'jorge melgarejo' (DNI 18507564) to ADMIN
+            total = MatchService.rebuild(db)
+            logger.info(f"✅ Filled 'ride_request_matches' ({total} matches).")
+        finally:
+            db.close()
+
+
+@migration(7, "rides.seats_taken counter")
+def _m007_seats_taken(connection):
+    # Se calcula una vez desde las reservas, solo si la columna es nueva
+    if _ensure_column(connection, "rides", "seats_taken", "INTEGER NOT NULL DEFAULT 0"):
+        from app.services.seat_service import SeatService
+        updated = SeatService.recount(connection)
+        connection.commit()
+        logger.info(f"✅ Backfilled seats_taken on {updated} rides.")
+
+
+@migration(8, "bookings expiry sweep index")
+def _m008_booking_expiry_index(connection):
+    _ensure_index(connection, "ix_bookings_status_created_at", "bookings", "status, created_at")
+
+
+@migration(9, "audit log read and retention indexes")
+def _m009_audit_indexes(connection):
+    # Keyset por timestamp, filtros del admin y retención
+    _ensure_index(connection, "ix_audit_logs_timestamp_id", "audit_logs", "timestamp, id")
+    _ensure_index(connection, "ix_audit_logs_action_timestamp_id", "audit_logs", "action, timestamp, id")
+    _ensure_index(connection, "ix_audit_logs_user_timestamp_id", "audit_logs", "user_id, timestamp, id")
+
+
+@migration(10, "data fix: juan pablo is a driver")
+def _m010_juan_pablo_driver(connection):
+    connection.execute(text("UPDATE users SET role = 'C' WHERE lower(name) LIKE '%juan pablo%' AND role != 'C'"))
+    connection.commit()
+
+
+@migration(11, "data fix: promote jorge melgarejo to admin")
+def _m011_jorge_admin(connection):
+    # Por DNI (preciso) y por nombre como respaldo
+    connection.execute(text("UPDATE users SET role = 'admin' WHERE dni = '18507564'"))
+    connection.execute(text("UPDATE users SET role = 'admin' WHERE lower(name) LIKE '%jorge melgarejo%' AND role != 'admin'"))
+    connection.commit()
+    logger.info("✅ Data Fix: Promoted 'jorge melgarejo' to ADMIN.")
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+def current_version(connection) -> int:
+    """Última versión aplicada (0 si la tabla todavía no existe)."""
+    try:
+        return connection.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+    except Exception:
+        connection.rollback()
+        return 0
+
+
+def _record(connection, step: Migration):
+    try:
+        connection.execute(insert(schema_migrations).values(
+            version=step.version, name=step.name, applied_at=datetime.utcnow()
+        ))
+        connection.commit()
+    except IntegrityError:
+        # Otro worker la registró mientras tanto
+        connection.rollback()
+
+
+def run_migrations(bind=None) -> int:
+    """
+    Aplica los pasos pendientes en orden. Si uno falla se detiene (sin
+    registrarlo) y se reintenta desde ahí en el próximo arranque. Retorna la
+    versión en la que quedó el esquema.
+    """
+    with (bind or engine).connect() as connection:
+        version = current_version(connection)
+        if version >= latest_version():
+            logger.info(f"✅ Schema at version {version}, nothing to migrate.")
+            return version
+
+        pending = [step for step in MIGRATIONS if step.version > version]
+        logger.info(f"🛠️ Schema at version {version}: applying {len(pending)} migration(s)...")
+        schema_migrations.create(connection, checkfirst=True)
+        connection.commit()
+        for step in pending:
             try:
-                # Update by DNI for precision, fallback to name
-                connection.execute(text("UPDATE users SET role = 'admin' WHERE dni = '18507564'"))
-                connection.execute(text("UPDATE users SET role = 'admin' WHERE lower(name) LIKE '%jorge melgarejo%' AND role != 'admin'"))
+                step.apply(connection)
                 connection.commit()
-                logger.info("✅ Data Fix: Promoted 'jorge melgarejo' to ADMIN.")
+                _record(connection, step)
             except Exception as e:
-                logger.error(f"❌ Failed to promote jorge to admin: {e}")
-
-        except Exception as e:
-            logger.error(f"Migration Error: {e}")
+                try: connection.rollback()
+                except: pass
+                logger.error(f"❌ Migration {step.version} ({step.name}) failed: {e}")
+                return version
+            version = step.version
+            logger.info(f"✅ Migration {step.version}: {step.name}")
+        return version
@@ -3,8 +3,9 @@ Aplicación principal FastAPI - YoViajo!
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
-from app.database import engine, Base
+from app.database import async_engine
 from app.models import User, Ride, RideRequest
 from app.models.audit import AuditLog
 from app.models.stats import VisitCounter
@@ -12,37 +13,22 @@ from app.api.routes import auth, rides, requests, geocode, bookings, reports, us
 
 # Configurar Logging
 from app.core.logger import setup_logging
+from app.core.password_hasher import HasherBusy, password_hasher
 setup_logging()
 
 import logging
 logger = logging.getLogger("yoviajo_api")
 logger.info("🚀 YoViajo API Starting up...")
 
-# Crear tablas en la base de datos
-# Crear tablas en la base de datos
+# Esquema: crea las tablas y aplica las migraciones pendientes (ver
+# app.db_migration). Con el esquema al día es una sola lectura de
+# schema_migrations.
+from app.db_migration import run_migrations
 try:
-    logger.info("🔧 Attempting to create tables...")
-    Base.metadata.create_all(bind=engine)
-    logger.info("✅ Tables created (or already existed).")
-    
-    # Verify User table existence directly
-    from sqlalchemy import inspect
-    inspector = inspect(engine)
-    tables = inspector.get_table_names()
-    logger.info(f"📊 Current Tables in DB: {tables}")
-    
-    if "users" not in tables:
-        logger.error("❌ CRITICAL: 'users' table is MISSING after create_all!")
-    else:
-        logger.info("✅ 'users' table exists.")
-        
+    run_migrations()
 except Exception as e:
-    logger.error(f"❌ Error creating tables: {e}")
-    # Don't exit, let migrations try to run, but log heavily.
-
-# Ejecutar Migraciones Manuales (Columnas faltantes)
-from app.db_migration import run_migrations
-run_migrations()
+    logger.error(f"❌ Error running migrations: {e}")
+    # Don't exit: la app arranca igual y lo vuelve a intentar en el próximo arranque
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -70,8 +56,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Paginación de GET /api/rides
 )
 
+
+@app.exception_handler(HasherBusy)
+def password_hasher_busy(request, exc):
+    """Pool de bcrypt saturado (ráfaga de logins/registros): reintentar en un momento."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Hay muchos ingresos en este momento. Probá de nuevo en unos segundos."},
+        headers={"Retry-After": "1"},
+    )
+
 # Incluir routers
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -98,6 +95,45 @@ from app.api.routes import reviews
 app.include_router(reviews.router)
 
 
+from app.core.http import close_http_client
+from app.core import workers
+from app.core.audit_writer import audit_writer
+from app.services.booking_expiry_service import run_sweep as sweep_unpaid_bookings
+from app.services.payment_outbox_service import run_outbox, WORKER_NAME as PAYMENT_OUTBOX_WORKER
+from app.services.payment_webhook_service import run_webhooks, WORKER_NAME as PAYMENT_WEBHOOK_WORKER
+from app.services.payment_reconciliation_service import run_reconciliation, WORKER_NAME as PAYMENT_RECONCILE_WORKER
+from app.services.payment_service import close_sdk
+from app.services.audit_retention_service import run_retention, WORKER_NAME as AUDIT_RETENTION_WORKER
+
+# Tareas periódicas del proceso (ver app.core.workers)
+workers.register("booking_expiry", settings.BOOKING_SWEEP_INTERVAL_SECONDS, sweep_unpaid_bookings)
+workers.register(PAYMENT_OUTBOX_WORKER, settings.PAYMENT_OUTBOX_INTERVAL_SECONDS, run_outbox)
+workers.register(PAYMENT_WEBHOOK_WORKER, settings.PAYMENT_WEBHOOK_INTERVAL_SECONDS, run_webhooks)
+workers.register(PAYMENT_RECONCILE_WORKER, settings.PAYMENT_RECONCILE_INTERVAL_SECONDS, run_reconciliation)
+workers.register(AUDIT_RETENTION_WORKER, settings.AUDIT_RETENTION_INTERVAL_SECONDS, run_retention)
+
+@app.on_event("startup")
+def start_background_workers():
+    if settings.BACKGROUND_WORKERS_ENABLED:
+        audit_writer.start()
+        workers.start_all()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Cierra las conexiones keep-alive del cliente HTTP compartido."""
+    await close_http_client()
+    # Pool de conexiones del motor async
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    workers.stop_all()
+    close_sdk()
+    password_hasher.shutdown()
+    # Último: los workers también auditan
+    audit_writer.stop()
+
+
 @app.api_route("/", methods=["GET", "HEAD"])
 def read_root():
     """
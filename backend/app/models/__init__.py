@@ -5,8 +5,10 @@ from app.database import Base
 from app.models.user import User
 from app.models.ride import Ride, RideRequest
 from app.models.booking import Booking, BookingStatus
-from app.models.payment import Payment
+from app.models.payment import Payment, PaymentPreference, PaymentWebhookEvent, PaymentSyncState
 from app.models.review import Review
+from app.models.match import RideRequestMatch
+from app.models.geocode import GeocodeCache
 
-__all__ = ["Base", "User", "Ride", "RideRequest", "Booking", "BookingStatus", "Payment", "Review"]
+__all__ = ["Base", "User", "Ride", "RideRequest", "Booking", "BookingStatus", "Payment", "PaymentPreference", "PaymentWebhookEvent", "PaymentSyncState", "Review", "RideRequestMatch", "GeocodeCache"]
 
@@ -2,12 +2,19 @@
 Modelo de Auditoría (Audit Log).
 Registra todas las acciones críticas del sistema para respaldo legal y seguridad.
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index
 from datetime import datetime
 from app.database import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Lecturas del admin: keyset (timestamp, id) desc, opcionalmente por acción o usuario.
+        # La retención también recorre la tabla por timestamp.
+        Index("ix_audit_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_audit_logs_action_timestamp_id", "action", "timestamp", "id"),
+        Index("ix_audit_logs_user_timestamp_id", "user_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True) # Puede ser Null si es un intento de login fallido o sistema
@@ -18,3 +25,19 @@ class AuditLog(Base):
 
     # Nota: No definimos relación inversa en User para no ensuciar el modelo User 
     # con un historial infinito. Las consultas se harán directo sobre esta tabla.
+
+
+class AuditArchive(Base):
+    """
+    Meses de audit_logs ya archivados (JSONL comprimido) y borrados de la
+    tabla por la retención (ver AuditRetentionService).
+    """
+    __tablename__ = "audit_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+    month = Column(String, nullable=False, index=True)  # "YYYY-MM"
+    path = Column(String, nullable=False)
+    rows = Column(Integer, nullable=False)
+    min_id = Column(Integer, nullable=True)
+    max_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -2,7 +2,7 @@
 Modelo de Reservas (Bookings).
 Representa cuando un pasajero reserva asientos en un viaje ofrecido por un conductor.
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Float, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -17,10 +17,26 @@ class BookingStatus(str, enum.Enum):
     CANCELLED = "cancelled"   # Cancelada
     COMPLETED = "completed"   # Viaje completado
     PAID = "paid"             # Estado intermedio si se requiere distinción
+    EXPIRED = "expired"       # Sin pago dentro de la ventana de espera (ver BookingExpiryService)
+
+
+# Estados que ocupan asientos del viaje (ver Ride.seats_taken). El asiento se
+# reserva al crear la reserva, antes del pago, y se libera al cancelarla.
+SEAT_HOLDING_STATUSES = (
+    BookingStatus.AWAITING_PAYMENT.value,
+    BookingStatus.PENDING.value,
+    BookingStatus.CONFIRMED.value,
+    BookingStatus.PAID.value,
+    BookingStatus.COMPLETED.value,
+)
 
 
 class Booking(Base):
     __tablename__ = "bookings"
+    __table_args__ = (
+        # Barrido de reservas impagas: WHERE status = 'awaiting_payment' AND created_at < :corte
+        Index("ix_bookings_status_created_at", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -0,0 +1,17 @@
+"""
+Caché persistente de respuestas de Nominatim (geocoding).
+Segundo nivel detrás de la caché en memoria (ver app.services.geocode_service):
+sobrevive a reinicios y se comparte entre procesos.
+"""
+from sqlalchemy import Column, String, Text, DateTime
+from datetime import datetime
+from app.database import Base
+
+
+class GeocodeCache(Base):
+    __tablename__ = "geocode_cache"
+
+    # "search:<texto normalizado>", "autocomplete:<texto>:<limit>", "reverse:<lat>,<lng>"
+    key = Column(String, primary_key=True)
+    payload = Column(Text, nullable=False)  # JSON tal como lo devolvió Nominatim
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,21 @@
+"""
+Modelo de Coincidencias materializadas (Ride <-> RideRequest).
+Se mantiene incrementalmente desde las rutas de viajes y solicitudes
+(ver app.services.match_service) para que las lecturas sean búsquedas indexadas.
+"""
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.database import Base
+
+
+class RideRequestMatch(Base):
+    __tablename__ = "ride_request_matches"
+
+    # PK compuesta: sirve como índice por ride_id
+    ride_id = Column(Integer, ForeignKey("rides.id", ondelete="CASCADE"), primary_key=True)
+    request_id = Column(Integer, ForeignKey("requests.id", ondelete="CASCADE"), primary_key=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    ride = relationship("Ride")
+    request = relationship("RideRequest")
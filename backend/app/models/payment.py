@@ -2,7 +2,7 @@
 Modelo de Pagos (Payment).
 Registra las transacciones de AstroPay u otros medios.
 """
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Index, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -31,3 +31,81 @@ class Payment(Base):
 # Add backref to Booking model lazily or just handle it here?
 # Ideally Booking should know about its payment.
 # In booking.py we would add: payment = relationship("Payment", uselist=False, back_populates="booking")
+
+
+class PaymentPreference(Base):
+    """
+    Outbox de preferencias de MercadoPago.
+    La reserva se guarda junto con una fila 'pending' (misma transacción) y un
+    worker crea la preferencia fuera del request (ver PaymentOutboxService).
+    El cliente obtiene el init_point con GET /api/bookings/{id}/payment.
+    """
+    __tablename__ = "payment_preferences"
+    __table_args__ = (
+        # Worker: WHERE status = 'pending' AND next_attempt_at <= :ahora
+        Index("ix_payment_preferences_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    booking_id = Column(Integer, ForeignKey("bookings.id"), nullable=False, unique=True)
+
+    status = Column(String, nullable=False, default="pending")  # pending, ready, failed, cancelled
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+
+    # Respuesta de MercadoPago
+    preference_id = Column(String, nullable=True)
+    init_point = Column(String, nullable=True)
+    sandbox_init_point = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    booking = relationship("Booking")
+
+
+class PaymentWebhookEvent(Base):
+    """
+    Notificaciones de MercadoPago tal como llegaron al webhook.
+    Una fila por recurso (topic + id): los reintentos de MercadoPago solo
+    suman `deliveries`. El worker "payment_webhooks" las procesa
+    (ver PaymentWebhookService); las 'failed' se pueden reprocesar.
+    """
+    __tablename__ = "payment_webhook_events"
+    __table_args__ = (
+        UniqueConstraint("topic", "resource_id", name="uq_payment_webhook_events_topic_resource"),
+        Index("ix_payment_webhook_events_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    topic = Column(String, nullable=False)  # "payment"
+    resource_id = Column(String, nullable=False)  # ID del pago en MercadoPago
+    raw = Column(Text, nullable=True)  # query params + body (JSON)
+
+    status = Column(String, nullable=False, default="received")  # received, processed, ignored, failed
+    deliveries = Column(Integer, nullable=False, default=1)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    booking_id = Column(Integer, nullable=True)  # external_reference, una vez consultado el pago
+
+    received_at = Column(DateTime, default=datetime.utcnow)
+    last_delivery_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+
+class PaymentSyncState(Base):
+    """
+    Estado de la conciliación masiva contra MercadoPago
+    (ver PaymentReconciliationService). Una fila por fuente.
+    """
+    __tablename__ = "payment_sync_state"
+
+    name = Column(String, primary_key=True)  # "mercadopago"
+    synced_until = Column(DateTime, nullable=True)  # Fin de la última ventana conciliada
+    last_run_at = Column(DateTime, nullable=True)
+    last_status = Column(String, nullable=True)  # ok, error
+    last_error = Column(String, nullable=True)
+    payments_seen = Column(Integer, default=0)
+    bookings_updated = Column(Integer, default=0)
@@ -1,20 +1,33 @@
 """
 Modelos de Viajes (Rides) y Solicitudes (RideRequests).
 """
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Float, DateTime, Index
+from sqlalchemy.orm import relationship, validates
 from app.database import Base
+from app.utils.dates import parse_departure_time, parse_request_window
 
 
 class Ride(Base):
     __tablename__ = "rides"
+    __table_args__ = (
+        # Orden y cursor (keyset) del buscador público: (departure_at, id)
+        Index("ix_rides_departure_at_id", "departure_at", "id"),
+        # Prefiltro por caja (bounding box) de GET /api/rides/near
+        Index("ix_rides_origin_lat_lng", "origin_lat", "origin_lng"),
+        Index("ix_rides_destination_lat_lng", "destination_lat", "destination_lng"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     origin = Column(String)
     destination = Column(String)
     departure_time = Column(String)
+    # Espejo tipado (UTC) de departure_time, para filtros/orden indexados en SQL
+    departure_at = Column(DateTime(timezone=True), nullable=True, index=True)
     price = Column(Integer)
     available_seats = Column(Integer)
+    # Asientos ocupados por reservas activas (contador desnormalizado, ver SeatService).
+    # Libres = available_seats - seats_taken
+    seats_taken = Column(Integer, nullable=False, default=0, server_default="0")
     status = Column(String, default="active") # active, cancelled, completed
 
     # Monetization (Fuel Standard)
@@ -38,6 +51,11 @@ class Ride(Base):
     driver = relationship("User", back_populates="rides_offered")
     bookings = relationship("Booking", back_populates="ride", cascade="all, delete-orphan")
 
+    @validates("departure_time")
+    def _sync_departure_at(self, key, value):
+        self.departure_at = parse_departure_time(value)
+        return value
+
 
 class RideRequest(Base):
     __tablename__ = "requests"
@@ -48,6 +66,9 @@ class RideRequest(Base):
     date = Column(String)
     time_window_start = Column(String)
     time_window_end = Column(String)
+    # Ventana horaria tipada (UTC), derivada de date + time_window_*
+    window_start_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    window_end_at = Column(DateTime(timezone=True), nullable=True, index=True)
     is_flexible = Column(Boolean, default=True)
     proposed_price = Column(Integer, nullable=True)
     
@@ -62,3 +83,11 @@ class RideRequest(Base):
     passenger_id = Column(Integer, ForeignKey("users.id"))
     passenger = relationship("User", back_populates="rides_requested")
 
+    @validates("date", "time_window_start", "time_window_end")
+    def _sync_window(self, key, value):
+        fields = {"date": self.date, "time_window_start": self.time_window_start, "time_window_end": self.time_window_end}
+        fields[key] = value
+        self.window_start_at, self.window_end_at = parse_request_window(
+            fields["date"], fields["time_window_start"], fields["time_window_end"]
+        )
+        return value
@@ -56,8 +56,19 @@ class BookingResponse(BookingBase):
 
     # Payment URL (MercadoPago)
     payment_init_point: Optional[str] = None
+    # Estado de la preferencia en el outbox (pending, ready, failed, cancelled)
+    payment_preference_status: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+
+
+class PaymentPreferenceResponse(BaseModel):
+    booking_id: int
+    status: str  # pending, ready, failed, cancelled
+    payment_status: str
+    init_point: Optional[str] = None
+    sandbox_init_point: Optional[str] = None
+    attempts: int = 0
@@ -41,6 +41,7 @@ class RideResponse(RideBase):
     destination: Optional[str] = None
     maps_url: Optional[str] = None
     status: str
+    seats_taken: int = 0  # Asientos ocupados por reservas activas
     bookings_count: int = 0
     bookings_count: int = 0
     matches_count: int = 0 # Matches with active requests
@@ -56,3 +57,9 @@ class RideResponse(RideBase):
     class Config:
         from_attributes = True
 
+
+class RideNearResponse(RideResponse):
+    """Resultado de la búsqueda por cercanía (GET /api/rides/near)."""
+    distance_km: float               # Origen del viaje -> punto buscado
+    dest_distance_km: Optional[float] = None  # Solo si se buscó por destino
+
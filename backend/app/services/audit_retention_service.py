@@ -0,0 +1,150 @@
+"""
+Retención de audit_logs.
+
+La tabla queda como partición "caliente" (los últimos AUDIT_RETENTION_DAYS)
+con índices para las lecturas del admin. Cada mes calendario que quedó
+entero antes del corte se exporta a un JSONL comprimido
+(`AUDIT_ARCHIVE_DIR/audit_logs-YYYY-MM.jsonl.gz`), se registra en
+`audit_archives` y recién ahí se borra de la tabla.
+
+Funciona igual en SQLite y en Postgres: el "particionado" es por mes en los
+archivos, no en la base.
+"""
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+import gzip
+import json
+import os
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.audit import AuditLog, AuditArchive
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKER_NAME = "audit_retention"
+# Filas por lectura / DELETE
+CHUNK = 1000
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(value: datetime) -> datetime:
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _row(log: AuditLog) -> dict:
+    return {
+        "id": log.id,
+        "user_id": log.user_id,
+        "action": log.action,
+        "details": log.details,
+        "ip_address": log.ip_address,
+        "timestamp": log.timestamp.isoformat() if log.timestamp else None,
+    }
+
+
+class AuditRetentionService:
+
+    @staticmethod
+    def archivable_months(db: Session, now: Optional[datetime] = None) -> List[datetime]:
+        """Inicios de los meses completos anteriores al corte que todavía tienen filas."""
+        now = now or datetime.utcnow()
+        cutoff = _month_start(now - timedelta(days=settings.AUDIT_RETENTION_DAYS))
+        oldest = db.query(func.min(AuditLog.timestamp)).filter(AuditLog.timestamp < cutoff).scalar()
+        months = []
+        month = _month_start(oldest) if oldest else cutoff
+        while month < cutoff:
+            months.append(month)
+            month = _next_month(month)
+        return months
+
+    @staticmethod
+    def _archive_path(month: datetime, archive_dir: str) -> str:
+        base = os.path.join(archive_dir, f"audit_logs-{month:%Y-%m}")
+        path, part = f"{base}.jsonl.gz", 1
+        # Un mes puede archivarse más de una vez (filas que llegaron tarde)
+        while os.path.exists(path):
+            part += 1
+            path = f"{base}-part{part}.jsonl.gz"
+        return path
+
+    @staticmethod
+    def archive_month(db: Session, month: datetime, archive_dir: Optional[str] = None) -> Optional[AuditArchive]:
+        """
+        Exporta las filas del mes a un JSONL gzip, las borra y registra el
+        archivo. Retorna None si el mes no tenía filas.
+        """
+        archive_dir = archive_dir or settings.AUDIT_ARCHIVE_DIR
+        start, end = month, _next_month(month)
+        in_month = (AuditLog.timestamp >= start, AuditLog.timestamp < end)
+        max_id = db.query(func.max(AuditLog.id)).filter(*in_month).scalar()
+        if max_id is None:
+            return None
+
+        os.makedirs(archive_dir, exist_ok=True)
+        path = AuditRetentionService._archive_path(month, archive_dir)
+        tmp_path = f"{path}.tmp"
+        ids, last_id = [], 0
+        # Se escribe a un temporal y se renombra: nunca queda un archivo a medias
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as out:
+            while True:
+                chunk = db.query(AuditLog).filter(
+                    *in_month, AuditLog.id > last_id, AuditLog.id <= max_id
+                ).order_by(AuditLog.id).limit(CHUNK).all()
+                if not chunk:
+                    break
+                for log in chunk:
+                    out.write(json.dumps(_row(log), ensure_ascii=False, default=str) + "\n")
+                    ids.append(log.id)
+                last_id = chunk[-1].id
+                db.expunge_all()
+        os.replace(tmp_path, path)
+
+        try:
+            for i in range(0, len(ids), CHUNK):
+                db.execute(
+                    delete(AuditLog).where(AuditLog.id.in_(ids[i:i + CHUNK])),
+                    execution_options={"synchronize_session": False}
+                )
+            archive = AuditArchive(month=f"{month:%Y-%m}", path=path, rows=len(ids), min_id=ids[0], max_id=ids[-1])
+            db.add(archive)
+            db.commit()
+        except Exception:
+            # El archivo queda, pero las filas siguen en la tabla: se vuelve a intentar
+            db.rollback()
+            os.remove(path)
+            raise
+        logger.info(f"🗄️ Auditoría {archive.month}: {archive.rows} eventos archivados en {path}")
+        return archive
+
+    @staticmethod
+    def run(db: Session, now: Optional[datetime] = None, archive_dir: Optional[str] = None) -> List[AuditArchive]:
+        """Archiva todos los meses vencidos. Retorna los archivos creados."""
+        archives = []
+        for month in AuditRetentionService.archivable_months(db, now):
+            archive = AuditRetentionService.archive_month(db, month, archive_dir)
+            if archive:
+                archives.append(archive)
+        return archives
+
+    @staticmethod
+    def read_archive(path: str) -> Iterator[dict]:
+        """Eventos de un archivo de auditoría, en orden de id."""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def run_retention():
+    """Punto de entrada del worker periódico (sesión propia)."""
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        AuditRetentionService.run(db)
+    finally:
+        db.close()
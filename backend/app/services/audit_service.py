@@ -1,41 +1,50 @@
+from datetime import date, datetime
 from sqlalchemy.orm import Session
+from app.core.audit_writer import audit_writer
 from app.models.audit import AuditLog
-import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _jsonable(value):
+    """Normaliza `details` para la columna JSON (fechas y objetos a str) sin pasar por json.dumps/loads."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (datetime, date)):
+        return str(value)
+    return str(value)
+
+
 class AuditService:
     @staticmethod
     def log(db: Session, action: str, user_id: int = None, details: dict = None, ip_address: str = None):
         """
-        Crea un registro de auditoría en la base de datos.
+        Registra un evento de auditoría.
+        Con el writer en segundo plano corriendo (ver app.core.audit_writer) solo
+        lo encola: no toca la sesión del request. Si no, lo escribe en línea.
         Safe-fail: Si falla el log, no bloquea la operación principal, solo lo imprime en consola.
         """
         try:
-            # Serializar detalles si existen
-            details_json = details if details else {}
-            
-            # SAFE-GUARD: Convert objects like 'date' or 'datetime' to string to avoid JSON errors
-            # Using json.loads/dumps trick to normalize
-            try:
-                details_json = json.loads(json.dumps(details_json, default=str))
-            except Exception:
-                # Fallback: if complex objects fail, convert only top level or just stringify the whole dict
-                details_json = {"raw_error_data": str(details_json)}
-
-            # Crear el objeto DB
-            audit_entry = AuditLog(
-                user_id=user_id,
-                action=action,
-                details=details_json,
-                ip_address=ip_address
-            )
-            
-            db.add(audit_entry)
+            row = {
+                "user_id": user_id,
+                "action": action,
+                "details": _jsonable(details) if details else {},
+                "ip_address": ip_address,
+                "timestamp": datetime.utcnow(),
+            }
+
+            if audit_writer.running:
+                audit_writer.enqueue(row)
+                return
+
+            db.add(AuditLog(**row))
             db.commit()
-            db.refresh(audit_entry)
-            
+
         except Exception as e:
             # En producción, esto debería ir a un sistema de monitoreo (Sentry/Datadog)
             logger.error(f"FALLO DE AUDITORÍA: {action} - {e}")
@@ -0,0 +1,98 @@
+"""
+Vencimiento de reservas que nunca se pagaron.
+
+Una reserva queda en AWAITING_PAYMENT (ocupando asientos) mientras el
+pasajero está en el checkout de MercadoPago. Si no paga dentro de
+BOOKING_PAYMENT_HOLD_MINUTES, el barrido la pasa a EXPIRED y devuelve los
+asientos al viaje.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.booking import Booking, BookingStatus
+from app.services.audit_service import AuditService
+from app.services.seat_service import SeatService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BookingExpiryService:
+
+    @staticmethod
+    def expire_batch(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+        """
+        Vence hasta `batch_size` reservas impagas (las más viejas primero) en
+        una sola transacción: un UPDATE de reservas y uno por viaje para los
+        asientos. Después, una entrada de auditoría con el resumen del lote.
+        Retorna cuántas venció.
+        """
+        now = now or datetime.utcnow()
+        batch_size = batch_size or settings.BOOKING_SWEEP_BATCH_SIZE
+        cutoff = now - timedelta(minutes=settings.BOOKING_PAYMENT_HOLD_MINUTES)
+
+        # Usa ix_bookings_status_created_at; SKIP LOCKED (Postgres) evita pisarse entre workers
+        candidate_ids = [row[0] for row in db.query(Booking.id).filter(
+            Booking.status == BookingStatus.AWAITING_PAYMENT.value,
+            Booking.created_at < cutoff
+        ).order_by(Booking.created_at).limit(batch_size).with_for_update(skip_locked=True).all()]
+        if not candidate_ids:
+            db.rollback()
+            return 0
+
+        # Repetir la condición de estado: un pago pudo confirmar la reserva entretanto
+        expired = db.execute(
+            update(Booking).where(
+                Booking.id.in_(candidate_ids),
+                Booking.status == BookingStatus.AWAITING_PAYMENT.value,
+                Booking.payment_status != "paid"
+            ).values(
+                status=BookingStatus.EXPIRED.value,
+                updated_at=now
+            ).returning(Booking.id, Booking.ride_id, Booking.seats_booked),
+            execution_options={"synchronize_session": False}
+        ).all()
+
+        seats_by_ride = defaultdict(int)
+        for _, ride_id, seats in expired:
+            seats_by_ride[ride_id] += seats
+        for ride_id, seats in seats_by_ride.items():
+            SeatService.release(db, ride_id, seats)
+
+        db.commit()
+
+        # Una sola entrada de auditoría por lote
+        AuditService.log(db, "BOOKINGS_EXPIRED", details={
+            "count": len(expired),
+            "booking_ids": sorted(booking_id for booking_id, _, _ in expired),
+            "rides": sorted(seats_by_ride),
+            "hold_minutes": settings.BOOKING_PAYMENT_HOLD_MINUTES
+        })
+        return len(expired)
+
+    @staticmethod
+    def sweep(db: Session, now: Optional[datetime] = None) -> int:
+        """Vence lotes hasta que no quede ninguna reserva impaga fuera de término."""
+        total = 0
+        batch_size = settings.BOOKING_SWEEP_BATCH_SIZE
+        while True:
+            count = BookingExpiryService.expire_batch(db, now=now, batch_size=batch_size)
+            total += count
+            if count < batch_size:
+                break
+        if total:
+            logger.info(f"Vencidas {total} reservas sin pago")
+        return total
+
+
+def run_sweep():
+    """Punto de entrada del worker periódico (sesión propia)."""
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        BookingExpiryService.sweep(db)
+    finally:
+        db.close()
@@ -0,0 +1,198 @@
+"""
+Geocoding contra OpenStreetMap Nominatim con caché de dos niveles:
+
+1. `memory_cache`: LRU con TTL dentro del proceso (sin I/O).
+2. Tabla `geocode_cache`: persiste entre reinicios y entre workers.
+
+Solo se guardan respuestas válidas de Nominatim (incluidas las listas
+vacías); un error de red o un status != 200 nunca queda cacheado.
+
+Las consultas son async: Nominatim se llama con el cliente HTTP compartido
+(app.core.http) y las búsquedas concurrentes de la misma clave se agrupan en
+una sola (SingleFlight). El acceso a la tabla corre en el threadpool.
+
+Todas las llamadas a Nominatim pasan por `upstream` (app.core.dispatcher):
+como mucho GEOCODE_UPSTREAM_RATE por segundo, primero el autocompletado y
+después reverse/búsqueda. Un autocompletado que
+espera más de GEOCODE_AUTOCOMPLETE_MAX_WAIT se descarta (el usuario ya
+siguió tipeando) y cuenta como error de geocoding.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.cache import TTLCache, SingleFlight, MISSING
+from app.core.dispatcher import PriorityDispatcher, DispatchRejected
+from app.core.http import get_http_client
+from app.models.geocode import GeocodeCache
+import json
+import logging
+import threading
+import httpx
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org"
+# Es importante usar un User-Agent válido para Nominatim
+NOMINATIM_HEADERS = {"User-Agent": "YoViajo-App/1.0"}
+
+memory_cache = TTLCache(maxsize=settings.GEOCODE_CACHE_SIZE, ttl=settings.GEOCODE_CACHE_TTL_SECONDS)
+inflight = SingleFlight()
+upstream = PriorityDispatcher(
+    rate=settings.GEOCODE_UPSTREAM_RATE,
+    burst=settings.GEOCODE_UPSTREAM_BURST,
+    max_queue=settings.GEOCODE_QUEUE_MAX
+)
+
+# Prioridades en la cola de Nominatim (menor = antes)
+PRIORITY_AUTOCOMPLETE = 0
+PRIORITY_INTERACTIVE = 1   # reverse / búsqueda de dirección
+
+
+class GeocodeError(Exception):
+    """Nominatim no respondió o respondió con error."""
+
+
+class GeocodeService:
+    _counters = {"db_hits": 0, "db_misses": 0, "upstream_calls": 0, "upstream_errors": 0}
+    _counters_lock = threading.Lock()
+
+    @staticmethod
+    def _count(name: str):
+        with GeocodeService._counters_lock:
+            GeocodeService._counters[name] += 1
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Clave estable para un texto buscado: minúsculas y espacios colapsados."""
+        return " ".join((text or "").lower().split())
+
+    # --- Niveles de caché ---------------------------------------------------
+
+    @staticmethod
+    def _db_get(db: Session, key: str):
+        row = db.get(GeocodeCache, key)
+        if row is None or row.created_at < datetime.utcnow() - timedelta(days=settings.GEOCODE_DB_TTL_DAYS):
+            GeocodeService._count("db_misses")
+            return MISSING
+        GeocodeService._count("db_hits")
+        return json.loads(row.payload)
+
+    @staticmethod
+    def _db_put(db: Session, key: str, value):
+        # Safe-fail: si no se puede guardar, la respuesta igual se devuelve
+        try:
+            db.merge(GeocodeCache(key=key, payload=json.dumps(value), created_at=datetime.utcnow()))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"FALLO DE CACHE GEOCODE ({key}): {e}")
+
+    @staticmethod
+    async def _request(path: str, params: dict):
+        GeocodeService._count("upstream_calls")
+        try:
+            response = await get_http_client().get(f"{NOMINATIM_URL}/{path}", params=params,
+                                                   headers=NOMINATIM_HEADERS)
+        except httpx.HTTPError as e:
+            GeocodeService._count("upstream_errors")
+            raise GeocodeError(str(e))
+        if response.status_code != 200:
+            GeocodeService._count("upstream_errors")
+            raise GeocodeError(f"Nominatim status {response.status_code}")
+        return response.json()
+
+    @staticmethod
+    async def _fetch(key: str, path: str, params: dict, priority: int):
+        """Llamada a Nominatim a través de la cola con límite de tasa."""
+        max_wait = settings.GEOCODE_AUTOCOMPLETE_MAX_WAIT if priority == PRIORITY_AUTOCOMPLETE else None
+        try:
+            return await upstream.submit(
+                key, lambda: GeocodeService._request(path, params), priority=priority, max_wait=max_wait
+            )
+        except DispatchRejected as e:
+            raise GeocodeError(f"Nominatim queue: {e.reason}")
+
+    @staticmethod
+    async def _cached(db: Optional[Session], key: str, path: str, params: dict, priority: int):
+        value = memory_cache.get(key)
+        if value is not MISSING:
+            return value
+
+        async def load():
+            if db is not None:
+                value = await run_in_threadpool(GeocodeService._db_get, db, key)
+                if value is not MISSING:
+                    memory_cache.set(key, value)
+                    return value
+
+            value = await GeocodeService._fetch(key, path, params, priority)
+            memory_cache.set(key, value)
+            if db is not None:
+                await run_in_threadpool(GeocodeService._db_put, db, key, value)
+            return value
+
+        # Búsquedas iguales en vuelo (ej. varios usuarios tipeando "Córdoba") -> una sola
+        return await inflight.do(key, load)
+
+    # --- Consultas ----------------------------------------------------------
+
+    @staticmethod
+    async def search(db: Optional[Session], address: str, priority: int = PRIORITY_INTERACTIVE) -> list:
+        """Primer resultado de Nominatim para una dirección (lista de 0 o 1)."""
+        key = f"search:{GeocodeService.normalize(address)}"
+        return await GeocodeService._cached(db, key, "search", {
+            "q": address, "format": "json", "limit": 1, "addressdetails": 1
+        }, priority)
+
+    @staticmethod
+    async def autocomplete(db: Optional[Session], query: str, limit: int = 5, priority: int = PRIORITY_AUTOCOMPLETE) -> list:
+        """Ciudades de Argentina que coinciden con el texto."""
+        key = f"autocomplete:{GeocodeService.normalize(query)}:{limit}"
+        return await GeocodeService._cached(db, key, "search", {
+            "q": query,
+            "countrycodes": "ar",  # Restringir a Argentina
+            "format": "json",
+            "limit": limit,
+            "addressdetails": 1,
+        }, priority)
+
+    @staticmethod
+    async def reverse(db: Optional[Session], lat: float, lng: float, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        """
+        Dirección para unas coordenadas. La clave se redondea a
+        GEOCODE_REVERSE_DECIMALS decimales: puntos a pocos metros comparten entrada.
+        """
+        decimals = settings.GEOCODE_REVERSE_DECIMALS
+        lat_r, lng_r = round(lat, decimals), round(lng, decimals)
+        key = f"reverse:{lat_r:.{decimals}f},{lng_r:.{decimals}f}"
+        return await GeocodeService._cached(db, key, "reverse", {
+            "lat": lat_r, "lon": lng_r, "format": "json", "addressdetails": 1
+        }, priority)
+
+    # --- Métricas -----------------------------------------------------------
+
+    @staticmethod
+    def stats() -> dict:
+        memory = memory_cache.stats()
+        with GeocodeService._counters_lock:
+            counters = dict(GeocodeService._counters)
+        lookups = memory["hits"] + memory["misses"]
+        served_from_cache = memory["hits"] + counters["db_hits"]
+        return {
+            "memory": memory,
+            **counters,
+            "coalesced": inflight.coalesced,
+            "hit_rate": round(served_from_cache / lookups, 4) if lookups else 0.0,
+        }
+
+    @staticmethod
+    def reset():
+        """Vacía la caché en memoria y los contadores (tests / admin)."""
+        memory_cache.clear()
+        inflight.coalesced = 0
+        upstream.reset()
+        with GeocodeService._counters_lock:
+            for name in GeocodeService._counters:
+                GeocodeService._counters[name] = 0
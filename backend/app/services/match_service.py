@@ -0,0 +1,170 @@
+from typing import Dict, Iterable, List, Set, Tuple
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from app.models.match import RideRequestMatch
+from app.models.ride import Ride, RideRequest
+from app.utils.matching import find_matches_for_ride, find_matches_for_request
+from app.utils.batch_matching import find_matches_for_rides
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Viajes por tanda al reconstruir la tabla completa
+REBUILD_CHUNK = 200
+
+
+class MatchService:
+    """
+    Mantiene la tabla `ride_request_matches` (coincidencias materializadas).
+
+    Solo los viajes ACTIVOS tienen filas: al cancelar un viaje o borrar una
+    solicitud se eliminan sus coincidencias. Si algo falla, el flujo del
+    usuario no se corta; `check_consistency` / `rebuild` permiten repararla.
+    """
+
+    @staticmethod
+    def _insert(db: Session, pairs: Iterable[Tuple[int, int]]):
+        """
+        INSERT que ignora los pares que ya existen: un viaje y una solicitud
+        compatibles creados a la vez insertan el mismo par desde los dos lados.
+        """
+        rows = [{"ride_id": ride_id, "request_id": request_id} for ride_id, request_id in pairs]
+        if not rows:
+            return
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            stmt = postgresql.insert(RideRequestMatch).on_conflict_do_nothing()
+        elif dialect == "sqlite":
+            stmt = sqlite.insert(RideRequestMatch).on_conflict_do_nothing()
+        else:
+            stmt = insert(RideRequestMatch)
+        db.execute(stmt, rows)
+
+    @staticmethod
+    def _inconsistent(db: Session, what: str, error: Exception):
+        db.rollback()
+        logger.error(
+            f"FALLO DE MATCHES ({what}): {error}. La tabla ride_request_matches quedó sin las "
+            f"coincidencias de {what}; repararla con MatchService.rebuild (scripts/rebuild_matches.py)."
+        )
+
+    @staticmethod
+    def on_ride_created(db: Session, ride: Ride):
+        """Calcula y guarda las coincidencias de un viaje recién publicado."""
+        try:
+            matches = find_matches_for_ride(ride, db) if ride.status == "active" else []
+            db.query(RideRequestMatch).filter(RideRequestMatch.ride_id == ride.id).delete(synchronize_session=False)
+            MatchService._insert(db, ((ride.id, req.id) for req in matches))
+            db.commit()
+        except Exception as e:
+            MatchService._inconsistent(db, f"ride {ride.id}", e)
+
+    @staticmethod
+    def on_request_created(db: Session, request: RideRequest):
+        """Calcula y guarda las coincidencias de una solicitud recién creada."""
+        try:
+            matches = find_matches_for_request(request, db)
+            db.query(RideRequestMatch).filter(RideRequestMatch.request_id == request.id).delete(synchronize_session=False)
+            MatchService._insert(db, ((ride.id, request.id) for ride in matches))
+            db.commit()
+        except Exception as e:
+            MatchService._inconsistent(db, f"request {request.id}", e)
+
+    @staticmethod
+    def on_ride_closed(db: Session, ride_id: int):
+        """
+        El viaje dejó de estar activo (cancelado). No hace commit: se llama
+        dentro de la misma transacción que cambia el estado del viaje.
+        """
+        db.query(RideRequestMatch).filter(RideRequestMatch.ride_id == ride_id).delete(synchronize_session=False)
+
+    @staticmethod
+    def on_request_deleted(db: Session, request_id: int):
+        """
+        Se borra una solicitud. Llamar ANTES de `db.delete(request)` y en la
+        misma transacción (la FK no permite dejar filas huérfanas).
+        """
+        db.query(RideRequestMatch).filter(RideRequestMatch.request_id == request_id).delete(synchronize_session=False)
+
+    # --- Lecturas -----------------------------------------------------------
+
+    @staticmethod
+    def counts_for_rides(db: Session, ride_ids: List[int]) -> Dict[int, int]:
+        """{ride_id: cantidad de coincidencias} en una sola consulta agrupada."""
+        if not ride_ids:
+            return {}
+        rows = db.query(RideRequestMatch.ride_id, func.count(RideRequestMatch.request_id)).filter(
+            RideRequestMatch.ride_id.in_(ride_ids)
+        ).group_by(RideRequestMatch.ride_id).all()
+        return {ride_id: count for ride_id, count in rows}
+
+    @staticmethod
+    async def matches_for_rides(db: AsyncSession, ride_ids: List[int]) -> List[RideRequestMatch]:
+        """Coincidencias de los viajes, con la solicitud y su pasajero ya cargados (lectura async)."""
+        if not ride_ids:
+            return []
+        return (await db.scalars(select(RideRequestMatch).options(
+            joinedload(RideRequestMatch.request).joinedload(RideRequest.passenger)
+        ).filter(
+            RideRequestMatch.ride_id.in_(ride_ids)
+        ).order_by(RideRequestMatch.ride_id, RideRequestMatch.request_id))).all()
+
+    @staticmethod
+    async def matches_for_requests(db: AsyncSession, request_ids: List[int]) -> List[RideRequestMatch]:
+        """Coincidencias de las solicitudes, con el viaje y su conductor ya cargados (lectura async)."""
+        if not request_ids:
+            return []
+        return (await db.scalars(select(RideRequestMatch).options(
+            joinedload(RideRequestMatch.ride).joinedload(Ride.driver)
+        ).filter(
+            RideRequestMatch.request_id.in_(request_ids)
+        ).order_by(RideRequestMatch.request_id, RideRequestMatch.ride_id))).all()
+
+    # --- Mantenimiento ------------------------------------------------------
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        Reconstruye la tabla desde cero con el matcher por lotes.
+        Retorna la cantidad de coincidencias guardadas.
+        """
+        db.query(RideRequestMatch).delete(synchronize_session=False)
+        total = 0
+        last_id = 0
+        while True:
+            rides = db.query(Ride).filter(Ride.status == "active", Ride.id > last_id).order_by(Ride.id).limit(REBUILD_CHUNK).all()
+            if not rides:
+                break
+            matches = find_matches_for_rides(rides, db)
+            pairs = [(ride_id, req.id) for ride_id, reqs in matches.items() for req in reqs]
+            MatchService._insert(db, pairs)
+            total += len(pairs)
+            last_id = rides[-1].id
+        db.commit()
+        logger.info(f"Match table rebuilt: {total} matches")
+        return total
+
+    @staticmethod
+    def check_consistency(db: Session) -> dict:
+        """
+        Compara la tabla contra `app.utils.matching` (fuente de verdad).
+        Retorna las diferencias: `missing` (deberían estar) y `extra` (sobran).
+        """
+        expected: Set[Tuple[int, int]] = set()
+        for ride in db.query(Ride).filter(Ride.status == "active").order_by(Ride.id).all():
+            expected.update((ride.id, req.id) for req in find_matches_for_ride(ride, db))
+
+        stored = set(db.query(RideRequestMatch.ride_id, RideRequestMatch.request_id).all())
+        stored = {(ride_id, request_id) for ride_id, request_id in stored}
+
+        missing = sorted(expected - stored)
+        extra = sorted(stored - expected)
+        return {
+            "consistent": not missing and not extra,
+            "expected": len(expected),
+            "stored": len(stored),
+            "missing": missing,
+            "extra": extra,
+        }
@@ -0,0 +1,147 @@
+"""
+Outbox de preferencias de MercadoPago.
+
+`create_booking` ya no espera a MercadoPago: guarda la reserva junto con una
+fila `payment_preferences` en estado 'pending' (misma transacción) y despierta
+al worker "payment_outbox", que crea la preferencia con el SDK compartido.
+El cliente consulta GET /api/bookings/{id}/payment hasta que esté 'ready'.
+
+Cada fila se reclama antes de llamar a MercadoPago (attempts + 1 y
+next_attempt_at corrido un lease), así la llamada HTTP no queda dentro de
+una transacción abierta y, si el proceso muere, otra pasada la retoma.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.booking import Booking, BookingStatus
+from app.models.payment import PaymentPreference
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKER_NAME = "payment_outbox"
+# Tiempo que una fila reclamada queda reservada para el worker que la tomó
+CLAIM_LEASE = timedelta(seconds=60)
+# Espera entre reintentos: 2, 4, 8, ... segundos (tope 5 minutos)
+MAX_BACKOFF_SECONDS = 300
+
+
+class PaymentOutboxService:
+
+    @staticmethod
+    def enqueue(db: Session, booking: Booking) -> PaymentPreference:
+        """Agrega la fila pendiente. No hace commit: va con la reserva."""
+        row = PaymentPreference(booking_id=booking.id, status="pending", next_attempt_at=datetime.utcnow())
+        db.add(row)
+        return row
+
+    @staticmethod
+    def _preference_args(booking: Booking) -> dict:
+        ride = booking.ride
+        passenger = booking.passenger
+        # Nombre y apellido por separado (MercadoPago rechaza menos pagos con el payer completo)
+        name_parts = passenger.name.split(" ", 1) if passenger.name else ["Pasajero", "YoViajo"]
+        return {
+            "booking_id": booking.id,
+            "title": f"Reserva de Viaje: {ride.origin} -> {ride.destination}",
+            "price": booking.fee_amount,
+            "payer_email": passenger.email,
+            "payer_name": name_parts[0],
+            "payer_surname": name_parts[1] if len(name_parts) > 1 else "Usuario",
+            "payer_dni": passenger.dni,
+        }
+
+    @staticmethod
+    def _claim(db: Session, now: datetime, batch_size: int, booking_id: Optional[int] = None):
+        query = db.query(PaymentPreference).filter(
+            PaymentPreference.status == "pending",
+            PaymentPreference.next_attempt_at <= now
+        )
+        if booking_id is not None:
+            query = query.filter(PaymentPreference.booking_id == booking_id)
+        rows = query.order_by(PaymentPreference.next_attempt_at).limit(batch_size).with_for_update(skip_locked=True).all()
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = now + CLAIM_LEASE
+        claimed = [row.id for row in rows]
+        db.commit()
+        return claimed
+
+    @staticmethod
+    def _process(db: Session, row_id: int, now: datetime):
+        from app.services.payment_service import PaymentService
+
+        row = db.get(PaymentPreference, row_id)
+        booking = row.booking
+        if booking is None or booking.status != BookingStatus.AWAITING_PAYMENT.value or booking.payment_status == "paid":
+            # Vencida, cancelada o pagada por otra vía: ya no hace falta el link
+            row.status = "cancelled"
+            db.commit()
+            return
+
+        args = PaymentOutboxService._preference_args(booking)
+        db.commit()  # no dejar la transacción abierta durante la llamada HTTP
+
+        preference = None
+        try:
+            preference = PaymentService().create_preference(**args)
+            error = None if preference else "create_preference returned None"
+        except Exception as e:
+            error = str(e)
+
+        if preference:
+            row.status = "ready"
+            row.preference_id = preference["preference_id"]
+            row.init_point = preference["init_point"]
+            row.sandbox_init_point = preference.get("sandbox_init_point")
+            row.last_error = None
+            logger.info(f"MP Preference created for booking {row.booking_id}: {row.init_point}")
+        elif row.attempts >= settings.PAYMENT_OUTBOX_MAX_ATTEMPTS:
+            row.status = "failed"
+            row.last_error = error
+            logger.error(f"Failed to create MP Preference for booking {row.booking_id} ({row.attempts} intentos): {error}")
+        else:
+            row.next_attempt_at = now + timedelta(seconds=min(2 ** row.attempts, MAX_BACKOFF_SECONDS))
+            row.last_error = error
+            logger.warning(f"MP Preference for booking {row.booking_id} failed, reintento {row.attempts}: {error}")
+        db.commit()
+
+    @staticmethod
+    def process_batch(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None,
+                      booking_id: Optional[int] = None) -> int:
+        """Reclama y procesa hasta `batch_size` filas pendientes. Retorna cuántas tomó."""
+        now = now or datetime.utcnow()
+        claimed = PaymentOutboxService._claim(db, now, batch_size or settings.PAYMENT_OUTBOX_BATCH_SIZE, booking_id)
+        for row_id in claimed:
+            try:
+                PaymentOutboxService._process(db, row_id, now)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Payment outbox error (row {row_id}): {e}")
+        return len(claimed)
+
+    @staticmethod
+    def status(db: Session, booking_id: int) -> Optional[PaymentPreference]:
+        """
+        Fila de la reserva. Si no hay worker corriendo en este proceso
+        (BACKGROUND_WORKERS_ENABLED apagado), la procesa en el momento.
+        """
+        from app.core import workers
+
+        row = db.query(PaymentPreference).filter(PaymentPreference.booking_id == booking_id).first()
+        if row is not None and row.status == "pending" and not workers.is_running(WORKER_NAME):
+            PaymentOutboxService.process_batch(db, batch_size=1, booking_id=booking_id)
+            db.refresh(row)
+        return row
+
+
+def run_outbox():
+    """Punto de entrada del worker periódico (sesión propia)."""
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        while PaymentOutboxService.process_batch(db) >= settings.PAYMENT_OUTBOX_BATCH_SIZE:
+            pass
+    finally:
+        db.close()
@@ -0,0 +1,190 @@
+"""
+Conciliación masiva de pagos contra MercadoPago.
+
+En lugar de una búsqueda remota por reserva (`search_payment_by_reference`
+en cada consulta de /check), el worker "payment_reconciliation" trae por
+páginas los pagos aprobados en una ventana de tiempo, los cruza con las
+reservas por `external_reference` y actualiza Booking / Payment en bloque.
+
+La ventana arranca donde terminó la anterior (menos un solape, porque MP
+indexa algunos pagos con demora) y queda guardada en `payment_sync_state`.
+/check solo lee la base y ese timestamp de frescura.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.booking import Booking, BookingStatus
+from app.models.payment import Payment, PaymentSyncState
+from app.services.seat_service import SeatService
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKER_NAME = "payment_reconciliation"
+SOURCE = "mercadopago"
+# Reservas por consulta / UPDATE al aplicar
+APPLY_CHUNK = 500
+
+
+class ReconciliationError(Exception):
+    pass
+
+
+class PaymentReconciliationService:
+
+    @staticmethod
+    def fetch_approved(service, begin: datetime, end: datetime, page_size: Optional[int] = None) -> Tuple[Dict[int, dict], int]:
+        """
+        Pagos aprobados de la ventana, por booking_id (external_reference).
+        Retorna ({booking_id: pago}, pagos vistos).
+        """
+        page_size = page_size or settings.PAYMENT_RECONCILE_PAGE_SIZE
+        by_booking, seen, offset = {}, 0, 0
+        while True:
+            page = service.search_approved_payments(begin, end, offset=offset, limit=page_size)
+            if page is None:
+                raise ReconciliationError(f"MercadoPago search failed (offset {offset})")
+            results, total = page
+            for payment in results:
+                ref = str(payment.get("external_reference") or "")
+                if ref.isdigit():
+                    by_booking.setdefault(int(ref), payment)
+            seen += len(results)
+            offset += len(results)
+            if not results or offset >= total:
+                return by_booking, seen
+
+    @staticmethod
+    def apply(db: Session, payments_by_booking: Dict[int, dict], now: Optional[datetime] = None) -> int:
+        """
+        Marca como pagadas (en bloque) las reservas de `payments_by_booking`
+        que todavía no lo estaban y crea sus Payment. No hace commit.
+        Retorna cuántas reservas actualizó.
+        """
+        now = now or datetime.utcnow()
+        booking_ids = sorted(payments_by_booking)
+        updated = 0
+        for i in range(0, len(booking_ids), APPLY_CHUNK):
+            chunk = booking_ids[i:i + APPLY_CHUNK]
+            rows = db.query(Booking.id, Booking.ride_id, Booking.seats_booked, Booking.status).filter(
+                Booking.id.in_(chunk),
+                Booking.payment_status != "paid"
+            ).with_for_update().all()
+            if not rows:
+                continue
+
+            # Reservas que ya no ocupaban asientos (vencidas, canceladas) los recuperan,
+            # igual que en el webhook: el pasajero pagó.
+            reclaim = defaultdict(int)
+            for _, ride_id, seats, status in rows:
+                if not SeatService.holds_seats(status):
+                    reclaim[ride_id] += seats
+            for ride_id, seats in reclaim.items():
+                SeatService.force_reserve(db, ride_id, seats)
+
+            target = [row[0] for row in rows]
+            db.execute(
+                update(Booking).where(Booking.id.in_(target)).values(
+                    payment_status="paid",
+                    status=BookingStatus.CONFIRMED.value,
+                    updated_at=now
+                ),
+                execution_options={"synchronize_session": False}
+            )
+
+            has_payment = {booking_id for (booking_id,) in db.query(Payment.booking_id).filter(Payment.booking_id.in_(target))}
+            new_payments = []
+            for booking_id in target:
+                if booking_id in has_payment:
+                    continue
+                payment = payments_by_booking[booking_id]
+                new_payments.append({
+                    "booking_id": booking_id,
+                    "external_id": str(payment.get("id")),
+                    "status": "approved",
+                    "amount": payment.get("transaction_amount", 0.0),
+                    "currency": payment.get("currency_id", "ARS"),
+                    "payment_url": None,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            if new_payments:
+                db.bulk_insert_mappings(Payment, new_payments)
+            updated += len(target)
+        return updated
+
+    @staticmethod
+    def _state(db: Session) -> PaymentSyncState:
+        state = db.get(PaymentSyncState, SOURCE)
+        if state is None:
+            state = PaymentSyncState(name=SOURCE, payments_seen=0, bookings_updated=0)
+            db.add(state)
+            db.flush()
+        return state
+
+    @staticmethod
+    def reconcile(db: Session, now: Optional[datetime] = None, service=None) -> dict:
+        """Una corrida: ventana desde la última conciliada hasta `now`."""
+        from app.services.payment_service import PaymentService
+
+        now = now or datetime.utcnow()
+        service = service or PaymentService()
+        state = PaymentReconciliationService._state(db)
+        if state.synced_until:
+            begin = state.synced_until - timedelta(minutes=settings.PAYMENT_RECONCILE_OVERLAP_MINUTES)
+        else:
+            begin = now - timedelta(hours=settings.PAYMENT_RECONCILE_LOOKBACK_HOURS)
+
+        try:
+            payments, seen = PaymentReconciliationService.fetch_approved(service, begin, now)
+            updated = PaymentReconciliationService.apply(db, payments, now)
+            state = PaymentReconciliationService._state(db)
+            state.synced_until = now
+            state.last_status = "ok"
+            state.last_error = None
+            state.payments_seen = seen
+            state.bookings_updated = updated
+            if updated:
+                logger.info(f"💰 Conciliación: {updated} reservas pagadas ({seen} pagos aprobados en la ventana)")
+        except Exception as e:
+            db.rollback()
+            state = PaymentReconciliationService._state(db)
+            state.last_status = "error"
+            state.last_error = str(e)[:500]
+            logger.error(f"❌ Conciliación de pagos falló: {e}")
+        state.last_run_at = now
+        db.commit()
+        return PaymentReconciliationService.freshness(db, now)
+
+    @staticmethod
+    def freshness(db: Session, now: Optional[datetime] = None) -> dict:
+        """Hasta cuándo está conciliada la base y si ese dato está viejo."""
+        return PaymentReconciliationService.state_freshness(db.get(PaymentSyncState, SOURCE), now)
+
+    @staticmethod
+    def state_freshness(state: Optional[PaymentSyncState], now: Optional[datetime] = None) -> dict:
+        """`freshness` a partir de la fila ya leída (p. ej. con la sesión async)."""
+        now = now or datetime.utcnow()
+        synced_until = state.synced_until if state else None
+        age = (now - synced_until).total_seconds() if synced_until else None
+        return {
+            "synced_until": synced_until,
+            "age_seconds": age,
+            # Dos intervalos sin conciliar: el worker no está corriendo o MP falla
+            "stale": age is None or age > 2 * settings.PAYMENT_RECONCILE_INTERVAL_SECONDS,
+            "last_status": state.last_status if state else None,
+            "last_error": state.last_error if state else None,
+        }
+
+
+def run_reconciliation():
+    """Punto de entrada del worker periódico (sesión propia)."""
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        PaymentReconciliationService.reconcile(db)
+    finally:
+        db.close()
@@ -1,19 +1,122 @@
+import logging
+import threading
+from app.config import settings
+
+logger = logging.getLogger(__name__)
 
 try:
     import mercadopago
 except ImportError:
     mercadopago = None
 
-from app.config import settings
+# Internos del SDK que usa PooledHttpClient: si cambian en otra versión,
+# se sigue con el cliente HTTP que trae el SDK.
+try:
+    from mercadopago.http.http_client import HttpClient
+    from mercadopago.config.defaults import DEFAULT_RETRY_ON
+    from mercadopago.errors.exceptions import MPServerError
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+    _pooled_client_error = None
+except ImportError as exc:
+    HttpClient = object
+    _pooled_client_error = exc
+
+MP_API_BASE_URL = "https://api.mercadopago.com"
+
+
+class PooledHttpClient(HttpClient):
+    """
+    HttpClient del SDK que reutiliza conexiones (keep-alive).
+    El cliente original abre una `requests.Session` nueva en cada llamada:
+    handshake TLS completo contra api.mercadopago.com por cada operación.
+    Acá hay una sesión por configuración de reintentos, compartida entre threads.
+
+    `base_url` reemplaza a https://api.mercadopago.com (p. ej. el servidor
+    falso de scripts/fake_mercadopago.py para pruebas de carga).
+    """
+
+    def __init__(self, pool_size: int = 10, base_url: str = None):
+        self.pool_size = pool_size
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, maxretries, retry_on, backoff_factor):
+        key = (maxretries, tuple(retry_on) if retry_on is not None else None, backoff_factor)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                retry_strategy = Retry(
+                    total=maxretries,
+                    status_forcelist=retry_on if retry_on is not None else DEFAULT_RETRY_ON,
+                    backoff_factor=backoff_factor if backoff_factor is not None else 0,
+                )
+                session = requests.Session()
+                adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[key] = session
+            return session
+
+    def request(self, method, url, maxretries=None, retry_on=None, backoff_factor=None, **kwargs):
+        if self.base_url and url.startswith(MP_API_BASE_URL):
+            url = self.base_url + url[len(MP_API_BASE_URL):]
+        api_result = self._session(maxretries, retry_on, backoff_factor).request(method, url, **kwargs)
+        response = {"status": api_result.status_code, "response": None}
+        if api_result.status_code != 204 and api_result.content:
+            try:
+                response["response"] = api_result.json()
+            except ValueError as exc:
+                raise MPServerError(
+                    api_result.status_code,
+                    {"message": "Invalid JSON in response body", "error": "invalid_response"},
+                ) from exc
+        return response
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_sdk = None
+_sdk_lock = threading.Lock()
+
+
+def get_sdk():
+    """SDK de MercadoPago del proceso (uno solo, con conexiones reutilizables)."""
+    global _sdk
+    if mercadopago is None:
+        return None
+    if _sdk is None:
+        with _sdk_lock:
+            if _sdk is None:
+                if _pooled_client_error is None:
+                    _sdk = mercadopago.SDK(settings.MP_ACCESS_TOKEN, http_client=PooledHttpClient(settings.MP_HTTP_POOL_SIZE, settings.MP_API_BASE_URL))
+                else:
+                    logger.error(f"❌ MercadoPago: sin cliente HTTP con conexiones reutilizables ({_pooled_client_error}); se usa el del SDK")
+                    _sdk = mercadopago.SDK(settings.MP_ACCESS_TOKEN)
+    return _sdk
+
+
+def close_sdk():
+    global _sdk
+    with _sdk_lock:
+        if _sdk is not None:
+            if isinstance(_sdk.http_client, PooledHttpClient):
+                _sdk.http_client.close()
+            _sdk = None
+
 
 class PaymentService:
     def __init__(self):
-        # Initialize MP SDK with the token (Placeholder or Real)
-        if mercadopago:
-            self.sdk = mercadopago.SDK(settings.MP_ACCESS_TOKEN)
-        else:
+        # SDK compartido (Placeholder o token real)
+        self.sdk = get_sdk()
+        if self.sdk is None:
             print("⚠️ Warning: MercadoPago SDK not installed or not found.")
-            self.sdk = None
 
     def create_preference(self, booking_id: int, title: str, price: float, payer_email: str, payer_name: str = "Pasajero", payer_surname: str = "YoViajo", payer_dni: str = None):
         """
@@ -141,3 +244,37 @@ class PaymentService:
         except Exception as e:
             print(f"Error buscando pago por referencia {external_reference}: {e}")
             return None
+
+    def search_approved_payments(self, begin_date, end_date, offset: int = 0, limit: int = 100):
+        """
+        Una página de pagos aprobados con última actualización entre
+        `begin_date` y `end_date` (datetimes UTC), del más viejo al más nuevo.
+        Retorna (results, total) o None si MP falla.
+        """
+        try:
+            if not self.sdk:
+                return None
+
+            filters = {
+                "status": "approved",
+                "range": "date_last_updated",
+                "begin_date": begin_date.strftime("%Y-%m-%dT%H:%M:%S.000-00:00"),
+                "end_date": end_date.strftime("%Y-%m-%dT%H:%M:%S.000-00:00"),
+                "sort": "date_last_updated",
+                "criteria": "asc",
+                "offset": offset,
+                "limit": limit
+            }
+
+            search_result = self.sdk.payment().search(filters)
+
+            if search_result["status"] == 200:
+                response = search_result["response"]
+                return response.get("results", []), response.get("paging", {}).get("total", 0)
+
+            print(f"❌ MP Search Failed: {search_result}")
+            return None
+
+        except Exception as e:
+            print(f"Error buscando pagos aprobados: {e}")
+            return None
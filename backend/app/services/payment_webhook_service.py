@@ -0,0 +1,227 @@
+"""
+Ingesta de notificaciones de MercadoPago (webhook).
+
+El endpoint solo guarda la notificación en `payment_webhook_events` (una fila
+por topic + id de pago) y responde. MercadoPago reintenta la misma
+notificación muchas veces: cada reintento es un UPDATE de `deliveries`, sin
+volver a consultar el pago ni tocar la reserva.
+
+El worker "payment_webhooks" reclama lotes de eventos 'received', consulta el
+pago y confirma la reserva. Los errores se reintentan con backoff; después de
+PAYMENT_WEBHOOK_MAX_ATTEMPTS quedan 'failed' y se reprocesan con `replay`
+(admin o scripts/replay_webhooks.py).
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+import json
+from sqlalchemy import case, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.booking import Booking
+from app.models.payment import Payment, PaymentWebhookEvent
+from app.services.seat_service import SeatService
+import logging
+
+logger = logging.getLogger(__name__)
+
+WORKER_NAME = "payment_webhooks"
+CLAIM_LEASE = timedelta(seconds=60)
+MAX_BACKOFF_SECONDS = 600
+
+
+class PaymentWebhookService:
+
+    @staticmethod
+    def confirm_payment(db: Session, booking: Booking, external_id: str, amount: float, currency: str) -> bool:
+        """
+        Marca la reserva como pagada y registra el Payment (si no existe).
+        `booking` tiene que venir bloqueada (with_for_update), igual que en
+        PaymentReconciliationService.apply. No hace commit. Retorna False si
+        ya estaba pagada.
+        """
+        if booking.payment_status == "paid":
+            return False
+        # Asientos según el estado bloqueado: una reserva vencida los recupera
+        SeatService.confirm_paid(db, booking)
+        booking.payment_status = "paid"
+        booking.updated_at = datetime.utcnow()
+
+        if not db.query(Payment.id).filter(Payment.booking_id == booking.id).first():
+            db.add(Payment(
+                booking_id=booking.id,
+                external_id=external_id,
+                status="approved",
+                amount=amount,
+                currency=currency,
+                payment_url=None,  # Ya se pagó
+                created_at=datetime.utcnow()
+            ))
+        return True
+
+    @staticmethod
+    def _redelivery(topic: str, resource_id: str, now: datetime):
+        """UPDATE de otra entrega de la misma notificación (0 filas si es nueva)."""
+        E = PaymentWebhookEvent
+        return update(E).where(E.topic == topic, E.resource_id == resource_id).values({
+            E.deliveries: E.deliveries + 1,
+            E.last_delivery_at: now,
+            E.status: case((E.status == "ignored", "received"), else_=E.status),
+            E.next_attempt_at: case((E.status == "ignored", now), else_=E.next_attempt_at),
+        }).execution_options(synchronize_session=False)
+
+    @staticmethod
+    def _new_event(topic: str, resource_id: str, raw: dict, now: datetime) -> PaymentWebhookEvent:
+        return PaymentWebhookEvent(topic=topic, resource_id=resource_id, raw=json.dumps(raw), next_attempt_at=now,
+                                   received_at=now, last_delivery_at=now)
+
+    @staticmethod
+    def _event_id(topic: str, resource_id: str):
+        E = PaymentWebhookEvent
+        return select(E.id).where(E.topic == topic, E.resource_id == resource_id)
+
+    @staticmethod
+    def ingest(db: Session, topic: str, resource_id: str, raw: dict) -> int:
+        """
+        Guarda (o cuenta otra entrega de) una notificación. Retorna el id del evento.
+        Una notificación de un pago que todavía no estaba aprobado vuelve a la cola.
+        """
+        now = datetime.utcnow()
+        redelivery = PaymentWebhookService._redelivery(topic, resource_id, now)
+
+        if not db.execute(redelivery).rowcount:
+            try:
+                db.add(PaymentWebhookService._new_event(topic, resource_id, raw, now))
+                db.commit()
+            except IntegrityError:
+                # Otra entrega del mismo pago ganó la carrera
+                db.rollback()
+                db.execute(redelivery)
+                db.commit()
+        else:
+            db.commit()
+        return db.scalar(PaymentWebhookService._event_id(topic, resource_id))
+
+    @staticmethod
+    async def ingest_async(db: AsyncSession, topic: str, resource_id: str, raw: dict) -> int:
+        """`ingest` con la sesión async del endpoint (no ocupa un thread)."""
+        now = datetime.utcnow()
+        redelivery = PaymentWebhookService._redelivery(topic, resource_id, now)
+
+        if not (await db.execute(redelivery)).rowcount:
+            try:
+                db.add(PaymentWebhookService._new_event(topic, resource_id, raw, now))
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                await db.execute(redelivery)
+                await db.commit()
+        else:
+            await db.commit()
+        return await db.scalar(PaymentWebhookService._event_id(topic, resource_id))
+
+    @staticmethod
+    def _claim(db: Session, now: datetime, batch_size: int, event_id: Optional[int] = None) -> List[int]:
+        query = db.query(PaymentWebhookEvent).filter(
+            PaymentWebhookEvent.status == "received",
+            PaymentWebhookEvent.next_attempt_at <= now
+        )
+        if event_id is not None:
+            query = query.filter(PaymentWebhookEvent.id == event_id)
+        rows = query.order_by(PaymentWebhookEvent.next_attempt_at).limit(batch_size).with_for_update(skip_locked=True).all()
+        for row in rows:
+            row.attempts += 1
+            row.next_attempt_at = now + CLAIM_LEASE
+        claimed = [row.id for row in rows]
+        db.commit()
+        return claimed
+
+    @staticmethod
+    def _handle(db: Session, event: PaymentWebhookEvent, service) -> str:
+        """Aplica un evento. Retorna el estado final; lanza excepción si hay que reintentar."""
+        payment_info = service.get_payment_info(event.resource_id)
+        if payment_info is None:
+            raise RuntimeError("No se pudo consultar el pago en MercadoPago")
+        if payment_info.get("status") != "approved":
+            # Pendiente/rechazado: si después se aprueba, MercadoPago notifica de nuevo
+            event.last_error = f"payment status: {payment_info.get('status')}"
+            return "ignored"
+
+        external_ref = payment_info.get("external_reference")
+        booking = None
+        if external_ref and str(external_ref).isdigit():
+            event.booking_id = int(external_ref)
+            # Bloqueada: el barrido de vencidas no la cambia hasta el commit
+            booking = db.query(Booking).filter(Booking.id == event.booking_id).populate_existing().with_for_update().first()
+        if booking is None:
+            event.last_error = f"booking not found: {external_ref}"
+            return "ignored"
+
+        if PaymentWebhookService.confirm_payment(
+            db, booking, str(event.resource_id),
+            payment_info.get("transaction_amount", 0.0), payment_info.get("currency_id", "ARS")
+        ):
+            logger.info(f"💰 Payment Approved for Booking {booking.id}")
+        event.last_error = None
+        return "processed"
+
+    @staticmethod
+    def process_batch(db: Session, now: Optional[datetime] = None, batch_size: Optional[int] = None,
+                      event_id: Optional[int] = None) -> int:
+        """Reclama y procesa hasta `batch_size` eventos. Retorna cuántos tomó."""
+        from app.services.payment_service import PaymentService
+
+        now = now or datetime.utcnow()
+        claimed = PaymentWebhookService._claim(db, now, batch_size or settings.PAYMENT_WEBHOOK_BATCH_SIZE, event_id)
+        if not claimed:
+            return 0
+
+        service = PaymentService()
+        for event_id in claimed:
+            event = db.get(PaymentWebhookEvent, event_id)
+            try:
+                event.status = PaymentWebhookService._handle(db, event, service)
+                event.processed_at = datetime.utcnow()
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                event = db.get(PaymentWebhookEvent, event_id)
+                event.last_error = str(e)[:500]
+                if event.attempts >= settings.PAYMENT_WEBHOOK_MAX_ATTEMPTS:
+                    event.status = "failed"
+                    logger.error(f"❌ Webhook event {event_id} failed ({event.attempts} intentos): {e}")
+                else:
+                    event.next_attempt_at = now + timedelta(seconds=min(2 ** event.attempts, MAX_BACKOFF_SECONDS))
+                db.commit()
+        return len(claimed)
+
+    @staticmethod
+    def replay(db: Session, event_ids: Optional[List[int]] = None, status: str = "failed") -> int:
+        """
+        Vuelve a encolar eventos (por id, o todos los que estén en `status`).
+        Retorna cuántos reencoló.
+        """
+        query = db.query(PaymentWebhookEvent)
+        if event_ids:
+            query = query.filter(PaymentWebhookEvent.id.in_(event_ids))
+        else:
+            query = query.filter(PaymentWebhookEvent.status == status)
+        count = query.update({
+            PaymentWebhookEvent.status: "received",
+            PaymentWebhookEvent.attempts: 0,
+            PaymentWebhookEvent.next_attempt_at: datetime.utcnow(),
+        }, synchronize_session=False)
+        db.commit()
+        return count
+
+
+def run_webhooks():
+    """Punto de entrada del worker periódico (sesión propia)."""
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        while PaymentWebhookService.process_batch(db) >= settings.PAYMENT_WEBHOOK_BATCH_SIZE:
+            pass
+    finally:
+        db.close()
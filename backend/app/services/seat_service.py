@@ -0,0 +1,152 @@
+"""
+Inventario de asientos por viaje (`Ride.seats_taken`).
+
+Cada cambio es un único UPDATE condicional sobre la fila del viaje:
+
+    UPDATE rides SET seats_taken = seats_taken + :n
+    WHERE id = :ride_id AND available_seats - seats_taken >= :n
+
+Si dos reservas compiten por el último asiento, la base serializa los UPDATE
+y el segundo no modifica ninguna fila (rowcount 0). No hace falta leer ni
+sumar las reservas existentes, y el lock de la fila dura solo hasta el
+commit de la reserva.
+
+Los cambios de estado de una reserva siguen la misma idea: el estado nuevo
+se escribe con `WHERE status = :anterior` y los asientos se mueven solo si
+ese UPDATE tocó la fila. Si otro proceso (p. ej. el barrido de vencidas)
+cambió la reserva entretanto, se lanza `BookingStatusChanged` en lugar de
+liberar u ocupar asientos a partir de un estado viejo.
+"""
+from sqlalchemy import case, func, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.booking import Booking, BookingStatus, SEAT_HOLDING_STATUSES
+from app.models.ride import Ride
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BookingStatusChanged(Exception):
+    """La reserva cambió de estado desde que se leyó."""
+
+
+class SeatService:
+
+    @staticmethod
+    def holds_seats(status: str) -> bool:
+        return status in SEAT_HOLDING_STATUSES
+
+    @staticmethod
+    def reserve(db: Session, ride_id: int, seats: int, only_active: bool = True) -> bool:
+        """
+        Ocupa `seats` asientos si hay lugar (y el viaje está activo).
+        Retorna False si no se pudo; no hace commit.
+        """
+        conditions = [Ride.id == ride_id, Ride.available_seats - Ride.seats_taken >= seats]
+        if only_active:
+            conditions.append(Ride.status == "active")
+        result = db.execute(
+            update(Ride).where(*conditions).values(seats_taken=Ride.seats_taken + seats),
+            execution_options={"synchronize_session": "fetch"}
+        )
+        return result.rowcount == 1
+
+    @staticmethod
+    def force_reserve(db: Session, ride_id: int, seats: int):
+        """
+        Ocupa asientos aunque no haya lugar (pago ya cobrado de una reserva que
+        estaba cancelada). Deja un warning para resolverlo a mano.
+        """
+        if not SeatService.reserve(db, ride_id, seats, only_active=False):
+            db.execute(
+                update(Ride).where(Ride.id == ride_id).values(seats_taken=Ride.seats_taken + seats),
+                execution_options={"synchronize_session": "fetch"}
+            )
+            logger.warning(f"OVERBOOKING: ride {ride_id} supera su capacidad (+{seats} asientos por pago confirmado)")
+
+    @staticmethod
+    def release(db: Session, ride_id: int, seats: int):
+        """Libera asientos (nunca baja de 0). No hace commit."""
+        db.execute(
+            update(Ride).where(Ride.id == ride_id).values(
+                seats_taken=case((Ride.seats_taken >= seats, Ride.seats_taken - seats), else_=0)
+            ),
+            execution_options={"synchronize_session": "fetch"}
+        )
+
+    @staticmethod
+    def resize(db: Session, booking: Booking, new_seats: int) -> bool:
+        """Cambia la cantidad de asientos de una reserva activa. False si no hay lugar."""
+        delta = new_seats - booking.seats_booked
+        if delta > 0:
+            return SeatService.reserve(db, booking.ride_id, delta)
+        if delta < 0:
+            SeatService.release(db, booking.ride_id, -delta)
+        return True
+
+    @staticmethod
+    def change_status(db: Session, booking: Booking, new_status: str, force: bool = False) -> bool:
+        """
+        Pasa la reserva de `booking.status` a `new_status` y ajusta el
+        inventario. No hace commit.
+
+        Lanza BookingStatusChanged si en la base la reserva ya no está en
+        `booking.status`. Retorna False si vuelve a ocupar asientos y no hay
+        lugar, salvo con `force` (pagos ya cobrados); en ese caso el llamador
+        hace rollback.
+        """
+        old_status = booking.status
+        if old_status == new_status:
+            return True
+        result = db.execute(
+            update(Booking).where(Booking.id == booking.id, Booking.status == old_status).values(status=new_status),
+            execution_options={"synchronize_session": False}
+        )
+        if result.rowcount != 1:
+            raise BookingStatusChanged(f"booking {booking.id} is no longer '{old_status}'")
+        set_committed_value(booking, "status", new_status)
+
+        was_holding = SeatService.holds_seats(old_status)
+        will_hold = SeatService.holds_seats(new_status)
+        if was_holding and not will_hold:
+            SeatService.release(db, booking.ride_id, booking.seats_booked)
+        elif will_hold and not was_holding:
+            if force:
+                SeatService.force_reserve(db, booking.ride_id, booking.seats_booked)
+            else:
+                return SeatService.reserve(db, booking.ride_id, booking.seats_booked)
+        return True
+
+    @staticmethod
+    def confirm_paid(db: Session, booking: Booking, attempts: int = 3):
+        """
+        Pasa a CONFIRMED una reserva con el pago ya cobrado. Si estaba
+        vencida o cancelada vuelve a ocupar sus asientos (force_reserve). Si
+        el estado cambió desde que se leyó, se relee bloqueada y se reintenta.
+        No hace commit. Llamarla antes de modificar otros campos de `booking`:
+        el reintento la recarga.
+        """
+        for attempt in range(attempts):
+            try:
+                SeatService.change_status(db, booking, BookingStatus.CONFIRMED.value, force=True)
+                return
+            except BookingStatusChanged:
+                if attempt == attempts - 1:
+                    raise
+                db.refresh(booking, with_for_update=True)
+
+    @staticmethod
+    def recount(bind, ride_ids=None) -> int:
+        """
+        Recalcula seats_taken desde las reservas (migración / reparación).
+        `bind` puede ser una Session o una Connection. Retorna filas actualizadas.
+        """
+        held = select(func.coalesce(func.sum(Booking.seats_booked), 0)).where(
+            Booking.ride_id == Ride.id,
+            Booking.status.in_(SEAT_HOLDING_STATUSES)
+        ).scalar_subquery()
+        stmt = update(Ride).values(seats_taken=held)
+        if ride_ids is not None:
+            stmt = stmt.where(Ride.id.in_(ride_ids))
+        return bind.execute(stmt, execution_options={"synchronize_session": False}).rowcount
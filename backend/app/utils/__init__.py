@@ -2,34 +2,18 @@
 Utilidades para geolocalización, generación de enlaces de Maps y Auditoría.
 """
 from typing import Optional
-import requests
 from datetime import datetime, timedelta
 
-def search_nominatim_cities(query: str, limit: int = 5):
+async def search_nominatim_cities(query: str, limit: int = 5, db=None):
     """
     Busca ciudades en Argentina usando OpenStreetMap Nominatim.
+    Pasa por la caché de geocoding (memoria y, si se pasa `db`, la tabla
+    geocode_cache). Retorna [] si Nominatim no responde.
     """
+    from app.services.geocode_service import GeocodeService, GeocodeError
     try:
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            "q": query,
-            "countrycodes": "ar",  # Restringir a Argentina
-            "format": "json",
-            "limit": limit,
-            "addressdetails": 1,
-            # removed featuretype for broader search initially, can refine if needed
-        }
-        # Es importante usar un User-Agent válido para Nominatim
-        headers = {
-            "User-Agent": "YoViajo-App/1.0"
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=5)
-        
-        if response.status_code == 200:
-            return response.json()
-        return []
-    except Exception as e:
+        return await GeocodeService.autocomplete(db, query, limit)
+    except GeocodeError as e:
         print(f"Error consulting Nominatim: {e}")
         return []
 
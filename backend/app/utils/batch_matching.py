@@ -0,0 +1,181 @@
+"""
+Batch matching: many rides against many requests in one pass.
+
+Same semantics as `find_matches_for_ride` / `find_matches_for_request`
+(origin AND destination within radius_km, departure inside the request
+window +/- 1 hour), but candidates are loaded once for the whole batch and
+compared as an N x M matrix. Uses NumPy when available, plain Python
+otherwise.
+"""
+from typing import Dict, List, Sequence, Tuple
+from math import radians
+from sqlalchemy.orm import Session
+from app.models.ride import Ride, RideRequest
+from app.utils.dates import stored_utc
+from app.utils.matching import (
+    EARTH_RADIUS_KM, MATCH_TIME_TOLERANCE, haversine_distance, ride_index, request_index
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Rows per block in the vectorized pass (bounds the N x M temporaries)
+BLOCK_SIZE = 512
+
+_TOLERANCE_S = MATCH_TIME_TOLERANCE.total_seconds()
+
+
+def _coord(value):
+    return float('nan') if value is None else float(value)
+
+
+def _ride_point(ride):
+    """(origin_lat, origin_lng, dest_lat, dest_lng, departure_ts) or None."""
+    departure = stored_utc(ride.departure_at)
+    if departure is None:
+        return None
+    return (ride.origin_lat, ride.origin_lng, ride.destination_lat, ride.destination_lng, departure.timestamp())
+
+
+def _request_point(req):
+    """(origin_lat, origin_lng, dest_lat, dest_lng, start_ts, end_ts) or None."""
+    start, end = stored_utc(req.window_start_at), stored_utc(req.window_end_at)
+    if start is None or end is None:
+        return None
+    return (req.origin_lat, req.origin_lng, req.destination_lat, req.destination_lng, start.timestamp(), end.timestamp())
+
+
+def _pairs_python(ride_points, request_points, radius_km):
+    pairs = []
+    for i, (olat, olng, dlat, dlng, ts) in enumerate(ride_points):
+        for j, (r_olat, r_olng, r_dlat, r_dlng, start, end) in enumerate(request_points):
+            if not (start - _TOLERANCE_S <= ts <= end + _TOLERANCE_S):
+                continue
+            if (haversine_distance(olat, olng, r_olat, r_olng) <= radius_km and
+                    haversine_distance(dlat, dlng, r_dlat, r_dlng) <= radius_km):
+                pairs.append((i, j))
+    return pairs
+
+
+def _haversine_matrix(lat1, lng1, lat2, lng2):
+    """Distances (km) between column vectors (N, 1) and row vectors (1, M), in radians."""
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(a)) * EARTH_RADIUS_KM
+
+
+def _pairs_numpy(ride_points, request_points, radius_km):
+    rides = np.array([[_coord(v) for v in p] for p in ride_points], dtype=float)
+    reqs = np.array([[_coord(v) for v in p] for p in request_points], dtype=float)
+    rides[:, :4] = np.radians(rides[:, :4])
+    reqs[:, :4] = np.radians(reqs[:, :4])
+
+    r_olat, r_olng, r_dlat, r_dlng = (reqs[:, k][None, :] for k in range(4))
+    start = reqs[:, 4][None, :] - _TOLERANCE_S
+    end = reqs[:, 5][None, :] + _TOLERANCE_S
+
+    pairs = []
+    for offset in range(0, len(rides), BLOCK_SIZE):
+        block = rides[offset:offset + BLOCK_SIZE]
+        olat, olng, dlat, dlng, ts = (block[:, k][:, None] for k in range(5))
+        # NaN coordinates (missing) compare False, same as the infinite distance
+        # of the scalar version.
+        mask = (start <= ts) & (ts <= end)
+        mask &= _haversine_matrix(olat, olng, r_olat, r_olng) <= radius_km
+        mask &= _haversine_matrix(dlat, dlng, r_dlat, r_dlng) <= radius_km
+        rows, cols = np.nonzero(mask)
+        pairs.extend(zip((rows + offset).tolist(), cols.tolist()))
+    return pairs
+
+
+def match_pairs(rides: Sequence, requests: Sequence, radius_km=20) -> List[Tuple[int, int]]:
+    """
+    Compare every ride with every request. Returns the (ride, request) index
+    pairs that match, sorted by ride then request position.
+    Rides/requests without typed dates (departure_at, window_*_at) never match.
+    """
+    ride_idx, ride_points = [], []
+    for i, ride in enumerate(rides):
+        point = _ride_point(ride)
+        if point is not None:
+            ride_idx.append(i)
+            ride_points.append(point)
+
+    req_idx, request_points = [], []
+    for j, req in enumerate(requests):
+        point = _request_point(req)
+        if point is not None:
+            req_idx.append(j)
+            request_points.append(point)
+
+    if not ride_points or not request_points:
+        return []
+
+    if np is not None:
+        pairs = _pairs_numpy(ride_points, request_points, radius_km)
+    else:
+        pairs = _pairs_python(ride_points, request_points, radius_km)
+    return sorted((ride_idx[i], req_idx[j]) for i, j in pairs)
+
+
+def find_matches_for_rides(rides: Sequence[Ride], db: Session, radius_km=20) -> Dict[int, List[RideRequest]]:
+    """
+    Batch version of `find_matches_for_ride`: {ride.id: [RideRequest, ...]}.
+    Loads all candidate requests with a single query.
+    """
+    result = {ride.id: [] for ride in rides}
+    candidate_ids, departures = set(), []
+    for ride in rides:
+        departure = stored_utc(ride.departure_at)
+        if departure is None:
+            continue
+        departures.append(departure)
+        candidate_ids |= request_index.candidate_ids(
+            db, ride.origin_lat, ride.origin_lng, ride.destination_lat, ride.destination_lng, radius_km
+        )
+    if not candidate_ids:
+        return result
+
+    requests = db.query(RideRequest).filter(
+        RideRequest.id.in_(candidate_ids),
+        RideRequest.window_start_at <= max(departures) + MATCH_TIME_TOLERANCE,
+        RideRequest.window_end_at >= min(departures) - MATCH_TIME_TOLERANCE
+    ).order_by(RideRequest.id).all()
+
+    for i, j in match_pairs(rides, requests, radius_km):
+        result[rides[i].id].append(requests[j])
+    return result
+
+
+def find_matches_for_requests(requests: Sequence[RideRequest], db: Session, radius_km=20) -> Dict[int, List[Ride]]:
+    """
+    Batch version of `find_matches_for_request`: {request.id: [Ride, ...]}.
+    Loads all candidate (active) rides with a single query.
+    """
+    result = {req.id: [] for req in requests}
+    candidate_ids, starts, ends = set(), [], []
+    for req in requests:
+        start, end = stored_utc(req.window_start_at), stored_utc(req.window_end_at)
+        if start is None or end is None:
+            continue
+        starts.append(start)
+        ends.append(end)
+        candidate_ids |= ride_index.candidate_ids(
+            db, req.origin_lat, req.origin_lng, req.destination_lat, req.destination_lng, radius_km
+        )
+    if not candidate_ids:
+        return result
+
+    rides = db.query(Ride).filter(
+        Ride.id.in_(candidate_ids),
+        Ride.status == 'active',
+        Ride.departure_at >= min(starts) - MATCH_TIME_TOLERANCE,
+        Ride.departure_at <= max(ends) + MATCH_TIME_TOLERANCE
+    ).order_by(Ride.id).all()
+
+    for i, j in match_pairs(rides, requests, radius_km):
+        result[requests[j].id].append(rides[i])
+    return result
@@ -0,0 +1,67 @@
+"""
+Conversión de las fechas que llegan como texto (ISO) a datetimes con zona horaria.
+
+Las columnas `Ride.departure_time` y `RideRequest.date`/`time_window_*` siguen
+siendo strings (contrato con el frontend). Estos helpers generan su espejo
+tipado en UTC (`departure_at`, `window_start_at`, `window_end_at`), que es el
+que se usa para filtrar y ordenar en SQL.
+"""
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+
+def to_utc(value: datetime) -> datetime:
+    """
+    Normaliza un datetime a UTC.
+    Un valor naive se interpreta como hora local del servidor, que es como lo
+    comparaba el código hasta ahora (contra `datetime.now()`).
+    """
+    return value.astimezone(timezone.utc)
+
+
+def stored_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Valor leído de una columna `*_at`. SQLite lo devuelve naive (ya en UTC);
+    Postgres y los objetos recién creados, con zona.
+    """
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def utcnow() -> datetime:
+    """Hora actual con zona horaria (UTC)."""
+    return datetime.now(timezone.utc)
+
+
+def parse_departure_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    Convierte el `departure_time` de un viaje ("YYYY-MM-DDTHH:MM[:SS][Z]") a UTC.
+    Retorna None si el texto no es una fecha válida.
+    """
+    if not value:
+        return None
+    try:
+        return to_utc(datetime.fromisoformat(value.replace('Z', '+00:00')))
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_request_window(date: Optional[str], start: Optional[str], end: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Convierte la ventana horaria de una solicitud (date + HH:MM) a UTC.
+    Retorna (None, None) si falta algún dato, igual que el matching original
+    que descartaba las solicitudes sin ventana parseable.
+    """
+    try:
+        window_start = datetime.fromisoformat(f"{date}T{start}")
+        window_end = datetime.fromisoformat(f"{date}T{end}")
+    except (ValueError, TypeError):
+        return None, None
+    return to_utc(window_start), to_utc(window_end)
+
+
+def local_midnight_utc(now: Optional[datetime] = None) -> datetime:
+    """Inicio del día local actual, expresado en UTC."""
+    now = now or datetime.now()
+    return to_utc(now.replace(hour=0, minute=0, second=0, microsecond=0))
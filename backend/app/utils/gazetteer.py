@@ -0,0 +1,214 @@
+"""
+Gazetteer offline de ciudades para el autocompletado.
+
+Carga `app/data/argentina_cities.json` (copia de frontend/src/data: la imagen
+Docker del backend no incluye el frontend; tests/test_gazetteer.py falla si
+las dos copias difieren) y,
+opcionalmente, un archivo de localidades más grande (`GAZETTEER_EXTRA_PATH`,
+mismo formato: lista de {label, value, lat, lng}) en un trie de prefijos.
+Las búsquedas ignoran mayúsculas, acentos y puntuación, y matchean desde el
+inicio del nombre o desde cualquier palabra ("paz" -> "Villa Carlos Paz").
+Nominatim queda solo como respaldo para lo que no está en el gazetteer.
+
+También resuelve la localidad más cercana a unas coordenadas (reverse
+geocoding) con un KD-tree sobre vectores unitarios 3D: la distancia en línea
+recta entre dos puntos de la esfera crece igual que la de círculo máximo, así
+que el vecino más cercano es el mismo que con haversine.
+"""
+from bisect import insort
+from pathlib import Path
+from math import radians, cos, sin, asin, sqrt
+from typing import List, Optional, Sequence, Tuple
+import json
+import logging
+import threading
+import unicodedata
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "argentina_cities.json"
+# Resultados guardados por nodo del trie (tope de cualquier búsqueda)
+MAX_RESULTS = 10
+EARTH_RADIUS_KM = 6371
+
+
+def normalize(text: str) -> str:
+    """'Córdoba,  Córdoba' -> 'cordoba cordoba'."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    cleaned = "".join(c if c.isalnum() else " " for c in folded)
+    return " ".join(cleaned.split())
+
+
+class _Node:
+    __slots__ = ("children", "best")
+
+    def __init__(self):
+        self.children = {}
+        self.best = []  # [(rank, entry_idx)] ordenada, como mucho MAX_RESULTS
+
+
+def _unit_vector(lat: float, lng: float) -> Tuple[float, float, float]:
+    lat, lng = radians(lat), radians(lng)
+    return (cos(lat) * cos(lng), cos(lat) * sin(lng), sin(lat))
+
+
+def _chord_to_km(chord: float) -> float:
+    """Cuerda en la esfera unitaria -> distancia de círculo máximo (km)."""
+    return 2 * asin(min(1.0, chord / 2)) * EARTH_RADIUS_KM
+
+
+class _KDTree:
+    """KD-tree estático sobre puntos 3D. Nodo: (punto, idx, eje, izquierda, derecha)."""
+
+    def __init__(self, points: Sequence[Tuple[float, float, float]]):
+        self._root = self._build([(p, i) for i, p in enumerate(points)], 0)
+
+    def _build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        point, idx = items[mid]
+        return (point, idx, axis, self._build(items[:mid], depth + 1), self._build(items[mid + 1:], depth + 1))
+
+    def nearest(self, target) -> Tuple[Optional[int], float]:
+        """(idx, distancia euclídea) del punto más cercano a `target`."""
+        best = [None, float("inf")]  # idx, distancia al cuadrado
+
+        def visit(node):
+            if node is None:
+                return
+            point, idx, axis, left, right = node
+            d2 = (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2 + (point[2] - target[2]) ** 2
+            if d2 < best[1]:
+                best[0], best[1] = idx, d2
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            # La otra rama solo si el plano de corte está más cerca que el mejor hasta ahora
+            if diff * diff < best[1]:
+                visit(far)
+
+        visit(self._root)
+        return best[0], sqrt(best[1])
+
+
+class Gazetteer:
+    """
+    Trie de prefijos sobre los nombres normalizados. Cada nodo guarda los
+    mejores resultados de su subárbol, así que una búsqueda cuesta
+    O(largo del texto), sin recorrer el subárbol.
+
+    Orden: primero las ciudades cuyo nombre empieza con el texto, después las
+    que lo tienen en otra palabra; a igualdad, el orden del archivo (el
+    dataset está ordenado por importancia).
+    """
+
+    def __init__(self, paths=None):
+        self._paths = paths
+        self._root = None
+        self._entries = []
+        self._kdtree = None
+        self._lock = threading.Lock()
+
+    def _default_paths(self):
+        paths = [Path(settings.GAZETTEER_PATH) if settings.GAZETTEER_PATH else DEFAULT_PATH]
+        if settings.GAZETTEER_EXTRA_PATH:
+            paths.append(Path(settings.GAZETTEER_EXTRA_PATH))
+        return paths
+
+    def _insert(self, key: str, rank, idx: int):
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            # Los sufijos se insertan en orden: si la entrada ya está, su rank es mejor
+            if any(i == idx for _, i in node.best):
+                continue
+            insort(node.best, (rank, idx))
+            del node.best[MAX_RESULTS:]
+
+    def load(self):
+        """(Re)construye el trie. Un archivo faltante o inválido se saltea con un warning."""
+        root, entries, seen = _Node(), [], set()
+        self._root = root
+        self._entries = entries
+        for path in (self._paths or self._default_paths()):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Gazetteer: no se pudo leer {path}: {e}")
+                continue
+            for item in data:
+                try:
+                    entry = {
+                        "label": item["label"],
+                        "value": item.get("value") or item["label"],
+                        "lat": float(item["lat"]),
+                        "lng": float(item["lng"]),
+                    }
+                except (KeyError, TypeError, ValueError):
+                    continue
+                key = normalize(entry["label"])
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                idx = len(entries)
+                entries.append(entry)
+                words = key.split(" ")
+                for position in range(len(words)):
+                    suffix = " ".join(words[position:])
+                    self._insert(suffix, (0 if position == 0 else 1, idx), idx)
+        self._kdtree = _KDTree([_unit_vector(e["lat"], e["lng"]) for e in entries])
+        logger.info(f"Gazetteer: {len(entries)} localidades cargadas")
+
+    def _ensure_loaded(self):
+        if self._root is None:
+            with self._lock:
+                if self._root is None:
+                    self.load()
+
+    def search(self, query: str, limit: int = 5) -> List[dict]:
+        """Localidades que empiezan con `query` (o alguna de sus palabras)."""
+        self._ensure_loaded()
+        key = normalize(query)
+        if not key:
+            return []
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [dict(self._entries[idx]) for _, idx in node.best[:min(limit, MAX_RESULTS)]]
+
+    def nearest(self, lat: float, lng: float) -> Optional[Tuple[dict, float]]:
+        """(localidad, distancia en km) más cercana a las coordenadas, o None si está vacío."""
+        self._ensure_loaded()
+        if not self._entries:
+            return None
+        idx, chord = self._kdtree.nearest(_unit_vector(lat, lng))
+        return dict(self._entries[idx]), _chord_to_km(chord)
+
+    def nearest_many(self, points: Sequence[Tuple[float, float]], max_km: Optional[float] = None) -> List[Optional[Tuple[dict, float]]]:
+        """
+        Versión por lotes de `nearest` (scripts de seed / verificación).
+        Con `max_km`, los puntos sin localidad a esa distancia devuelven None.
+        """
+        results = []
+        for lat, lng in points:
+            found = self.nearest(lat, lng)
+            if found is not None and max_km is not None and found[1] > max_km:
+                found = None
+            results.append(found)
+        return results
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._entries)
+
+
+# Instancia del proceso (se carga en la primera búsqueda)
+gazetteer = Gazetteer()
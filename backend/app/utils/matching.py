@@ -1,8 +1,20 @@
-from math import radians, cos, sin, asin, sqrt
+from math import radians, degrees, cos, sin, asin, sqrt, floor
+from collections import defaultdict
+import threading
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.models.ride import Ride, RideRequest
 from app.models.user import User
-from datetime import datetime, timedelta
+from app.utils.dates import parse_departure_time, parse_request_window
+from datetime import timedelta
+
+EARTH_RADIUS_KM = 6371
+# Grid cell size in degrees (~28 km of latitude). Close to the default 20 km
+# radius, so a lookup usually touches a 3x3 block of cells.
+GRID_CELL_DEG = 0.25
+# A ride matches a request if it leaves within the request window +/- 1 hour
+MATCH_TIME_TOLERANCE = timedelta(hours=1)
+
 
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
@@ -20,38 +32,186 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     dlat = lat2 - lat1 
     a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
     c = 2 * asin(sqrt(a)) 
-    r = 6371 # Radius of earth in kilometers. Use 3956 for miles
+    r = EARTH_RADIUS_KM # Radius of earth in kilometers. Use 3956 for miles
     return c * r
 
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Smallest lat/lng box containing every point within `radius_km`
+    (haversine) of (lat, lng). Returns (min_lat, max_lat, min_lng, max_lng).
+    """
+    delta = radius_km / EARTH_RADIUS_KM
+    dlat = degrees(delta)
+    min_lat, max_lat = lat - dlat, lat + dlat
+
+    # The circle touches a pole: every longitude is reachable.
+    if min_lat <= -90 or max_lat >= 90 or abs(sin(delta)) >= cos(radians(lat)):
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    dlng = degrees(asin(sin(delta) / cos(radians(lat))))
+    min_lng, max_lng = lng - dlng, lng + dlng
+    if min_lng < -180 or max_lng > 180:
+        # Crosses the antimeridian, keep it simple and scan every longitude.
+        min_lng, max_lng = -180.0, 180.0
+    return min_lat, max_lat, min_lng, max_lng
+
+
+class SpatialGridIndex:
+    """
+    In-process grid index over the origin and destination coordinates of a
+    model (Ride or RideRequest).
+
+    It only narrows the candidate set: callers still load the rows by id and
+    apply the exact distance/time checks, so a stale entry can never produce
+    a wrong match. Rows written by other processes are picked up by `sync`,
+    which loads anything above the highest id seen so far. Rows deleted at
+    the top of the table (or a table recreated empty) are dropped when
+    `sync` sees MAX(id) go below that mark.
+    """
+
+    def __init__(self, model, row_filter=None, cell_deg=GRID_CELL_DEG):
+        self.model = model
+        self.row_filter = row_filter
+        self.cell_deg = cell_deg
+        self._origin_cells = defaultdict(set)
+        self._dest_cells = defaultdict(set)
+        self._entries = {}  # id -> (origin_cell, dest_cell)
+        self._high_water = 0
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lng):
+        return (floor(lat / self.cell_deg), floor(lng / self.cell_deg))
+
+    def _cells_around(self, lat, lng, radius_km):
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+        lat_lo, lng_lo = self._cell(min_lat, min_lng)
+        lat_hi, lng_hi = self._cell(max_lat, max_lng)
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lng_lo, lng_hi + 1):
+                yield (i, j)
+
+    def _add(self, obj_id, origin_lat, origin_lng, dest_lat, dest_lng):
+        if None in (origin_lat, origin_lng, dest_lat, dest_lng):
+            # Without coordinates the distance is infinite: it can never match.
+            return
+        self._remove(obj_id)
+        origin_cell = self._cell(origin_lat, origin_lng)
+        dest_cell = self._cell(dest_lat, dest_lng)
+        self._origin_cells[origin_cell].add(obj_id)
+        self._dest_cells[dest_cell].add(obj_id)
+        self._entries[obj_id] = (origin_cell, dest_cell)
+
+    def _remove(self, obj_id):
+        cells = self._entries.pop(obj_id, None)
+        if cells is None:
+            return
+        origin_cell, dest_cell = cells
+        self._origin_cells[origin_cell].discard(obj_id)
+        self._dest_cells[dest_cell].discard(obj_id)
+
+    def add(self, obj):
+        """Index (or re-index) a freshly created row."""
+        with self._lock:
+            self._add(obj.id, obj.origin_lat, obj.origin_lng, obj.destination_lat, obj.destination_lng)
+
+    def remove(self, obj_id):
+        """Drop a cancelled/deleted row from the index."""
+        with self._lock:
+            # The high-water mark stays put: removing a row creates no unseen rows.
+            self._remove(obj_id)
+
+    def clear(self):
+        with self._lock:
+            self._origin_cells.clear()
+            self._dest_cells.clear()
+            self._entries.clear()
+            self._high_water = 0
+
+    def sync(self, db: Session):
+        """
+        Bring the index up to date with the table. Cheap when nothing changed:
+        a single MAX(id) over the primary key.
+        """
+        max_id = db.query(func.max(self.model.id)).scalar() or 0
+        with self._lock:
+            if max_id < self._high_water:
+                # The newest rows were deleted: drop them and lower the mark,
+                # since SQLite hands out those ids again. No rescan needed.
+                for obj_id in [i for i in self._entries if i > max_id]:
+                    self._remove(obj_id)
+                self._high_water = max_id
+                return
+            if max_id == self._high_water:
+                return
+
+            m = self.model
+            query = db.query(m.id, m.origin_lat, m.origin_lng, m.destination_lat, m.destination_lng).filter(
+                m.id > self._high_water,
+                m.id <= max_id
+            )
+            if self.row_filter is not None:
+                query = query.filter(self.row_filter())
+            for row in query:
+                self._add(*row)
+            self._high_water = max_id
+
+    def candidate_ids(self, db: Session, origin_lat, origin_lng, dest_lat, dest_lng, radius_km):
+        """
+        Ids whose origin AND destination fall in grid cells that may be within
+        `radius_km` of the given points.
+        """
+        if None in (origin_lat, origin_lng, dest_lat, dest_lng):
+            return set()
+        self.sync(db)
+        with self._lock:
+            by_origin = set()
+            for cell in self._cells_around(origin_lat, origin_lng, radius_km):
+                by_origin |= self._origin_cells.get(cell, set())
+            if not by_origin:
+                return set()
+            by_dest = set()
+            for cell in self._cells_around(dest_lat, dest_lng, radius_km):
+                by_dest |= self._dest_cells.get(cell, set())
+            return by_origin & by_dest
+
+
+# Índices del proceso. Se actualizan desde las rutas de rides/requests y se
+# sincronizan contra la base en cada búsqueda.
+ride_index = SpatialGridIndex(Ride, row_filter=lambda: Ride.status == 'active')
+request_index = SpatialGridIndex(RideRequest)
+
+
 def find_matches_for_ride(ride_data: Ride, db: Session, radius_km=20):
     """
     Find PASSENGER REQUESTS that match a DRIVER OFFER (Ride).
     """
     candidates = []
     
-    # 1. Filter by approximate time (same day)
-    # This is a naive filter, ideally we parse datetimes properly.
-    # ride.departure_timeStr = "YYYY-MM-DDTHH:MM"
-    ride_dt = datetime.fromisoformat(ride_data.departure_time)
+    # 1. Ride departure (UTC). The request time window check runs in SQL
+    # against the indexed window_start_at / window_end_at columns.
+    ride_dt = parse_departure_time(ride_data.departure_time)
+    if ride_dt is None:
+        return []
     
-    # Get all active requests
-    requests = db.query(RideRequest).all() # OPTIMIZE: Filter by date in SQL if possible
+    # Only requests in neighbouring grid cells can be within radius_km
+    candidate_ids = request_index.candidate_ids(
+        db,
+        ride_data.origin_lat, ride_data.origin_lng,
+        ride_data.destination_lat, ride_data.destination_lng,
+        radius_km
+    )
+    if not candidate_ids:
+        return []
+
+    # Ride Departure within Request Window (Tolerance: +/- 1 hour)
+    requests = db.query(RideRequest).filter(
+        RideRequest.id.in_(candidate_ids),
+        RideRequest.window_start_at <= ride_dt + MATCH_TIME_TOLERANCE,
+        RideRequest.window_end_at >= ride_dt - MATCH_TIME_TOLERANCE
+    ).order_by(RideRequest.id).all()
     
     for req in requests:
-        # Check Date Match
-        # req.date = "YYYY-MM-DD", req.time_window_start="HH:MM"
-        try:
-             req_dt_start = datetime.fromisoformat(f"{req.date}T{req.time_window_start}")
-             req_dt_end = datetime.fromisoformat(f"{req.date}T{req.time_window_end}")
-        except ValueError:
-            continue
-            
-        # Check if Ride Departure is within Request Window (or close enough)
-        # Tolerance: +/- 1 hour outside preferred window
-        tolerance = timedelta(hours=1)
-        if not (req_dt_start - tolerance <= ride_dt <= req_dt_end + tolerance):
-            continue
-            
         # Check Location Match (Origin AND Destination)
         dist_origin = haversine_distance(ride_data.origin_lat, ride_data.origin_lng, req.origin_lat, req.origin_lng)
         dist_dest = haversine_distance(ride_data.destination_lat, ride_data.destination_lng, req.destination_lat, req.destination_lng)
@@ -67,26 +227,31 @@ def find_matches_for_request(request_data: RideRequest, db: Session, radius_km=2
     """
     candidates = []
     
-    try:
-        req_dt_start = datetime.fromisoformat(f"{request_data.date}T{request_data.time_window_start}")
-        req_dt_end = datetime.fromisoformat(f"{request_data.date}T{request_data.time_window_end}")
-    except ValueError:
+    req_dt_start, req_dt_end = parse_request_window(
+        request_data.date, request_data.time_window_start, request_data.time_window_end
+    )
+    if req_dt_start is None:
         return []
 
-    # Get all active rides
-    rides = db.query(Ride).filter(Ride.status == 'active').all()
+    # Get active rides in neighbouring grid cells
+    candidate_ids = ride_index.candidate_ids(
+        db,
+        request_data.origin_lat, request_data.origin_lng,
+        request_data.destination_lat, request_data.destination_lng,
+        radius_km
+    )
+    if not candidate_ids:
+        return []
+
+    # Check Time in SQL (indexed departure_at range)
+    rides = db.query(Ride).filter(
+        Ride.id.in_(candidate_ids),
+        Ride.status == 'active',
+        Ride.departure_at >= req_dt_start - MATCH_TIME_TOLERANCE,
+        Ride.departure_at <= req_dt_end + MATCH_TIME_TOLERANCE
+    ).order_by(Ride.id).all()
     
     for ride in rides:
-        # Check Time
-        try:
-            ride_dt = datetime.fromisoformat(ride.departure_time)
-        except ValueError:
-            continue
-            
-        tolerance = timedelta(hours=1)
-        if not (req_dt_start - tolerance <= ride_dt <= req_dt_end + tolerance):
-            continue
-
         # Check Location
         dist_origin = haversine_distance(request_data.origin_lat, request_data.origin_lng, ride.origin_lat, ride.origin_lng)
         dist_dest = haversine_distance(request_data.destination_lat, request_data.destination_lng, ride.destination_lat, ride.destination_lng)
@@ -0,0 +1,34 @@
+"""
+Cursores opacos para paginación keyset sobre (timestamp, id).
+
+La página siguiente se pide con el (timestamp, id) de la última fila, en vez
+de OFFSET: el costo no crece con el número de página y no se saltean ni
+repiten filas si se insertan otras mientras tanto.
+"""
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    """Cursor para la página siguiente: (timestamp, id) de la última fila."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    raw = json.dumps({"t": timestamp.replace(tzinfo=None).isoformat(), "id": row_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, tz: Optional[timezone] = timezone.utc) -> Tuple[datetime, int]:
+    """
+    Inverso de `encode_cursor`. El timestamp vuelve en UTC: con zona (`tz`)
+    o naive si `tz` es None (columnas DateTime sin zona). Lanza 400 si el
+    cursor no es válido.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        timestamp = datetime.fromisoformat(data["t"])
+        return timestamp.replace(tzinfo=tz), int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
@@ -0,0 +1,46 @@
+import sys
+import os
+
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+import app.models  # registra todos los modelos
+from app.models.audit import AuditArchive
+from app.services.audit_retention_service import AuditRetentionService
+
+
+def main():
+    """
+    Uso:
+        python scripts/audit_archive.py                 -> archiva los meses vencidos (AUDIT_RETENTION_DAYS)
+        python scripts/audit_archive.py --list          -> lista los archivos
+        python scripts/audit_archive.py --cat 2025-03   -> imprime los eventos archivados de ese mes (JSONL)
+    """
+    db = SessionLocal()
+    try:
+        if "--list" in sys.argv:
+            archives = db.query(AuditArchive).order_by(AuditArchive.month, AuditArchive.id).all()
+            for a in archives:
+                print(f"{a.month} rows={a.rows} ids={a.min_id}-{a.max_id} {a.path}")
+            print(f"{len(archives)} archives.")
+            return
+
+        if "--cat" in sys.argv:
+            month = sys.argv[sys.argv.index("--cat") + 1]
+            import json
+            for a in db.query(AuditArchive).filter(AuditArchive.month == month).order_by(AuditArchive.id):
+                for event in AuditRetentionService.read_archive(a.path):
+                    print(json.dumps(event, ensure_ascii=False))
+            return
+
+        archives = AuditRetentionService.run(db)
+        for a in archives:
+            print(f"🗄️ {a.month}: {a.rows} events -> {a.path}")
+        print(f"✅ Done. {len(archives)} months archived.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de arranque en frío: cuánto tarda `import app.main` (crear tablas +
+migraciones + armar la app) en un proceso nuevo, y cuántos viajes a la base
+hace.
+
+Primero se arranca una vez sobre una base SQLite vacía (crea el esquema) y
+después se miden --runs arranques sobre esa base ya al día, que es el caso de
+Render al despertar una instancia dormida. Con --db-latency-ms se suma una
+espera por cada sentencia / commit / rollback para simular una base remota.
+
+--backend-dir permite medir otro checkout (p. ej. el commit anterior, con
+`git worktree add`) con el mismo script.
+
+Uso:
+    python scripts/bench_cold_start.py --runs 5 --db-latency-ms 5
+    python scripts/bench_cold_start.py --backend-dir /tmp/yoviajo-before/backend --db-latency-ms 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Corre en el proceso hijo, antes de importar la app
+DRIVER = """
+import json, os, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+delay = float(os.environ.get("BENCH_DB_LATENCY_MS", "0")) / 1000
+counts = {"round_trips": 0}
+
+def _round_trip(*args, **kwargs):
+    counts["round_trips"] += 1
+    if delay:
+        time.sleep(delay)
+
+for name in ("before_cursor_execute", "commit", "rollback"):
+    event.listen(Engine, name, _round_trip)
+
+started = time.perf_counter()
+import app.main
+counts["startup_ms"] = (time.perf_counter() - started) * 1000
+print("BENCH " + json.dumps(counts))
+"""
+
+
+def start_once(backend_dir, db_path, latency_ms):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", BACKGROUND_WORKERS_ENABLED="false",
+               BENCH_DB_LATENCY_MS=str(latency_ms))
+    out = subprocess.run([sys.executable, "-c", DRIVER], cwd=backend_dir, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    line = next(l for l in reversed(out.splitlines()) if l.startswith("BENCH "))
+    return json.loads(line[len("BENCH "):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque en frío de la API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Espera por viaje a la base")
+    parser.add_argument("--backend-dir", default=BACKEND_DIR)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="yoviajo-cold-"), "cold.db")
+    first = start_once(args.backend_dir, db_path, args.db_latency_ms)
+    runs = [start_once(args.backend_dir, db_path, args.db_latency_ms) for _ in range(args.runs)]
+    times = [r["startup_ms"] for r in runs]
+
+    print(f"🧊 {args.backend_dir}")
+    print(f"   db latency {args.db_latency_ms:.0f} ms per round trip, {args.runs} runs")
+    print(f"   empty db:   {first['startup_ms']:.0f} ms, {first['round_trips']} round trips")
+    print(f"   current db: median {statistics.median(times):.0f} ms (min {min(times):.0f}, max {max(times):.0f}), "
+          f"{runs[-1]['round_trips']} round trips")
+
+
+if __name__ == "__main__":
+    main()
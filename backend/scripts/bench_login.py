@@ -0,0 +1,133 @@
+"""
+Benchmark de login con distintos tamaños del pool de bcrypt.
+
+Para cada valor de --pool-sizes levanta la API (un worker de uvicorn, en un
+proceso aparte) con PASSWORD_HASH_WORKERS=n sobre la misma base SQLite ya
+sembrada, dispara una ráfaga de logins y, en paralelo, mide la latencia de
+un endpoint barato (GET /) para ver si el resto de la API sigue respondiendo.
+
+Uso:
+    python scripts/bench_login.py --users 50 --logins 300 --concurrency 50 --rounds 12 --pool-sizes 1 2 4 8
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load_payment_flow import percentile
+
+PASSWORD = "bench-password"
+
+
+def seed(db_path, n_users, rounds):
+    """Base con `n_users` usuarios activos (hash con `rounds`). Se siembra una sola vez."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["BACKGROUND_WORKERS_ENABLED"] = "false"
+    import app.main  # crea las tablas
+    from app.core.password_hasher import PasswordHasher
+    from app.database import SessionLocal
+    from app.models.user import User
+
+    hashed = PasswordHasher(rounds=rounds, max_workers=1).hash(PASSWORD)
+    db = SessionLocal()
+    try:
+        db.add_all([
+            User(dni=str(30000000 + i), email=f"u{i}@example.com", name=f"User {i}", hashed_password=hashed, is_active=True)
+            for i in range(n_users)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def burst(url, n_logins, n_users, concurrency):
+    import httpx
+    logins, probes = [], []
+    status = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def login(i):
+            async with semaphore:
+                started = time.perf_counter()
+                res = await client.post("/api/login", json={"dni": str(30000000 + i % n_users), "password": PASSWORD})
+                status[res.status_code] = status.get(res.status_code, 0) + 1
+                if res.status_code == 200:
+                    logins.append((time.perf_counter() - started) * 1000)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/")
+                probes.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.05)
+
+        prober = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(n_logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+    return logins, probes, status, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput de login según el tamaño del pool de bcrypt")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queue-max", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="yoviajo-login-")
+    seeded = os.path.join(tmpdir, "seed.db")
+    seed(seeded, args.users, args.rounds)
+    url = f"http://127.0.0.1:{args.port}"
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    import httpx
+    print(f"🔐 {args.logins} logins, concurrency {args.concurrency}, bcrypt rounds {args.rounds}, "
+          f"queue {args.queue_max}, {os.cpu_count()} CPUs")
+    print(f"{'pool':>5}{'login/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'503s':>7}{'GET / p95':>11}")
+    for pool_size in args.pool_sizes:
+        db_path = os.path.join(tmpdir, f"pool{pool_size}.db")
+        shutil.copy(seeded, db_path)
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", BACKGROUND_WORKERS_ENABLED="false",
+                   PASSWORD_HASH_ROUNDS=str(args.rounds), PASSWORD_HASH_WORKERS=str(pool_size),
+                   PASSWORD_HASH_QUEUE_MAX=str(args.queue_max))
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.port),
+             "--workers", "1", "--log-level", "warning"],
+            cwd=backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            for _ in range(100):
+                try:
+                    httpx.get(url).raise_for_status()
+                    break
+                except httpx.HTTPError:
+                    time.sleep(0.2)
+            logins, probes, status, elapsed = asyncio.run(burst(url, args.logins, args.users, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{pool_size:>5}{len(logins) / elapsed:>10.1f}{percentile(logins, 50):>10.0f}{percentile(logins, 95):>10.0f}"
+              f"{status.get(503, 0):>7}{percentile(probes, 95):>11.0f}")
+        others = {code: n for code, n in status.items() if code not in (200, 503)}
+        if others:
+            print(f"      other statuses: {others}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Servidor falso de MercadoPago para pruebas locales y de carga.
+
+Implementa los endpoints que usa PaymentService:
+    POST /checkout/preferences       -> crear preferencia
+    GET  /v1/payments/{id}           -> consultar pago
+    GET  /v1/payments/search         -> buscar pagos (external_reference, rango de fechas, paginado)
+
+Y algunos de control (sin latencia ni errores inyectados):
+    GET  /checkout/{preference_id}   -> "pagar" desde el navegador (redirige al back_url)
+    POST /fake/pay/{preference_id}   -> crea un pago aprobado y dispara el webhook
+    GET  /fake/stats                 -> contadores
+
+Uso:
+    python scripts/fake_mercadopago.py --port 8090 --latency-ms 150 --error-rate 0.02 \\
+        --webhook-url http://localhost:8000/api/payment/webhook
+
+y la API con MP_API_BASE_URL=http://localhost:8090.
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse
+
+
+class FakeMercadoPagoConfig:
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, webhook_url=None,
+                 webhook_delay_ms=0.0, webhook_duplicates=1, public_url="http://localhost:8090"):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.webhook_url = webhook_url
+        self.webhook_delay_ms = webhook_delay_ms
+        self.webhook_duplicates = webhook_duplicates  # MercadoPago suele notificar más de una vez
+        self.public_url = public_url
+
+
+def _mp_date(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "-00:00"
+
+
+def _parse_mp_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def create_app(config: FakeMercadoPagoConfig) -> FastAPI:
+    app = FastAPI(title="Fake MercadoPago")
+    app.state.config = config
+    preferences, payments = {}, {}
+    payment_ids = itertools.count(9_000_000_001)
+    stats = Counter()
+    lock = threading.Lock()
+    webhook_tasks = set()
+
+    async def simulate_network(endpoint: str):
+        """Latencia + errores aleatorios. Retorna una respuesta de error o None."""
+        stats[endpoint] += 1
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            stats[f"{endpoint}_errors"] += 1
+            return JSONResponse(status_code=500, content={"message": "fake internal error", "status": 500})
+        return None
+
+    async def send_webhooks(payment_id: int):
+        await asyncio.sleep(config.webhook_delay_ms / 1000)
+        async with httpx.AsyncClient(timeout=10) as client:
+            for _ in range(config.webhook_duplicates):
+                try:
+                    await client.post(config.webhook_url, params={"topic": "payment", "id": str(payment_id)})
+                    stats["webhooks_sent"] += 1
+                except httpx.HTTPError:
+                    stats["webhooks_failed"] += 1
+
+    def pay(preference_id: str, status: str = "approved") -> Optional[dict]:
+        preference = preferences.get(preference_id)
+        if preference is None:
+            return None
+        now = datetime.utcnow()
+        item = (preference.get("items") or [{}])[0]
+        with lock:
+            payment = {
+                "id": next(payment_ids),
+                "status": status,
+                "status_detail": "accredited" if status == "approved" else status,
+                "external_reference": preference.get("external_reference"),
+                "transaction_amount": item.get("unit_price", 0.0),
+                "currency_id": item.get("currency_id", "ARS"),
+                "description": item.get("title"),
+                "payer": preference.get("payer", {}),
+                "date_created": _mp_date(now),
+                "date_last_updated": _mp_date(now),
+                "_updated": now,
+            }
+            payments[payment["id"]] = payment
+        if config.webhook_url:
+            task = asyncio.create_task(send_webhooks(payment["id"]))
+            webhook_tasks.add(task)
+            task.add_done_callback(webhook_tasks.discard)
+        return payment
+
+    def public(payment: dict) -> dict:
+        return {k: v for k, v in payment.items() if not k.startswith("_")}
+
+    # --- API de MercadoPago ---------------------------------------------------
+
+    @app.post("/checkout/preferences")
+    async def create_preference(request: Request):
+        error = await simulate_network("preferences")
+        if error:
+            return error
+        body = await request.json()
+        preference_id = f"fake-{uuid.uuid4().hex[:16]}"
+        init_point = f"{config.public_url}/checkout/{preference_id}"
+        preferences[preference_id] = dict(body, id=preference_id, init_point=init_point)
+        return JSONResponse(status_code=201, content={
+            "id": preference_id,
+            "init_point": init_point,
+            "sandbox_init_point": init_point,
+            "external_reference": body.get("external_reference"),
+        })
+
+    @app.get("/v1/payments/search")
+    async def search_payments(request: Request):
+        error = await simulate_network("search")
+        if error:
+            return error
+        params = request.query_params
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 30))
+        begin = _parse_mp_date(params.get("begin_date"))
+        end = _parse_mp_date(params.get("end_date"))
+        results = [
+            p for p in payments.values()
+            if (not params.get("status") or p["status"] == params["status"])
+            and (not params.get("external_reference") or p["external_reference"] == params["external_reference"])
+            and (begin is None or p["_updated"] >= begin)
+            and (end is None or p["_updated"] <= end)
+        ]
+        results.sort(key=lambda p: p["_updated"], reverse=params.get("criteria") == "desc")
+        return {
+            "results": [public(p) for p in results[offset:offset + limit]],
+            "paging": {"total": len(results), "offset": offset, "limit": limit},
+        }
+
+    @app.get("/v1/payments/{payment_id}")
+    async def get_payment(payment_id: int):
+        error = await simulate_network("payments")
+        if error:
+            return error
+        payment = payments.get(payment_id)
+        if payment is None:
+            return JSONResponse(status_code=404, content={"message": "Payment not found", "status": 404})
+        return public(payment)
+
+    # --- Control -----------------------------------------------------------
+
+    @app.get("/checkout/{preference_id}")
+    async def checkout(preference_id: str):
+        payment = pay(preference_id)
+        if payment is None:
+            return JSONResponse(status_code=404, content={"message": "Preference not found"})
+        back_url = (preferences[preference_id].get("back_urls") or {}).get("success")
+        if back_url:
+            return RedirectResponse(back_url)
+        return public(payment)
+
+    @app.post("/fake/pay/{preference_id}")
+    async def fake_pay(preference_id: str, status: str = "approved"):
+        payment = pay(preference_id, status)
+        if payment is None:
+            return JSONResponse(status_code=404, content={"message": "Preference not found"})
+        return public(payment)
+
+    @app.get("/fake/stats")
+    async def fake_stats():
+        return dict(stats, preferences=len(preferences), payments=len(payments))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor falso de MercadoPago")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500 (0-1)")
+    parser.add_argument("--webhook-url", default=None, help="p. ej. http://localhost:8000/api/payment/webhook")
+    parser.add_argument("--webhook-delay-ms", type=float, default=0.0)
+    parser.add_argument("--webhook-duplicates", type=int, default=1)
+    args = parser.parse_args()
+
+    import uvicorn
+    config = FakeMercadoPagoConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        webhook_url=args.webhook_url, webhook_delay_ms=args.webhook_delay_ms,
+        webhook_duplicates=args.webhook_duplicates, public_url=f"http://{args.host}:{args.port}"
+    )
+    print(f"🧪 Fake MercadoPago on http://{args.host}:{args.port}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Prueba de carga del circuito reserva -> pago -> reserva confirmada.
+
+Levanta en el mismo proceso el servidor falso de MercadoPago
+(scripts/fake_mercadopago.py) y la API (con sus workers), sobre una base
+SQLite temporal, y corre N reservas con C en paralelo:
+
+    1. POST /api/bookings/                    (reserva)
+    2. GET  /api/bookings/{id}/payment        (hasta que el link esté listo: outbox)
+    3. POST /fake/pay/{preference_id}         (el pasajero paga -> webhook)
+    4. POST /api/payment/check/{id}           (hasta que la reserva figure pagada)
+
+Reporta p50/p95/p99 de cada etapa y del total.
+
+Uso:
+    python scripts/load_payment_flow.py --bookings 200 --concurrency 20 \\
+        --mp-latency-ms 150 --mp-jitter-ms 100 --mp-error-rate 0.02 --webhook-duplicates 3
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ("booking", "link_ready", "pay", "confirmed", "total")
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def start_server(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def seed(n_bookings):
+    """Un conductor, un viaje con lugar para todos y un pasajero por reserva."""
+    from datetime import datetime, timedelta
+    from app.database import SessionLocal
+    from app.models.user import User
+    from app.models.ride import Ride
+    from app.auth import create_access_token
+
+    db = SessionLocal()
+    try:
+        driver = User(dni="10000000", email="driver@load.test", name="Load Driver", hashed_password="x", is_active=True)
+        passengers = [
+            User(dni=str(20000000 + i), email=f"p{i}@load.test", name=f"Pasajero {i}", hashed_password="x", is_active=True)
+            for i in range(n_bookings)
+        ]
+        db.add_all([driver] + passengers)
+        db.commit()
+        ride = Ride(origin="Córdoba", destination="Rosario", departure_time=(datetime.now() + timedelta(days=3)).strftime("%Y-%m-%dT%H:%M"),
+                    price=15000, available_seats=n_bookings, driver_id=driver.id, status="active")
+        db.add(ride)
+        db.commit()
+        tokens = [create_access_token(data={"sub": p.dni, "id": p.id}) for p in passengers]
+        return ride.id, tokens
+    finally:
+        db.close()
+
+
+async def poll(fn, done, timeout, interval):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        result = await fn()
+        if done(result):
+            return result
+        await asyncio.sleep(interval)
+    raise TimeoutError
+
+
+async def one_flow(api, mp, ride_id, token, args):
+    headers = {"Authorization": f"Bearer {token}"}
+    timings = {}
+    t0 = time.perf_counter()
+
+    res = await api.post("/api/bookings/", json={"ride_id": ride_id, "seats_booked": 1}, headers=headers)
+    res.raise_for_status()
+    booking_id = res.json()["id"]
+    t1 = time.perf_counter()
+    timings["booking"] = t1 - t0
+
+    async def payment_link():
+        r = await api.get(f"/api/bookings/{booking_id}/payment", headers=headers)
+        return r.json() if r.status_code == 200 else {}
+
+    link = await poll(payment_link, lambda d: d.get("status") in ("ready", "failed"), args.timeout, args.poll_interval)
+    if link["status"] != "ready":
+        raise RuntimeError(f"preference failed for booking {booking_id}")
+    t2 = time.perf_counter()
+    timings["link_ready"] = t2 - t1
+
+    preference_id = link["init_point"].rsplit("/", 1)[-1]
+    (await mp.post(f"/fake/pay/{preference_id}")).raise_for_status()
+    t3 = time.perf_counter()
+    timings["pay"] = t3 - t2
+
+    async def check():
+        r = await api.post(f"/api/payment/check/{booking_id}")
+        return r.json() if r.status_code == 200 else {}
+
+    await poll(check, lambda d: d.get("status") == "paid", args.timeout, args.poll_interval)
+    t4 = time.perf_counter()
+    timings["confirmed"] = t4 - t3
+    timings["total"] = t4 - t0
+    return timings
+
+
+async def run_load(api_url, mp_url, ride_id, tokens, args):
+    import httpx
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results, errors = [], []
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=30, limits=limits) as api, \
+            httpx.AsyncClient(base_url=mp_url, timeout=30, limits=limits) as mp:
+        async def guarded(token):
+            async with semaphore:
+                try:
+                    results.append(await one_flow(api, mp, ride_id, token, args))
+                except Exception as e:
+                    errors.append(repr(e))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(guarded(token) for token in tokens))
+        elapsed = time.perf_counter() - started
+    return results, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga del circuito reserva -> pago -> confirmación")
+    parser.add_argument("--bookings", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mp-latency-ms", type=float, default=150.0)
+    parser.add_argument("--mp-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--mp-error-rate", type=float, default=0.0)
+    parser.add_argument("--webhook-delay-ms", type=float, default=200.0)
+    parser.add_argument("--webhook-duplicates", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Máximo por etapa (s)")
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--api-port", type=int, default=8765)
+    parser.add_argument("--mp-port", type=int, default=8766)
+    args = parser.parse_args()
+
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    mp_url = f"http://127.0.0.1:{args.mp_port}"
+    tmpdir = tempfile.mkdtemp(prefix="yoviajo-load-")
+
+    # Antes de importar la app: base temporal, MercadoPago falso, workers rápidos
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'load.db')}"
+    os.environ["MP_API_BASE_URL"] = mp_url
+    os.environ["MP_ACCESS_TOKEN"] = "TEST-FAKE-TOKEN"
+    os.environ["BACKGROUND_WORKERS_ENABLED"] = "true"
+    os.environ.setdefault("PAYMENT_OUTBOX_INTERVAL_SECONDS", "1")
+    os.environ.setdefault("PAYMENT_WEBHOOK_INTERVAL_SECONDS", "1")
+
+    from fake_mercadopago import FakeMercadoPagoConfig, create_app
+    from app.main import app
+    import logging
+    logging.disable(logging.INFO)
+
+    fake_config = FakeMercadoPagoConfig(
+        latency_ms=args.mp_latency_ms, jitter_ms=args.mp_jitter_ms, error_rate=args.mp_error_rate,
+        webhook_url=f"{api_url}/api/payment/webhook", webhook_delay_ms=args.webhook_delay_ms,
+        webhook_duplicates=args.webhook_duplicates, public_url=mp_url
+    )
+    mp_server, _ = start_server(create_app(fake_config), args.mp_port)
+    api_server, _ = start_server(app, args.api_port)
+
+    ride_id, tokens = seed(args.bookings)
+    print(f"🚦 {args.bookings} bookings, concurrency {args.concurrency}, MP latency "
+          f"{args.mp_latency_ms:.0f}+{args.mp_jitter_ms:.0f}ms, error rate {args.mp_error_rate:.0%}, "
+          f"{args.webhook_duplicates} webhook deliveries per payment")
+
+    results, errors, elapsed = asyncio.run(run_load(api_url, mp_url, ride_id, tokens, args))
+
+    api_server.should_exit = True
+    mp_server.should_exit = True
+
+    print(f"\n✅ {len(results)} confirmed, ❌ {len(errors)} failed in {elapsed:.1f}s "
+          f"({len(results) / elapsed:.1f} flows/s)")
+    print(f"{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage in STAGES:
+        values = [r[stage] * 1000 for r in results]
+        print(f"{stage:<12}{percentile(values, 50):>10.0f}{percentile(values, 95):>10.0f}"
+              f"{percentile(values, 99):>10.0f}{max(values, default=float('nan')):>10.0f}")
+    for error in errors[:10]:
+        print(f"   {error}")
+    print(f"\nDB: {os.environ['DATABASE_URL']}")
+
+
+if __name__ == "__main__":
+    main()
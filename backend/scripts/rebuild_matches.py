@@ -0,0 +1,39 @@
+import sys
+import os
+
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+import app.models  # registra todos los modelos
+from app.services.match_service import MatchService
+
+
+def main():
+    """
+    Uso:
+        python scripts/rebuild_matches.py          -> reconstruye la tabla
+        python scripts/rebuild_matches.py --check  -> solo verifica consistencia
+    """
+    db = SessionLocal()
+    try:
+        if "--check" in sys.argv:
+            print("🔍 Checking ride_request_matches against the matching engine...")
+            report = MatchService.check_consistency(db)
+            print(f"   Expected: {report['expected']} | Stored: {report['stored']}")
+            if report["consistent"]:
+                print("✅ Match table is consistent.")
+            else:
+                print(f"❌ Missing: {len(report['missing'])} {report['missing'][:20]}")
+                print(f"❌ Extra:   {len(report['extra'])} {report['extra'][:20]}")
+                sys.exit(1)
+        else:
+            print("🛠️ Rebuilding ride_request_matches...")
+            total = MatchService.rebuild(db)
+            print(f"✅ Done. {total} matches stored.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
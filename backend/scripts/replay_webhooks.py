@@ -0,0 +1,47 @@
+import sys
+import os
+
+# Add parent directory to path so we can import app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal
+import app.models  # registra todos los modelos
+from app.models.payment import PaymentWebhookEvent
+from app.services.payment_webhook_service import PaymentWebhookService
+
+
+def main():
+    """
+    Uso:
+        python scripts/replay_webhooks.py --list        -> lista los eventos 'failed'
+        python scripts/replay_webhooks.py               -> reprocesa todos los 'failed'
+        python scripts/replay_webhooks.py 12 15 20      -> reprocesa esos eventos (cualquier estado)
+    """
+    db = SessionLocal()
+    try:
+        if "--list" in sys.argv:
+            events = db.query(PaymentWebhookEvent).filter(
+                PaymentWebhookEvent.status == "failed"
+            ).order_by(PaymentWebhookEvent.id).all()
+            for e in events:
+                print(f"#{e.id} payment={e.resource_id} attempts={e.attempts} deliveries={e.deliveries} error={e.last_error}")
+            print(f"{len(events)} failed events.")
+            return
+
+        event_ids = [int(arg) for arg in sys.argv[1:] if arg.isdigit()]
+        count = PaymentWebhookService.replay(db, event_ids or None)
+        print(f"🔁 Requeued {count} events. Processing...")
+        processed = 0
+        while True:
+            taken = PaymentWebhookService.process_batch(db)
+            processed += taken
+            if not taken:
+                break
+        failed = db.query(PaymentWebhookEvent).filter(PaymentWebhookEvent.status == "failed").count()
+        print(f"✅ Done. {processed} events processed, {failed} still failed.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
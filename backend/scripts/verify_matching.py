@@ -1,6 +1,12 @@
 from app.utils.matching import haversine_distance, find_matches_for_ride
+from app.utils import batch_matching
+from app.utils.gazetteer import gazetteer
+from app.database import Base
+from app.models.ride import RideRequest
 from datetime import datetime
-from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # Mock Objects to simulate DB results
 class MockRequest:
@@ -16,6 +22,7 @@ class MockRequest:
 
 class MockRide:
     def __init__(self, origin_lat, origin_lng, dest_lat, dest_lng, dt):
+        self.id = 1
         self.origin_lat = origin_lat
         self.origin_lng = origin_lng
         self.destination_lat = dest_lat
@@ -50,13 +57,36 @@ req3 = MockRequest(3, CBA_LAT, CBA_LNG, VCP_LAT, VCP_LNG, "2023-10-26", "09:00",
 # Request 4: Near Origin (within 20km) - Should Match
 req4 = MockRequest(4, NEAR_CBA_LAT, NEAR_CBA_LNG, VCP_LAT, VCP_LNG, "2023-10-27", "09:00", "11:00")
 
-# Mock DB
-mock_db = MagicMock()
-mock_db.query.return_value.all.return_value = [req1, req2, req3, req4]
+# DB en memoria (el matcher consulta un índice espacial + la tabla de requests)
+engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+Base.metadata.create_all(bind=engine)
+db = sessionmaker(bind=engine)()
+for r in [req1, req2, req3, req4]:
+    db.add(RideRequest(
+        id=r.id,
+        origin_lat=r.origin_lat, origin_lng=r.origin_lng,
+        destination_lat=r.destination_lat, destination_lng=r.destination_lng,
+        date=r.date, time_window_start=r.time_window_start, time_window_end=r.time_window_end
+    ))
+db.commit()
 
 # Run Matcher
 print("\n--- Running Matcher ---")
-matches = find_matches_for_ride(ride, mock_db, radius_km=20)
+matches = find_matches_for_ride(ride, db, radius_km=20)
 print(f"Found {len(matches)} matches (Expected 2: req1 and req4)")
 for m in matches:
     print(f" - Matched Request ID: {m.id}")
+
+# Batch Matcher (mismo motor que /api/matches y /api/rides/me)
+engine_name = "numpy" if batch_matching.np is not None else "python"
+batch = batch_matching.find_matches_for_rides([ride], db, radius_km=20)
+print(f"\n--- Batch Matcher ({engine_name}) ---")
+print(f"Found {len(batch[ride.id])} matches: {[m.id for m in batch[ride.id]]}")
+assert [m.id for m in batch[ride.id]] == [m.id for m in matches], "Batch matcher disagrees with single matcher"
+
+# Reverse geocoding local (KD-tree sobre el gazetteer)
+print("\n--- Reverse Geocoding (gazetteer) ---")
+points = [(CBA_LAT, CBA_LNG), (VCP_LAT, VCP_LNG), (AG_LAT, AG_LNG), (NEAR_CBA_LAT, NEAR_CBA_LNG)]
+for (lat, lng), found in zip(points, gazetteer.nearest_many(points, max_km=5)):
+    label = f"{found[0]['label']} ({found[1]:.2f} km)" if found else "sin localidad cercana"
+    print(f" - ({lat}, {lng}) -> {label}")
@@ -1,30 +1,70 @@
+import os
+# Antes de importar la app: sin esperas en la cola de Nominatim (los tests del
+# dispatcher crean su propia instancia con la tasa que necesitan)
+os.environ.setdefault("GEOCODE_UPSTREAM_RATE", "1000")
+# Sin threads en segundo plano: los tests llaman a los servicios directamente
+os.environ.setdefault("BACKGROUND_WORKERS_ENABLED", "false")
+# bcrypt con el costo mínimo: los tests no miden seguridad
+os.environ.setdefault("PASSWORD_HASH_ROUNDS", "4")
+
 
 import pytest
-from sqlalchemy import create_engine
+import random
+import asyncio
+import httpx
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 from app.main import app
-from app.database import get_db, Base
-from app.api.deps import get_current_user
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from app.database import get_db, get_async_db, async_url, Base
+from app.api.deps import get_current_user, principal_cache
+from app.models.user import User
+from app.models.ride import Ride, RideRequest
+from app.utils.matching import ride_index, request_index
+from app.services.geocode_service import GeocodeService
+from app.core.http import set_http_client, close_http_client
 
 # 1. Base de Datos de Prueba (En Memoria - Se borra al terminar)
-# Usamos SQLite en memoria para velocidad y aislamiento
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Usamos SQLite en memoria para velocidad y aislamiento. Es una base
+# compartida (cache=shared) para que el motor async de las rutas `async def`
+# vea lo mismo que la sesión sync de los tests.
+SQLALCHEMY_DATABASE_URL = "sqlite:///file:yoviajo_test?mode=memory&cache=shared&uri=true"
+
+
+def _read_uncommitted(dbapi_connection, connection_record):
+    # En cache compartida una lectura abierta bloquearía las escrituras de la otra conexión
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA read_uncommitted = 1")
+    cursor.close()
+
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
     poolclass=StaticPool, # Necesario para SQLite en memoria
 )
+event.listen(engine, "connect", _read_uncommitted)
+
+async_engine = create_async_engine(async_url(SQLALCHEMY_DATABASE_URL), poolclass=StaticPool)
+event.listen(async_engine.sync_engine, "connect", _read_uncommitted)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # 2. Fixture de Base de Datos
 @pytest.fixture(scope="function")
 def db_session():
     # Crear tablas
     Base.metadata.create_all(bind=engine)
+    # Los índices espaciales viven en memoria: empezar limpios en cada test
+    ride_index.clear()
+    request_index.clear()
+    GeocodeService.reset()
+    # Los ids se reusan entre tests: el usuario cacheado de otro test no sirve
+    principal_cache.clear()
     
     session = TestingSessionLocal()
     try:
@@ -44,7 +84,12 @@ def client(db_session):
         finally:
             db_session.close()
             
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     
     # Crear cliente
     with TestClient(app) as c:
@@ -52,3 +97,76 @@ def client(db_session):
         
     # Limpiar overrides
     app.dependency_overrides.clear()
+
+
+# 4. Datos sintéticos para matching (viajes y solicitudes alrededor de Córdoba)
+@pytest.fixture(scope="function")
+def seed_matching_data(db_session):
+    def seed(n_rides=40, n_requests=120):
+        rng = random.Random(42)
+        users = [User(dni=str(30000000 + i), email=f"u{i}@test.com", name=f"U{i}", hashed_password="x") for i in range(2)]
+        db_session.add_all(users)
+        db_session.commit()
+
+        base = datetime(2030, 5, 10, 8, 0)
+        center_lat, center_lng = -31.4201, -64.1888
+
+        def point():
+            return center_lat + rng.uniform(-0.6, 0.6), center_lng + rng.uniform(-0.6, 0.6)
+
+        for i in range(n_rides):
+            (olat, olng), (dlat, dlng) = point(), point()
+            dep = base + timedelta(minutes=rng.randint(0, 6 * 60))
+            db_session.add(Ride(
+                origin="A", destination="B", departure_time=dep.strftime("%Y-%m-%dT%H:%M"),
+                price=100, available_seats=3, status="cancelled" if i % 7 == 0 else "active",
+                origin_lat=olat, origin_lng=olng, destination_lat=dlat, destination_lng=dlng,
+                driver_id=users[0].id
+            ))
+        for i in range(n_requests):
+            (olat, olng), (dlat, dlng) = point(), point()
+            start = base + timedelta(minutes=rng.randint(0, 6 * 60))
+            db_session.add(RideRequest(
+                origin="A", destination="B", date=start.strftime("%Y-%m-%d"),
+                time_window_start=start.strftime("%H:%M"),
+                time_window_end=(start + timedelta(hours=1)).strftime("%H:%M") if i % 11 else None,
+                origin_lat=olat, origin_lng=olng, destination_lat=dlat, destination_lng=dlng,
+                passenger_id=users[1].id
+            ))
+        db_session.commit()
+    return seed
+
+
+# 5. Contador de consultas SQL (para presupuestos de queries por endpoint)
+@pytest.fixture(scope="function")
+def count_queries(db_session):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # Rutas sync y async (mismo listener en los dos motores)
+    engines = (engine, async_engine.sync_engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", before_cursor_execute)
+
+
+# 6. Cliente HTTP compartido con transporte simulado (Nominatim, etc.)
+@pytest.fixture(scope="function")
+def mock_http():
+    """
+    `mock_http(handler)` reemplaza el cliente HTTP compartido por uno con
+    httpx.MockTransport. Al terminar el test se cierra y se restaura, para
+    que el mock no pase a los tests siguientes.
+    """
+    def install(handler):
+        set_http_client(httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    yield install
+    asyncio.run(close_http_client())
+    set_http_client(None)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from app.api.deps import get_current_user
+from app.main import app
+from app.models.booking import Booking
+from app.models.ride import Ride
+from app.models.user import User
+
+
+def _seed(session):
+    driver = User(dni="80000000", email="drv@async.com", name="Driver Async", hashed_password="x",
+                  phone="3510000000", is_active=True)
+    passenger = User(dni="80000001", email="pax@async.com", name="Pax Async", hashed_password="x", is_active=True)
+    session.add_all([driver, passenger])
+    session.commit()
+    rides = []
+    for days in (2, -3):
+        departure = (datetime.now() + timedelta(days=days)).strftime("%Y-%m-%dT%H:%M")
+        rides.append(Ride(origin="Córdoba", destination=f"Destino {days}", departure_time=departure, price=100,
+                          available_seats=3, seats_taken=1, driver_id=driver.id, status="active"))
+    session.add_all(rides)
+    session.commit()
+    session.add_all([
+        Booking(ride_id=rides[0].id, passenger_id=passenger.id, seats_booked=1, status="confirmed", payment_status="paid"),
+        Booking(ride_id=rides[1].id, passenger_id=passenger.id, seats_booked=1, status="confirmed", payment_status="paid"),
+    ])
+    session.commit()
+    return passenger.id
+
+
+def test_my_bookings_loads_ride_and_driver_in_one_query(client, db_session, count_queries):
+    passenger_id = _seed(db_session)
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, passenger_id)
+
+    count_queries.clear()
+    res = client.get("/api/bookings/me")
+    assert res.status_code == 200
+    [booking] = res.json()
+    assert booking["ride_destination"] == "Destino 2"
+    assert booking["driver_name"] == "Driver Async"
+    assert booking["driver_phone"] == "3510000000"  # pagada: contacto visible
+    assert len([q for q in count_queries if "FROM bookings" in q]) == 1
+
+    [past] = client.get("/api/bookings/me", params={"history": True}).json()
+    assert past["ride_destination"] == "Destino -3"
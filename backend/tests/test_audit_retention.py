@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import gzip
+import json
+import pytest
+from app.api.deps import get_current_admin_user
+from app.config import settings
+from app.main import app
+from app.models.audit import AuditLog, AuditArchive
+from app.models.user import User
+from app.services.audit_retention_service import AuditRetentionService
+
+
+@pytest.fixture
+def admin_client(client, db_session):
+    admin = User(dni="99999999", email="admin@audit.com", name="Admin", hashed_password="x", role="admin", is_active=True)
+    db_session.add(admin)
+    db_session.commit()
+    app.dependency_overrides[get_current_admin_user] = lambda: admin
+    return client
+
+
+def _log(db, action, when, user_id=None):
+    db.add(AuditLog(action=action, user_id=user_id, details={"at": when.isoformat()}, timestamp=when))
+
+
+def test_admin_logs_keyset_pagination_with_filters(admin_client, db_session):
+    base = datetime(2030, 1, 1, 12, 0)
+    for i in range(7):
+        # Dos eventos por timestamp: el id desempata
+        _log(db_session, "LOGIN" if i % 2 == 0 else "BOOKING_CREATED", base + timedelta(minutes=i // 2), user_id=i % 3)
+    db_session.commit()
+
+    seen, cursor = [], None
+    while True:
+        res = admin_client.get("/api/admin/logs", params={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert res.status_code == 200
+        seen += [log["id"] for log in res.json()]
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    expected = [log.id for log in db_session.query(AuditLog).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())]
+    assert seen == expected and len(seen) == 7
+
+    res = admin_client.get("/api/admin/logs", params={"action": "LOGIN", "user_id": 0})
+    assert [log["action"] for log in res.json()] == ["LOGIN", "LOGIN"]
+    assert "X-Next-Cursor" not in res.headers
+
+    assert admin_client.get("/api/admin/logs", params={"cursor": "nope"}).status_code == 400
+
+
+def test_retention_archives_whole_old_months(admin_client, db_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIT_RETENTION_DAYS", 30)
+    now = datetime(2030, 6, 15, 10, 0)
+    _log(db_session, "OLD_MARCH", datetime(2030, 3, 2))
+    _log(db_session, "OLD_MARCH", datetime(2030, 3, 31, 23, 59))
+    _log(db_session, "OLD_APRIL", datetime(2030, 4, 10))
+    # Corte: 16 de mayo -> mayo no está completo antes del corte y se queda entero
+    _log(db_session, "MAY", datetime(2030, 5, 1))
+    _log(db_session, "JUNE", datetime(2030, 6, 14))
+    db_session.commit()
+
+    archives = AuditRetentionService.run(db_session, now=now, archive_dir=str(tmp_path))
+    assert [(a.month, a.rows) for a in archives] == [("2030-03", 2), ("2030-04", 1)]
+    assert sorted(log.action for log in db_session.query(AuditLog)) == ["JUNE", "MAY"]
+
+    with gzip.open(archives[0].path, "rt") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["action"] for r in rows] == ["OLD_MARCH", "OLD_MARCH"]
+    assert list(AuditRetentionService.read_archive(archives[1].path))[0]["timestamp"] == "2030-04-10T00:00:00"
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # Sin nada nuevo que archivar, una segunda corrida no hace nada
+    assert AuditRetentionService.run(db_session, now=now, archive_dir=str(tmp_path)) == []
+    # Una fila vieja que llegó tarde va a un archivo aparte del mismo mes
+    _log(db_session, "LATE_MARCH", datetime(2030, 3, 5))
+    db_session.commit()
+    late = AuditRetentionService.run(db_session, now=now, archive_dir=str(tmp_path))
+    assert late[0].path.endswith("audit_logs-2030-03-part2.jsonl.gz")
+
+    res = admin_client.get("/api/admin/logs/archives")
+    assert [(a["month"], a["rows"]) for a in res.json()] == [("2030-04", 1), ("2030-03", 1), ("2030-03", 2)]
+    assert db_session.query(AuditArchive).count() == 3
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.core import audit_writer as audit_writer_module
+from app.core.audit_writer import AuditWriter
+from app.models.audit import AuditLog
+from app.models.user import User
+from app.services.audit_service import AuditService
+
+
+def _row(i):
+    return {"user_id": None, "action": f"EVENT_{i}", "details": {"i": i}, "ip_address": None}
+
+
+@pytest.fixture
+def writer_factory(db_session):
+    writers = []
+
+    def make(**kwargs):
+        writer = AuditWriter(session_factory=sessionmaker(bind=db_session.get_bind()), **kwargs)
+        writers.append(writer)
+        return writer
+
+    yield make
+    for writer in writers:
+        writer.stop()
+
+
+def test_events_are_written_in_batches(db_session, writer_factory):
+    writer = writer_factory(batch_size=10, flush_interval=0.05)
+    writer.start()
+    for i in range(25):
+        assert writer.enqueue(_row(i))
+    writer.flush()
+
+    assert db_session.query(AuditLog).count() == 25
+    stats = writer.stats()
+    assert stats["written"] == 25
+    assert 3 <= stats["flushes"] < 25  # en lotes, no uno por evento
+    assert stats["dropped"] == 0 and stats["failed"] == 0
+
+
+def test_full_queue_drops_and_stop_flushes_the_rest(db_session, writer_factory):
+    # Sin arrancar el thread la cola no se vacía: se llena enseguida
+    writer = writer_factory(max_queue=5, policy="drop")
+    results = [writer.enqueue(_row(i)) for i in range(8)]
+    assert results == [True] * 5 + [False] * 3
+    assert writer.stats()["dropped"] == 3
+
+    writer.stop()
+    assert [log.action for log in db_session.query(AuditLog).order_by(AuditLog.id)] == [f"EVENT_{i}" for i in range(5)]
+
+
+def test_block_policy_waits_then_drops(writer_factory):
+    writer = writer_factory(max_queue=1, policy="block", enqueue_timeout=0.01)
+    assert writer.enqueue(_row(0))
+    assert not writer.enqueue(_row(1))
+    stats = writer.stats()
+    assert stats["dropped"] == 1
+    assert stats["enqueued"] == 1
+
+
+def test_audit_service_does_not_commit_the_request_session_when_buffered(db_session, writer_factory, monkeypatch):
+    writer = writer_factory(flush_interval=0.05)
+    writer.start()
+    monkeypatch.setattr("app.services.audit_service.audit_writer", writer)
+
+    pending = User(dni="40000000", email="pending@audit.com", name="Pending", hashed_password="x")
+    db_session.add(pending)
+    AuditService.log(db_session, "SOMETHING", details={"when": pending})
+    assert pending in db_session.new  # la sesión del request no se tocó
+    db_session.rollback()
+
+    writer.flush()
+    log = db_session.query(AuditLog).one()
+    assert log.action == "SOMETHING"
+    assert isinstance(log.details["when"], str)
+
+
+def test_audit_service_writes_inline_without_writer(db_session):
+    assert not audit_writer_module.audit_writer.running
+    AuditService.log(db_session, "INLINE", user_id=None, details={"a": 1})
+    assert db_session.query(AuditLog).filter(AuditLog.action == "INLINE").count() == 1
@@ -0,0 +1,66 @@
+import pytest
+from app.models.ride import Ride, RideRequest
+from app.utils import batch_matching
+from app.utils.matching import find_matches_for_ride, find_matches_for_request
+
+
+@pytest.fixture(params=["numpy", "python"])
+def engine(request, monkeypatch):
+    """Corre cada test con NumPy y con el fallback en Python puro."""
+    if request.param == "numpy":
+        if batch_matching.np is None:
+            pytest.skip("NumPy no instalado")
+    else:
+        monkeypatch.setattr(batch_matching, "np", None)
+    return request.param
+
+
+def test_batch_rides_equals_single_matcher(db_session, seed_matching_data, engine):
+    seed_matching_data()
+    rides = db_session.query(Ride).order_by(Ride.id).all()
+
+    batch = batch_matching.find_matches_for_rides(rides, db_session)
+    total = 0
+    for ride in rides:
+        expected = [r.id for r in find_matches_for_ride(ride, db_session)]
+        assert [r.id for r in batch[ride.id]] == expected
+        total += len(expected)
+    assert total > 0
+
+
+def test_batch_requests_equals_single_matcher(db_session, seed_matching_data, engine):
+    seed_matching_data()
+    requests = db_session.query(RideRequest).order_by(RideRequest.id).all()
+
+    batch = batch_matching.find_matches_for_requests(requests, db_session)
+    for req in requests:
+        expected = [r.id for r in find_matches_for_request(req, db_session)]
+        assert [r.id for r in batch[req.id]] == expected
+
+
+def test_match_pairs_small_block_size(db_session, seed_matching_data, engine, monkeypatch):
+    """El recorrido por bloques no cambia el resultado."""
+    seed_matching_data()
+    rides = db_session.query(Ride).order_by(Ride.id).all()
+    requests = db_session.query(RideRequest).order_by(RideRequest.id).all()
+
+    full = batch_matching.match_pairs(rides, requests)
+    monkeypatch.setattr(batch_matching, "BLOCK_SIZE", 3)
+    assert batch_matching.match_pairs(rides, requests) == full
+
+
+
+def test_batch_reads_typed_dates_not_the_legacy_strings(db_session, seed_matching_data, engine):
+    from sqlalchemy.orm.attributes import set_committed_value
+    seed_matching_data()
+    rides = db_session.query(Ride).order_by(Ride.id).all()
+    requests = db_session.query(RideRequest).order_by(RideRequest.id).all()
+    expected = batch_matching.match_pairs(rides, requests)
+    assert expected
+
+    # Los strings ya no se parsean: romperlos (sin tocar las columnas tipadas) no cambia nada
+    for ride in rides:
+        set_committed_value(ride, "departure_time", "no-es-una-fecha")
+    for req in requests:
+        set_committed_value(req, "date", None)
+    assert batch_matching.match_pairs(rides, requests) == expected
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from app.main import app
+from app.api.deps import get_current_user
+from app.config import settings
+from app.core.workers import PeriodicWorker
+from app.models.audit import AuditLog
+from app.models.booking import Booking
+from app.models.ride import Ride
+from app.models.user import User
+from app.services.booking_expiry_service import BookingExpiryService
+from app.services.payment_service import PaymentService
+from app.services.seat_service import SeatService
+
+
+def _seed(session):
+    driver = User(dni="80000000", email="drv@expiry.com", name="Driver", hashed_password="x", is_active=True)
+    passenger = User(dni="80000001", email="pax@expiry.com", name="Pax", hashed_password="x", is_active=True)
+    session.add_all([driver, passenger])
+    session.commit()
+    departure = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%dT%H:%M")
+    ride = Ride(origin="A", destination="B", departure_time=departure, price=100,
+                available_seats=10, driver_id=driver.id, status="active")
+    session.add(ride)
+    session.commit()
+    return ride, passenger
+
+
+def _book(session, ride, passenger, age_minutes, status="awaiting_payment", payment_status="unpaid"):
+    assert SeatService.reserve(session, ride.id, 1)
+    booking = Booking(ride_id=ride.id, passenger_id=passenger.id, seats_booked=1, status=status,
+                      payment_status=payment_status,
+                      created_at=datetime.utcnow() - timedelta(minutes=age_minutes))
+    session.add(booking)
+    session.commit()
+    return booking.id
+
+
+def test_sweep_expires_only_stale_unpaid_bookings(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "BOOKING_PAYMENT_HOLD_MINUTES", 30)
+    monkeypatch.setattr(settings, "BOOKING_SWEEP_BATCH_SIZE", 2)
+    ride, passenger = _seed(db_session)
+
+    stale = [_book(db_session, ride, passenger, age_minutes=60 + i) for i in range(5)]
+    fresh = _book(db_session, ride, passenger, age_minutes=5)
+    paid = _book(db_session, ride, passenger, age_minutes=90, status="confirmed", payment_status="paid")
+    db_session.refresh(ride)
+    assert ride.seats_taken == 7
+
+    assert BookingExpiryService.sweep(db_session) == 5
+
+    statuses = dict(db_session.query(Booking.id, Booking.status).all())
+    assert all(statuses[b] == "expired" for b in stale)
+    assert statuses[fresh] == "awaiting_payment"
+    assert statuses[paid] == "confirmed"
+
+    db_session.refresh(ride)
+    assert ride.seats_taken == 2
+
+    # Una entrada de auditoría por lote (2 + 2 + 1), no una por reserva
+    logs = db_session.query(AuditLog).filter(AuditLog.action == "BOOKINGS_EXPIRED").order_by(AuditLog.id).all()
+    assert [log.details["count"] for log in logs] == [2, 2, 1]
+    assert sorted(b for log in logs for b in log.details["booking_ids"]) == sorted(stale)
+
+    # Segunda pasada: nada más para vencer
+    assert BookingExpiryService.sweep(db_session) == 0
+
+
+def test_cancelling_ride_ignores_expired_bookings(client, db_session):
+    driver = User(dni="80000010", email="drv2@expiry.com", name="Driver", hashed_password="x",
+                  role="C", is_active=True, reputation_score=100)
+    passenger = User(dni="80000011", email="pax2@expiry.com", name="Pax", hashed_password="x", is_active=True)
+    db_session.add_all([driver, passenger])
+    db_session.commit()
+    # Sale en 3 h: dentro de la ventana de penalización
+    departure = (datetime.now() + timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M")
+    ride = Ride(origin="A", destination="B", departure_time=departure, price=100,
+                available_seats=3, driver_id=driver.id, status="active")
+    db_session.add(ride)
+    db_session.commit()
+    expired = Booking(ride_id=ride.id, passenger_id=passenger.id, seats_booked=1, status="expired")
+    db_session.add(expired)
+    db_session.commit()
+    ride_id, expired_id, driver_id = ride.id, expired.id, driver.id
+
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, driver_id)
+    res = client.get("/api/rides/me")
+    assert res.status_code == 200
+    assert res.json()[0]["bookings_count"] == 0
+
+    res = client.delete(f"/api/rides/{ride_id}")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["bookings_cancelled"] == 0
+    assert body["penalty_applied"] is False
+    assert db_session.get(Booking, expired_id).status == "expired"
+    assert db_session.get(User, driver_id).reputation_score == 100
+
+
+def test_webhook_confirm_after_expiry_reclaims_seats(client, db_session, monkeypatch):
+    ride, passenger = _seed(db_session)
+    booking_id = _book(db_session, ride, passenger, age_minutes=90)
+    assert BookingExpiryService.sweep(db_session) == 1
+    db_session.refresh(ride)
+    assert ride.seats_taken == 0
+    ride_id = ride.id
+
+    approved = {"status": "approved", "external_reference": str(booking_id),
+                "transaction_amount": 5000.0, "currency_id": "ARS"}
+    monkeypatch.setattr(PaymentService, "get_payment_info", lambda self, payment_id: approved)
+    forced = []
+    real_force_reserve = SeatService.force_reserve
+    monkeypatch.setattr(SeatService, "force_reserve",
+                        staticmethod(lambda db, ride_id, seats: forced.append((ride_id, seats)) or real_force_reserve(db, ride_id, seats)))
+
+    # El pasajero pagó tarde: la notificación llega con la reserva ya vencida
+    res = client.post("/api/payment/webhook?topic=payment&id=777")
+    assert res.status_code == 200
+
+    booking = db_session.get(Booking, booking_id)
+    assert (booking.status, booking.payment_status) == ("confirmed", "paid")
+    assert forced == [(ride_id, 1)]
+    assert db_session.get(Ride, ride_id).seats_taken == 1
+
+
+def test_worker_survives_errors():
+    def boom():
+        raise RuntimeError("db down")
+
+    worker = PeriodicWorker("test", 60, boom)
+    worker.run_once()
+    worker.run_once()
+    assert worker.stats() == {"running": False, "interval_s": 60, "runs": 2, "errors": 2}
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+from app.main import app
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.models.ride import Ride, RideRequest
+from app.utils.dates import parse_departure_time, parse_request_window
+
+
+def test_typed_columns_follow_string_fields(db_session):
+    """departure_at / window_*_at se derivan de los strings al asignarlos."""
+    ride = Ride(origin="A", destination="B", departure_time="2030-01-02T10:30Z", price=1, available_seats=1)
+    assert ride.departure_at == datetime(2030, 1, 2, 10, 30, tzinfo=timezone.utc)
+
+    ride.departure_time = "no-es-fecha"
+    assert ride.departure_at is None
+
+    req = RideRequest(origin="A", destination="B", date="2030-01-02", time_window_start="09:00")
+    assert req.window_start_at is None  # falta el fin de la ventana
+    req.time_window_end = "11:00"
+    assert (req.window_start_at, req.window_end_at) == parse_request_window("2030-01-02", "09:00", "11:00")
+
+
+def test_public_search_filters_future_rides_in_sql(client, db_session):
+    driver = User(dni="40000001", email="d@test.com", name="Driver", hashed_password="x", gender="F", is_active=True)
+    db_session.add(driver)
+    db_session.commit()
+
+    now = datetime.now()
+    past = Ride(origin="Past", destination="X", departure_time=(now - timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M"),
+                price=1, available_seats=1, driver_id=driver.id)
+    later = Ride(origin="Later", destination="X", departure_time=(now + timedelta(hours=5)).strftime("%Y-%m-%dT%H:%M"),
+                 price=1, available_seats=1, driver_id=driver.id)
+    sooner = Ride(origin="Sooner", destination="X", departure_time=(now + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M"),
+                  price=1, available_seats=1, driver_id=driver.id)
+    db_session.add_all([past, later, sooner])
+    db_session.commit()
+
+    driver_id = driver.id
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, driver_id)
+    res = client.get("/api/rides")
+    assert res.status_code == 200, res.text
+    assert sorted(r["origin"] for r in res.json()) == ["Later", "Sooner"]
+
+    res = client.get("/api/rides/me")
+    assert res.status_code == 200, res.text
+    assert [r["origin"] for r in res.json()] == ["Past", "Sooner", "Later"]
+
+
+def test_parse_departure_time_naive_is_server_local():
+    naive = datetime(2030, 6, 1, 12, 0)
+    assert parse_departure_time("2030-06-01T12:00") == naive.astimezone(timezone.utc)
@@ -0,0 +1,87 @@
+import json
+from pathlib import Path
+import pytest
+from app.utils.gazetteer import DEFAULT_PATH, Gazetteer, normalize
+
+
+def test_normalize_folds_accents_and_punctuation():
+    assert normalize("  Córdoba,  CÓRDOBA ") == "cordoba cordoba"
+    assert normalize("Neuquén") == "neuquen"
+
+
+def test_prefix_search_is_accent_insensitive_and_ranked(tmp_path):
+    base = tmp_path / "cities.json"
+    extra = tmp_path / "extra.json"
+    base.write_text(json.dumps([
+        {"label": "Córdoba, Córdoba", "value": "Córdoba, Córdoba", "lat": -31.42, "lng": -64.19},
+        {"label": "Villa Carlos Paz, Córdoba", "value": "Villa Carlos Paz, Córdoba", "lat": -31.42, "lng": -64.50},
+        {"label": "Corrientes, Corrientes", "value": "Corrientes, Corrientes", "lat": -27.47, "lng": -58.83},
+    ]), encoding="utf-8")
+    extra.write_text(json.dumps([
+        {"label": "Alta Gracia, Córdoba", "lat": -31.65, "lng": -64.43},
+        {"label": "CORDOBA, Córdoba", "lat": 0, "lng": 0},  # duplicado: gana el primero
+    ]), encoding="utf-8")
+    g = Gazetteer(paths=[base, extra, tmp_path / "no-existe.json"])
+
+    assert len(g) == 4
+    # Primero los que empiezan con el texto, después los que lo tienen en otra palabra
+    assert [e["label"] for e in g.search("cor")] == [
+        "Córdoba, Córdoba", "Corrientes, Corrientes", "Villa Carlos Paz, Córdoba", "Alta Gracia, Córdoba"
+    ]
+    assert g.search("PAZ") == [{"label": "Villa Carlos Paz, Córdoba", "value": "Villa Carlos Paz, Córdoba",
+                                "lat": -31.42, "lng": -64.50}]
+    assert g.search("alta gra")[0]["value"] == "Alta Gracia, Córdoba"
+    assert g.search("cor", limit=1)[0]["label"] == "Córdoba, Córdoba"
+    assert g.search("zzz") == []
+
+
+def test_autocomplete_uses_gazetteer_before_nominatim(client, db_session, mock_http):
+    calls = []
+    mock_http(lambda request: calls.append(request))
+
+    res = client.get("/api/geocode/autocomplete", params={"q": "bariloche"})
+    assert res.status_code == 200
+    assert res.json()[0]["label"] == "San Carlos de Bariloche, Río Negro"
+    assert set(res.json()[0]) == {"label", "value", "lat", "lng"}
+    assert calls == []
+
+
+def test_nearest_matches_brute_force_haversine():
+    import random
+    from app.utils.gazetteer import gazetteer
+    from app.utils.matching import haversine_distance
+
+    rng = random.Random(7)
+    entries = [gazetteer.search(q)[0] for q in ("cordoba", "rosario", "ushuaia", "salta")]
+    for _ in range(300):
+        lat, lng = rng.uniform(-55, -21), rng.uniform(-73, -53)
+        entry, distance = gazetteer.nearest(lat, lng)
+        brute = min(haversine_distance(lat, lng, e["lat"], e["lng"]) for e in gazetteer._entries)
+        assert abs(distance - brute) < 1e-6
+        assert abs(haversine_distance(lat, lng, entry["lat"], entry["lng"]) - distance) < 1e-6
+
+    found = gazetteer.nearest_many([(e["lat"], e["lng"]) for e in entries] + [(0.0, 0.0)], max_km=5)
+    assert [f[0]["label"] for f in found[:4]] == [e["label"] for e in entries]
+    assert found[4] is None
+
+
+def test_reverse_answers_locally_near_a_city(client, db_session, mock_http):
+    calls = []
+    mock_http(lambda request: calls.append(request))
+
+    res = client.get("/api/geocode/reverse", params={"lat": -31.43, "lng": -64.19})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["display_name"] == "Córdoba, Córdoba"
+    assert body["source"] == "gazetteer"
+    assert body["address"]["state"] == "Córdoba"
+    assert (body["lat"], body["lng"]) == (-31.43, -64.19)
+    assert calls == []
+
+
+def test_dataset_matches_the_frontend_copy():
+    frontend = Path(__file__).resolve().parents[2] / "frontend" / "src" / "data" / "argentina_cities.json"
+    if not frontend.exists():
+        pytest.skip("checkout sin frontend (imagen Docker del backend)")
+    assert json.loads(DEFAULT_PATH.read_text(encoding="utf-8")) == json.loads(frontend.read_text(encoding="utf-8")), \
+        "app/data/argentina_cities.json difiere de frontend/src/data/argentina_cities.json: copiar el archivo actualizado"
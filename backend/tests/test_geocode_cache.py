@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from app.core.cache import TTLCache, SingleFlight, MISSING
+from app.models.geocode import GeocodeCache
+import asyncio
+import httpx
+import pytest
+from app.services.geocode_service import GeocodeService, memory_cache
+
+CITY = [{"display_name": "Alta Gracia, Córdoba, Argentina", "lat": "-31.65", "lon": "-64.43"}]
+
+
+def _fake_nominatim(mock_http, payload=CITY, status_code=200):
+    """Reemplaza el cliente HTTP compartido por uno con transporte simulado."""
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(status_code, json=payload)
+
+    mock_http(handler)
+    return calls
+
+
+def test_ttl_cache_lru_and_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.core.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=10)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1        # "a" pasa a ser la más reciente
+    cache.set("c", 3)                 # desaloja "b"
+    assert cache.get("b") is MISSING
+    now[0] += 11
+    assert cache.get("a") is MISSING  # vencida
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_autocomplete_served_from_memory_then_db(client, db_session, mock_http):
+    calls = _fake_nominatim(mock_http)
+
+    # Alta Gracia no está en el gazetteer local: va a Nominatim
+    first = client.get("/api/geocode/autocomplete", params={"q": "Alta Gracia"})
+    second = client.get("/api/geocode/autocomplete", params={"q": "  ALTA   gracia "})
+    assert first.status_code == 200
+    assert first.json() == second.json()
+    assert len(calls) == 1
+
+    # Reinicio del proceso: la memoria se pierde, la tabla no
+    memory_cache.clear()
+    third = client.get("/api/geocode/autocomplete", params={"q": "alta gracia"})
+    assert third.json() == first.json()
+    assert len(calls) == 1
+
+    stats = GeocodeService.stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["db_hits"] == 1
+
+
+def test_reverse_key_is_rounded_and_stale_rows_refresh(client, db_session, mock_http):
+    calls = _fake_nominatim(mock_http, payload={"display_name": "Centro", "address": {}})
+
+    # Alta Gracia: lejos de toda localidad del gazetteer, va a Nominatim
+    client.get("/api/geocode/reverse", params={"lat": -31.652901, "lng": -64.428301})
+    res = client.get("/api/geocode/reverse", params={"lat": -31.652904, "lng": -64.428304})
+    assert res.json()["display_name"] == "Centro"
+    assert res.json()["lat"] == -31.652904  # se devuelven las coordenadas pedidas
+    assert len(calls) == 1
+
+    # Una fila vencida en la tabla se vuelve a pedir a Nominatim
+    memory_cache.clear()
+    row = db_session.query(GeocodeCache).one()
+    row.created_at = datetime.utcnow() - timedelta(days=365)
+    db_session.commit()
+    client.get("/api/geocode/reverse", params={"lat": -31.652901, "lng": -64.428301})
+    assert len(calls) == 2
+
+
+def test_upstream_errors_are_not_cached(client, db_session, mock_http):
+    calls = _fake_nominatim(mock_http, status_code=503)
+
+    assert client.get("/api/geocode/geocode", params={"address": "Rosario"}).status_code == 502
+    assert client.get("/api/geocode/geocode", params={"address": "Rosario"}).status_code == 502
+    assert len(calls) == 2
+    assert db_session.query(GeocodeCache).count() == 0
+
+
+def test_concurrent_identical_lookups_share_one_upstream_call(mock_http):
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=CITY)
+
+    GeocodeService.reset()
+    mock_http(handler)
+
+    async def burst():
+        return await asyncio.gather(*[GeocodeService.autocomplete(None, "Alta Gracia") for _ in range(20)])
+
+    results = asyncio.run(burst())
+    assert len(calls) == 1
+    assert all(r == CITY for r in results)
+    assert GeocodeService.stats()["coalesced"] == 19
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    flight = SingleFlight()
+    runs = []
+
+    async def load():
+        runs.append(len(runs))
+        await asyncio.sleep(0.05)
+        return len(runs)
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(flight.do("k", load)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return results
+
+    # Uno de los que esperaban vuelve a ejecutar; los demás comparten su resultado
+    assert asyncio.run(scenario()) == [2, 2, 2]
+    assert len(runs) == 2
+    assert flight.coalesced == 2
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import pytest
+from app.core.dispatcher import PriorityDispatcher, DispatchRejected, TokenBucket
+
+
+def test_token_bucket_refills_at_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("app.core.dispatcher.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, capacity=1)
+    assert bucket.wait_time() == 0
+    bucket.take()
+    assert bucket.wait_time() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.wait_time() == 0
+
+
+def test_dispatcher_orders_by_priority_dedups_and_limits_rate():
+    order = []
+
+    def job(name):
+        async def fn():
+            order.append((name, time.monotonic()))
+            return name
+        return fn
+
+    async def scenario():
+        dispatcher = PriorityDispatcher(rate=20, burst=1)
+        # La primera sale enseguida (hay un token); el resto espera y se ordena
+        first = asyncio.ensure_future(dispatcher.submit("warmup", job("warmup"), priority=2))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.ensure_future(dispatcher.submit("script", job("script"), priority=2)),
+            asyncio.ensure_future(dispatcher.submit("reverse", job("reverse"), priority=1)),
+            asyncio.ensure_future(dispatcher.submit("auto", job("auto"), priority=0)),
+            asyncio.ensure_future(dispatcher.submit("auto", job("auto-dup"), priority=0)),
+        ]
+        results = await asyncio.gather(first, *tasks)
+        return dispatcher, results
+
+    dispatcher, results = asyncio.run(scenario())
+    assert results == ["warmup", "script", "reverse", "auto", "auto"]
+    assert [name for name, _ in order] == ["warmup", "auto", "reverse", "script"]
+    gaps = [b - a for (_, a), (_, b) in zip(order, order[1:])]
+    assert all(gap >= 0.04 for gap in gaps)  # 20/s -> 50 ms entre llamadas
+    stats = dispatcher.stats()
+    assert stats["dispatched"] == 4
+    assert stats["deduplicated"] == 1
+    assert stats["queue_depth"] == 0
+
+
+def test_dispatcher_sheds_stale_jobs_and_rejects_when_full():
+    async def slow_start():
+        return "ok"
+
+    async def scenario():
+        dispatcher = PriorityDispatcher(rate=5, burst=1, max_queue=2)
+        await dispatcher.submit("first", slow_start)  # gasta el único token
+        stale = asyncio.ensure_future(dispatcher.submit("auto", slow_start, priority=0, max_wait=0.05))
+        kept = asyncio.ensure_future(dispatcher.submit("reverse", slow_start, priority=1))
+        await asyncio.sleep(0)
+        with pytest.raises(DispatchRejected) as full:
+            await dispatcher.submit("script", slow_start, priority=2)
+        assert full.value.reason == "queue_full"
+        with pytest.raises(DispatchRejected) as shed:
+            await stale
+        assert shed.value.reason == "shed"
+        assert await kept == "ok"
+        return dispatcher.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["shed"] == 1
+    assert stats["rejected"] == 1
+    assert stats["dispatched"] == 2
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+from app.models.ride import Ride, RideRequest
+from app.utils.matching import (
+    haversine_distance, find_matches_for_ride, find_matches_for_request, ride_index, request_index
+)
+
+
+def _brute_force_ride(ride, requests, radius_km=20):
+    """Semántica original: recorre TODAS las solicitudes."""
+    ride_dt = datetime.fromisoformat(ride.departure_time)
+    tolerance = timedelta(hours=1)
+    result = []
+    for req in requests:
+        try:
+            start = datetime.fromisoformat(f"{req.date}T{req.time_window_start}")
+            end = datetime.fromisoformat(f"{req.date}T{req.time_window_end}")
+        except ValueError:
+            continue
+        if not (start - tolerance <= ride_dt <= end + tolerance):
+            continue
+        if (haversine_distance(ride.origin_lat, ride.origin_lng, req.origin_lat, req.origin_lng) <= radius_km and
+                haversine_distance(ride.destination_lat, ride.destination_lng, req.destination_lat, req.destination_lng) <= radius_km):
+            result.append(req.id)
+    return result
+
+
+def test_grid_index_matches_brute_force(db_session, seed_matching_data):
+    seed_matching_data()
+    requests = db_session.query(RideRequest).all()
+    rides = db_session.query(Ride).all()
+
+    total = 0
+    for ride in rides:
+        expected = _brute_force_ride(ride, requests)
+        got = [r.id for r in find_matches_for_ride(ride, db_session)]
+        assert got == expected
+        total += len(got)
+    assert total > 0, "El set de prueba debería producir coincidencias"
+
+    active = [r for r in rides if r.status == "active"]
+    for req in requests:
+        expected = [ride.id for ride in active if req.id in _brute_force_ride(ride, [req])]
+        got = [r.id for r in find_matches_for_request(req, db_session)]
+        assert got == expected
+
+
+def test_grid_index_picks_up_new_and_removed_rows(db_session, seed_matching_data):
+    seed_matching_data(n_rides=5, n_requests=5)
+    ride = db_session.query(Ride).filter(Ride.status == "active").first()
+
+    # Una solicitud idéntica al viaje debe aparecer aunque se inserte "por fuera"
+    dep = datetime.fromisoformat(ride.departure_time)
+    req = RideRequest(
+        origin="A", destination="B", date=dep.strftime("%Y-%m-%d"),
+        time_window_start=dep.strftime("%H:%M"), time_window_end=dep.strftime("%H:%M"),
+        origin_lat=ride.origin_lat, origin_lng=ride.origin_lng,
+        destination_lat=ride.destination_lat, destination_lng=ride.destination_lng,
+        passenger_id=ride.driver_id
+    )
+    find_matches_for_ride(ride, db_session)  # fuerza una sincronización previa
+    db_session.add(req)
+    db_session.commit()
+    assert req.id in [r.id for r in find_matches_for_ride(ride, db_session)]
+
+    # Al borrarla deja de ser candidata
+    db_session.delete(req)
+    db_session.commit()
+    request_index.remove(req.id)
+    assert req.id not in [r.id for r in find_matches_for_ride(ride, db_session)]
+
+    # Un viaje cancelado deja de aparecer para las solicitudes
+    other = db_session.query(RideRequest).first()
+    ride.status = "cancelled"
+    db_session.commit()
+    ride_index.remove(ride.id)
+    assert ride.id not in [r.id for r in find_matches_for_request(other, db_session)]
+
+
+def test_removing_a_row_does_not_rescan_the_table(db_session, seed_matching_data, count_queries):
+    seed_matching_data(n_rides=10, n_requests=5)
+    ride_index.sync(db_session)
+    ride = db_session.query(Ride).filter(Ride.status == "active").order_by(Ride.id).first()
+    ride_index.remove(ride.id)
+
+    count_queries.clear()
+    ride_index.sync(db_session)
+    # Solo el MAX(id): nada por encima del último id visto
+    assert len(count_queries) == 1
+    assert ride.id not in ride_index._entries
+
+
+def test_deleting_the_newest_row_does_not_reset_the_index(db_session, seed_matching_data, count_queries):
+    seed_matching_data(n_rides=10, n_requests=5)
+    request_index.sync(db_session)
+    indexed = set(request_index._entries)
+    newest = db_session.query(RideRequest).order_by(RideRequest.id.desc()).first()
+    newest_id, passenger_id = newest.id, newest.passenger_id
+    db_session.delete(newest)
+    db_session.commit()
+
+    count_queries.clear()
+    request_index.sync(db_session)
+    assert len(count_queries) == 1
+    assert set(request_index._entries) == indexed - {newest_id}
+
+    # SQLite vuelve a usar el id: la fila nueva entra por el camino normal
+    again = RideRequest(origin="A", destination="B", date="2030-05-10", time_window_start="08:00",
+                        origin_lat=-31.4, origin_lng=-64.2, destination_lat=-31.5, destination_lng=-64.3,
+                        passenger_id=passenger_id)
+    db_session.add(again)
+    db_session.commit()
+    request_index.sync(db_session)
+    assert again.id in request_index._entries
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from app.main import app
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.models.match import RideRequestMatch
+from app.services.match_service import MatchService
+
+CBA = (-31.4201, -64.1888)
+VCP = (-31.4241, -64.4978)
+
+
+def _login_as(db_session, user_id):
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, user_id)
+
+
+def _users(db_session):
+    driver = User(dni="50000001", email="driver@m.com", name="Driver", hashed_password="x", role="C", is_active=True)
+    passenger = User(dni="50000002", email="pass@m.com", name="Passenger", hashed_password="x", role="P", is_active=True)
+    db_session.add_all([driver, passenger])
+    db_session.commit()
+    return driver, passenger
+
+
+def test_match_table_follows_ride_and_request_lifecycle(client, db_session):
+    driver, passenger = _users(db_session)
+    driver_id, passenger_id = driver.id, passenger.id
+    departure = datetime.now() + timedelta(hours=30)
+
+    # 1. El pasajero publica su solicitud (todavía no hay viajes)
+    _login_as(db_session, passenger_id)
+    res = client.post("/api/requests", json={
+        "origin": "Córdoba", "destination": "Carlos Paz",
+        "date": departure.strftime("%Y-%m-%d"),
+        "time_window_start": (departure - timedelta(minutes=30)).strftime("%H:%M"),
+        "time_window_end": (departure + timedelta(minutes=30)).strftime("%H:%M"),
+        "origin_lat": CBA[0], "origin_lng": CBA[1], "destination_lat": VCP[0], "destination_lng": VCP[1],
+    })
+    assert res.status_code == 201, res.text
+    request_id = res.json()["id"]
+    assert db_session.query(RideRequestMatch).count() == 0
+
+    # 2. El conductor publica un viaje compatible -> se materializa la coincidencia
+    _login_as(db_session, driver_id)
+    res = client.post("/api/rides", json={
+        "origin": "Córdoba", "destination": "Carlos Paz",
+        "departure_time": departure.strftime("%Y-%m-%dT%H:%M"),
+        "price": 1000, "available_seats": 3,
+        "origin_lat": CBA[0], "origin_lng": CBA[1], "destination_lat": VCP[0], "destination_lng": VCP[1],
+    })
+    assert res.status_code == 201, res.text
+    ride_id = res.json()["id"]
+    assert [(m.ride_id, m.request_id) for m in db_session.query(RideRequestMatch)] == [(ride_id, request_id)]
+
+    res = client.get("/api/matches")
+    assert [(m["ride_id"], m["request_id"]) for m in res.json()] == [(ride_id, request_id)]
+    res = client.get("/api/rides/me")
+    assert res.json()[0]["matches_count"] == 1
+
+    _login_as(db_session, passenger_id)
+    res = client.get("/api/matches")
+    assert [(m["type"], m["ride_id"]) for m in res.json()] == [("RIDE_FOUND", ride_id)]
+
+    assert MatchService.check_consistency(db_session)["consistent"]
+
+    # 3. Borrar la solicitud limpia la tabla
+    res = client.delete(f"/api/requests/{request_id}")
+    assert res.status_code == 204
+    assert db_session.query(RideRequestMatch).count() == 0
+    assert MatchService.check_consistency(db_session)["consistent"]
+
+
+def test_cancel_ride_and_rebuild(client, db_session, seed_matching_data):
+    seed_matching_data()
+    total = MatchService.rebuild(db_session)
+    report = MatchService.check_consistency(db_session)
+    assert report["consistent"] and report["stored"] == total > 0
+
+    # Un viaje activo con coincidencias se cancela desde la API
+    ride_id = db_session.query(RideRequestMatch.ride_id).first()[0]
+    from app.models.ride import Ride
+    ride = db_session.get(Ride, ride_id)
+    _login_as(db_session, ride.driver_id)
+    res = client.delete(f"/api/rides/{ride_id}")
+    assert res.status_code == 200, res.text
+    assert db_session.query(RideRequestMatch).filter(RideRequestMatch.ride_id == ride_id).count() == 0
+    assert MatchService.check_consistency(db_session)["consistent"]
+
+    # Una fila espuria es detectada por el verificador
+    db_session.add(RideRequestMatch(ride_id=ride_id, request_id=1))
+    db_session.commit()
+    report = MatchService.check_consistency(db_session)
+    assert not report["consistent"] and report["extra"] == [(ride_id, 1)]
+
+
+def test_pair_inserted_concurrently_by_the_other_side_keeps_all_matches(db_session, seed_matching_data, monkeypatch):
+    seed_matching_data()
+    MatchService.rebuild(db_session)
+    from app.models.ride import Ride
+    ride_id = db_session.query(RideRequestMatch.ride_id).first()[0]
+    expected = {req_id for (req_id,) in db_session.query(RideRequestMatch.request_id).filter(RideRequestMatch.ride_id == ride_id)}
+    db_session.query(RideRequestMatch).filter(RideRequestMatch.ride_id == ride_id).delete()
+    db_session.commit()
+
+    # La solicitud creada a la vez ya guardó uno de los pares
+    original = MatchService._insert
+
+    def racing_insert(db, pairs):
+        pairs = list(pairs)
+        db.add(RideRequestMatch(ride_id=pairs[0][0], request_id=pairs[0][1]))
+        db.flush()
+        original(db, pairs)
+
+    monkeypatch.setattr(MatchService, "_insert", staticmethod(racing_insert))
+    MatchService.on_ride_created(db_session, db_session.get(Ride, ride_id))
+
+    stored = {req_id for (req_id,) in db_session.query(RideRequestMatch.request_id).filter(RideRequestMatch.ride_id == ride_id)}
+    assert stored == expected
+    assert MatchService.check_consistency(db_session)["consistent"]
@@ -0,0 +1,64 @@
+from sqlalchemy import create_engine, event, inspect, select, text
+from app import db_migration
+from app.db_migration import MIGRATIONS, Migration, latest_version, run_migrations, schema_migrations
+
+
+def _file_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'schema.db'}", connect_args={"check_same_thread": False})
+
+
+def _applied(engine):
+    with engine.connect() as conn:
+        return [row.version for row in conn.execute(select(schema_migrations.c.version).order_by(schema_migrations.c.version))]
+
+
+def test_registry_is_ordered():
+    versions = [step.version for step in MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert latest_version() == versions[-1]
+
+
+def test_fresh_database_applies_everything_then_only_reads_the_version(tmp_path):
+    engine = _file_engine(tmp_path)
+    assert run_migrations(engine) == latest_version()
+    assert _applied(engine) == [step.version for step in MIGRATIONS]
+    assert "users" in inspect(engine).get_table_names()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert run_migrations(engine) == latest_version()
+    assert len(statements) == 1 and "schema_migrations" in statements[0]
+    engine.dispose()
+
+
+def test_pending_steps_run_on_older_schema(tmp_path):
+    engine = _file_engine(tmp_path)
+    run_migrations(engine)
+    # Base de antes del paso 3: sin la columna y sin los registros desde ahí
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE users DROP COLUMN address"))
+        conn.execute(schema_migrations.delete().where(schema_migrations.c.version >= 3))
+
+    assert run_migrations(engine) == latest_version()
+    assert "address" in {c["name"] for c in inspect(engine).get_columns("users")}
+    assert _applied(engine) == [step.version for step in MIGRATIONS]
+    engine.dispose()
+
+
+def test_failed_step_is_not_recorded_and_stops_the_run(tmp_path, monkeypatch):
+    engine = _file_engine(tmp_path)
+    run_migrations(engine)
+    applied = []
+
+    def broken(connection):
+        raise RuntimeError("boom")
+
+    last = latest_version()
+    monkeypatch.setattr(db_migration, "MIGRATIONS", MIGRATIONS + [
+        Migration(last + 1, "broken", broken),
+        Migration(last + 2, "after broken", lambda connection: applied.append(True)),
+    ])
+    assert run_migrations(engine) == last
+    assert applied == []
+    assert _applied(engine)[-1] == last
+    engine.dispose()
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+from app.main import app
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.models.ride import Ride
+from app.models.booking import Booking, BookingStatus
+from app.models.match import RideRequestMatch
+from app.models.ride import RideRequest
+
+# Viajes + reservas agrupadas + coincidencias agrupadas
+QUERY_BUDGET = 3
+
+
+def _seed_driver_rides(db_session, n_rides):
+    driver = User(dni="60000001", email="drv@q.com", name="Driver", hashed_password="x", role="C", is_active=True)
+    passenger = User(dni="60000002", email="pax@q.com", name="Pax", hashed_password="x", role="P", is_active=True)
+    db_session.add_all([driver, passenger])
+    db_session.commit()
+
+    req = RideRequest(origin="A", destination="B", date="2030-01-01", passenger_id=passenger.id)
+    db_session.add(req)
+    departure = datetime.now() + timedelta(hours=10)
+    for i in range(n_rides):
+        ride = Ride(origin=f"O{i}", destination="D", departure_time=(departure + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M"),
+                    price=100, available_seats=4, driver_id=driver.id, status="active")
+        db_session.add(ride)
+        db_session.flush()
+        db_session.add_all([
+            Booking(ride_id=ride.id, passenger_id=passenger.id, seats_booked=1, status=BookingStatus.CONFIRMED.value),
+            Booking(ride_id=ride.id, passenger_id=passenger.id, seats_booked=1, status=BookingStatus.CANCELLED.value),
+        ])
+        db_session.add(RideRequestMatch(ride_id=ride.id, request_id=req.id))
+    db_session.commit()
+    driver_id = driver.id
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, driver_id)
+
+
+def test_my_rides_query_count_is_constant(client, db_session, count_queries):
+    _seed_driver_rides(db_session, n_rides=12)
+
+    count_queries.clear()
+    res = client.get("/api/rides/me")
+    assert res.status_code == 200, res.text
+
+    # get_current_user está sobreescrito: la sesión ya tiene al conductor en el identity map
+    queries = [q for q in count_queries if "FROM users" not in q]
+    assert len(queries) <= QUERY_BUDGET, "\n\n".join(queries)
+
+    rides = res.json()
+    assert len(rides) == 12
+    assert all(r["bookings_count"] == 1 for r in rides)
+    assert all(r["matches_count"] == 1 for r in rides)
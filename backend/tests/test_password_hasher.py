@@ -0,0 +1,84 @@
+import threading
+import time
+import pytest
+from app.core.password_hasher import PasswordHasher, HasherBusy, password_hasher
+from app.models.user import User
+
+
+def test_hash_and_verify_with_configured_cost():
+    hasher = PasswordHasher(rounds=5, max_workers=1)
+    hashed = hasher.hash("secreto")
+    assert hashed.startswith("$2b$05$")
+    assert hasher.verify("secreto", hashed)
+    assert not hasher.verify("otro", hashed)
+    assert not hasher.needs_rehash(hashed)
+    assert PasswordHasher(rounds=6).needs_rehash(hashed)
+    assert hasher.needs_rehash("no-es-bcrypt")
+    assert hasher.stats()["completed"] == 3
+    hasher.shutdown()
+
+
+def test_full_queue_rejects_immediately(monkeypatch):
+    hasher = PasswordHasher(rounds=4, max_workers=1, max_queue=0)
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_hashpw(password, salt):
+        started.set()
+        release.wait(5)
+        return b"$2b$04$" + b"x" * 53
+
+    monkeypatch.setattr("app.core.password_hasher.bcrypt.hashpw", slow_hashpw)
+    busy = threading.Thread(target=hasher.hash, args=("a",))
+    busy.start()
+    started.wait(5)
+    started_at = time.monotonic()
+    with pytest.raises(HasherBusy):
+        hasher.hash("b")
+    assert time.monotonic() - started_at < 0.5
+    release.set()
+    busy.join()
+    assert hasher.stats()["rejected"] == 1
+    hasher.shutdown()
+
+
+def test_login_rehashes_when_cost_changes(client, db_session, monkeypatch):
+    old_hash = PasswordHasher(rounds=5).hash("clave123")
+    user = User(dni="90000001", email="rehash@test.com", name="Rehash", hashed_password=old_hash, is_active=True)
+    db_session.add(user)
+    db_session.commit()
+    user_id = user.id
+
+    assert password_hasher.rounds == 4
+    res = client.post("/api/login", json={"dni": "90000001", "password": "clave123"})
+    assert res.status_code == 200, res.text
+    new_hash = db_session.get(User, user_id).hashed_password
+    assert new_hash.startswith("$2b$04$") and new_hash != old_hash
+
+    # Mismo costo: no se vuelve a tocar
+    assert client.post("/api/login", json={"dni": "90000001", "password": "clave123"}).status_code == 200
+    db_session.expire_all()
+    assert db_session.get(User, user_id).hashed_password == new_hash
+
+
+def test_saturated_pool_answers_503(client, db_session, monkeypatch):
+    user = User(dni="90000002", email="busy@test.com", name="Busy", hashed_password=password_hasher.hash("x"), is_active=True)
+    db_session.add(user)
+    db_session.commit()
+
+    def busy(*args):
+        raise HasherBusy("password hashing queue is full")
+
+    monkeypatch.setattr(password_hasher, "verify", busy)
+    res = client.post("/api/login", json={"dni": "90000002", "password": "x"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+
+
+def test_queue_from_settings_stays_far_below_the_threadpool(monkeypatch):
+    from app.config import settings
+    from app.core import password_hasher as module
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 2)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_QUEUE_MAX", 64)
+    hasher = module._from_settings()
+    assert hasher.max_workers + hasher.max_queue == module.MAX_BLOCKED_THREADS
@@ -76,8 +76,8 @@ def test_active_payment_check_flow(client, db_session, mock_payment_service):
     
     # 2. Mock MercadoPago Response
     print("--- Mocking Search Response ---")
-    # Simulamos que search_payment_by_reference retorna un pago aprobado
-    mock_payment_service.search_payment_by_reference.return_value = {
+    # La conciliación masiva trae los pagos aprobados de la ventana (una página)
+    mock_payment_service.search_approved_payments.return_value = ([{
         "id": 123456789,
         "status": "approved",
         "detail": "accredited",
@@ -85,7 +85,7 @@ def test_active_payment_check_flow(client, db_session, mock_payment_service):
         "currency_id": "ARS",
         "items": [{"id": str(booking_id)}],
         "external_reference": str(booking_id)
-    }
+    }], 1)
     
     # 3. Call the Active Check Endpoint
     print(f"--- Calling Check Endpoint for Booking {booking_id} ---")
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+import pytest
+from app.config import settings
+from app.main import app
+from app.api.deps import get_current_user
+from app.models.booking import Booking
+from app.models.payment import PaymentPreference
+from app.models.ride import Ride
+from app.models.user import User
+from app.services.payment_outbox_service import PaymentOutboxService
+from app.services.payment_service import PaymentService
+
+
+@pytest.fixture
+def mp_calls(monkeypatch):
+    """create_preference falso: registra las llamadas y responde lo que diga `results`."""
+    calls = []
+    results = []
+
+    def create_preference(self, **kwargs):
+        calls.append(kwargs)
+        result = results.pop(0) if results else "ok"
+        if result == "ok":
+            booking_id = kwargs["booking_id"]
+            return {"preference_id": f"pref-{booking_id}", "init_point": f"https://mp.test/{booking_id}",
+                    "sandbox_init_point": f"https://sandbox.mp.test/{booking_id}"}
+        return None
+
+    monkeypatch.setattr(PaymentService, "create_preference", create_preference)
+    return calls, results
+
+
+def _seed(session):
+    driver = User(dni="70000000", email="drv@outbox.com", name="Driver", hashed_password="x", is_active=True)
+    passenger = User(dni="70000001", email="pax@outbox.com", name="Ana Pasajera", hashed_password="x", is_active=True)
+    session.add_all([driver, passenger])
+    session.commit()
+    departure = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%dT%H:%M")
+    ride = Ride(origin="A", destination="B", departure_time=departure, price=100,
+                available_seats=3, driver_id=driver.id, status="active")
+    session.add(ride)
+    session.commit()
+    return ride.id, passenger.id
+
+
+def test_booking_returns_before_preference_and_status_endpoint_delivers_link(client, db_session, mp_calls):
+    calls, _ = mp_calls
+    ride_id, passenger_id = _seed(db_session)
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, passenger_id)
+
+    res = client.post("/api/bookings/", json={"ride_id": ride_id, "seats_booked": 1})
+    assert res.status_code == 201, res.text
+    booking = res.json()
+    assert booking["payment_preference_status"] == "pending"
+    assert booking["payment_init_point"] is None
+    assert calls == []  # MercadoPago no está en el camino del request
+
+    # Sin worker en este proceso, la consulta de estado la procesa en el momento
+    res = client.get(f"/api/bookings/{booking['id']}/payment")
+    assert res.status_code == 200, res.text
+    data = res.json()
+    assert data["status"] == "ready"
+    assert data["init_point"] == f"https://mp.test/{booking['id']}"
+    assert data["attempts"] == 1
+    assert calls[0]["payer_name"] == "Ana" and calls[0]["payer_surname"] == "Pasajera"
+
+    # Ya está lista: no se vuelve a llamar a MercadoPago
+    client.get(f"/api/bookings/{booking['id']}/payment")
+    assert len(calls) == 1
+
+
+def test_failed_attempts_back_off_then_give_up(db_session, mp_calls, monkeypatch):
+    calls, results = mp_calls
+    monkeypatch.setattr(settings, "PAYMENT_OUTBOX_MAX_ATTEMPTS", 3)
+    results.extend([None, None, None])
+    ride_id, passenger_id = _seed(db_session)
+    booking = Booking(ride_id=ride_id, passenger_id=passenger_id, seats_booked=1, status="awaiting_payment")
+    db_session.add(booking)
+    db_session.flush()
+    PaymentOutboxService.enqueue(db_session, booking)
+    db_session.commit()
+
+    now = datetime.utcnow()
+    assert PaymentOutboxService.process_batch(db_session, now=now) == 1
+    row = db_session.query(PaymentPreference).one()
+    assert row.status == "pending" and row.attempts == 1
+    assert row.next_attempt_at == now + timedelta(seconds=2)
+
+    # Antes del backoff no se reintenta
+    assert PaymentOutboxService.process_batch(db_session, now=now + timedelta(seconds=1)) == 0
+
+    PaymentOutboxService.process_batch(db_session, now=now + timedelta(seconds=2))
+    PaymentOutboxService.process_batch(db_session, now=now + timedelta(seconds=10))
+    db_session.refresh(row)
+    assert row.status == "failed"
+    assert row.attempts == 3
+    assert len(calls) == 3
+
+
+def test_expired_booking_skips_mercadopago(db_session, mp_calls):
+    calls, _ = mp_calls
+    ride_id, passenger_id = _seed(db_session)
+    booking = Booking(ride_id=ride_id, passenger_id=passenger_id, seats_booked=1, status="expired")
+    db_session.add(booking)
+    db_session.flush()
+    PaymentOutboxService.enqueue(db_session, booking)
+    db_session.commit()
+
+    PaymentOutboxService.process_batch(db_session)
+    assert db_session.query(PaymentPreference).one().status == "cancelled"
+    assert calls == []
+
+
+def test_sdk_falls_back_to_stock_http_client_without_pooled_internals(monkeypatch, caplog):
+    from app.services import payment_service
+    if payment_service.mercadopago is None:
+        pytest.skip("mercadopago no instalado")
+    monkeypatch.setattr(payment_service, "_sdk", None)
+    monkeypatch.setattr(payment_service, "_pooled_client_error", ImportError("no module mercadopago.http"))
+
+    sdk = payment_service.get_sdk()
+    assert sdk is not None
+    assert not isinstance(sdk.http_client, payment_service.PooledHttpClient)
+    assert "cliente HTTP" in caplog.text
+    payment_service.close_sdk()
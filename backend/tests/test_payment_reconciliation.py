@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+from app.config import settings
+from app.models.booking import Booking
+from app.models.payment import Payment, PaymentSyncState
+from app.models.ride import Ride
+from app.models.user import User
+from app.services.payment_reconciliation_service import PaymentReconciliationService, SOURCE
+
+
+class FakeMercadoPago:
+    """search_approved_payments paginado sobre una lista fija; registra las ventanas pedidas."""
+
+    def __init__(self, payments):
+        self.payments = payments
+        self.calls = []
+        self.fail = False
+
+    def search_approved_payments(self, begin_date, end_date, offset=0, limit=100):
+        self.calls.append((begin_date, end_date, offset, limit))
+        if self.fail:
+            return None
+        return self.payments[offset:offset + limit], len(self.payments)
+
+
+def _seed(session, statuses):
+    driver = User(dni="50000000", email="drv@recon.com", name="Driver", hashed_password="x", is_active=True)
+    passenger = User(dni="50000001", email="pax@recon.com", name="Pax", hashed_password="x", is_active=True)
+    session.add_all([driver, passenger])
+    session.commit()
+    departure = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%dT%H:%M")
+    held = sum(1 for status in statuses if status in ("awaiting_payment", "confirmed"))
+    ride = Ride(origin="A", destination="B", departure_time=departure, price=100,
+                available_seats=len(statuses), seats_taken=held, driver_id=driver.id, status="active")
+    session.add(ride)
+    session.commit()
+    bookings = [Booking(ride_id=ride.id, passenger_id=passenger.id, seats_booked=1, status=status,
+                        payment_status="paid" if status == "confirmed" else "unpaid") for status in statuses]
+    session.add_all(bookings)
+    session.commit()
+    return ride.id, [b.id for b in bookings]
+
+
+def _payment(payment_id, booking_id):
+    return {"id": payment_id, "status": "approved", "external_reference": str(booking_id),
+            "transaction_amount": 5000.0, "currency_id": "ARS"}
+
+
+def test_reconcile_pages_and_updates_bookings_in_bulk(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_RECONCILE_PAGE_SIZE", 2)
+    statuses = ["awaiting_payment", "awaiting_payment", "expired", "confirmed", "awaiting_payment"]
+    ride_id, ids = _seed(db_session, statuses)
+    # Pagos de otras cuentas / referencias ajenas se ignoran
+    mp = FakeMercadoPago([_payment(1, ids[0]), _payment(2, ids[1]), _payment(3, ids[2]),
+                          _payment(4, ids[3]), _payment(5, 99999), {"id": 6, "external_reference": "otro"}])
+    now = datetime(2026, 1, 10, 12, 0)
+
+    freshness = PaymentReconciliationService.reconcile(db_session, now=now, service=mp)
+
+    assert len(mp.calls) == 3  # 6 pagos en páginas de 2
+    assert mp.calls[0][0] == now - timedelta(hours=settings.PAYMENT_RECONCILE_LOOKBACK_HOURS)
+    db_session.expire_all()
+    bookings = {b.id: b for b in db_session.query(Booking).all()}
+    assert [bookings[i].payment_status for i in ids] == ["paid", "paid", "paid", "paid", "unpaid"]
+    assert [bookings[i].status for i in ids[:3]] == ["confirmed"] * 3
+    # La reserva vencida recupera su asiento
+    assert db_session.get(Ride, ride_id).seats_taken == 5
+    assert {p.booking_id for p in db_session.query(Payment).all()} == set(ids[:3])
+
+    state = db_session.get(PaymentSyncState, SOURCE)
+    assert state.synced_until == now
+    assert state.payments_seen == 6 and state.bookings_updated == 3
+    assert freshness["stale"] is False
+
+    # La siguiente ventana arranca donde terminó esta (menos el solape) y no repite trabajo
+    later = now + timedelta(minutes=2)
+    PaymentReconciliationService.reconcile(db_session, now=later, service=mp)
+    assert mp.calls[-1][0] == now - timedelta(minutes=settings.PAYMENT_RECONCILE_OVERLAP_MINUTES)
+    assert db_session.query(Payment).count() == 3
+    assert db_session.get(PaymentSyncState, SOURCE).bookings_updated == 0
+
+
+def test_failed_run_keeps_previous_window(db_session):
+    _seed(db_session, ["awaiting_payment"])
+    mp = FakeMercadoPago([])
+    now = datetime(2026, 1, 10, 12, 0)
+    PaymentReconciliationService.reconcile(db_session, now=now, service=mp)
+
+    mp.fail = True
+    freshness = PaymentReconciliationService.reconcile(db_session, now=now + timedelta(hours=1), service=mp)
+    state = db_session.get(PaymentSyncState, SOURCE)
+    assert state.synced_until == now
+    assert state.last_status == "error"
+    assert freshness["stale"] is True
+
+
+def test_check_endpoint_reads_local_state(client, db_session, monkeypatch):
+    _, (booking_id,) = _seed(db_session, ["awaiting_payment"])
+    db_session.add(PaymentSyncState(name=SOURCE, synced_until=datetime.utcnow(), last_status="ok"))
+    db_session.commit()
+
+    def no_remote_calls(*args, **kwargs):
+        raise AssertionError("/check no debe consultar a MercadoPago")
+
+    monkeypatch.setattr(PaymentReconciliationService, "fetch_approved", no_remote_calls)
+    res = client.post(f"/api/payment/check/{booking_id}")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["status"] == "unpaid"
+    assert data["stale"] is False
+    assert data["synced_until"] is not None
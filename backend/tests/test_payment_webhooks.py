@@ -0,0 +1,145 @@
+from datetime import datetime, timedelta
+import pytest
+from app.config import settings
+from app.models.booking import Booking
+from app.models.payment import Payment, PaymentWebhookEvent
+from app.models.ride import Ride
+from app.models.user import User
+from app.services.payment_service import PaymentService
+from app.services.payment_webhook_service import PaymentWebhookService
+
+
+@pytest.fixture
+def mp_payments(monkeypatch):
+    """get_payment_info falso: {payment_id: respuesta}; cuenta las consultas."""
+    payments, calls = {}, []
+
+    def get_payment_info(self, payment_id):
+        calls.append(payment_id)
+        return payments.get(payment_id)
+
+    monkeypatch.setattr(PaymentService, "get_payment_info", get_payment_info)
+    return payments, calls
+
+
+def _booking(session):
+    driver = User(dni="60000000", email="drv@hook.com", name="Driver", hashed_password="x", is_active=True)
+    passenger = User(dni="60000001", email="pax@hook.com", name="Pax", hashed_password="x", is_active=True)
+    session.add_all([driver, passenger])
+    session.commit()
+    departure = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%dT%H:%M")
+    ride = Ride(origin="A", destination="B", departure_time=departure, price=100,
+                available_seats=3, seats_taken=1, driver_id=driver.id, status="active")
+    session.add(ride)
+    session.commit()
+    booking = Booking(ride_id=ride.id, passenger_id=passenger.id, seats_booked=1, status="awaiting_payment",
+                      payment_status="unpaid")
+    session.add(booking)
+    session.commit()
+    return booking.id
+
+
+def _approved(booking_id):
+    return {"status": "approved", "external_reference": str(booking_id), "transaction_amount": 5000.0, "currency_id": "ARS"}
+
+
+def test_retried_notifications_are_processed_once(client, db_session, mp_payments):
+    payments, calls = mp_payments
+    booking_id = _booking(db_session)
+    payments["111"] = _approved(booking_id)
+
+    for _ in range(3):
+        res = client.post("/api/payment/webhook?topic=payment&id=111")
+        assert res.status_code == 200
+        assert res.json()["status"] == "queued"
+    # Formato con body (type + data.id): mismo pago, misma fila
+    res = client.post("/api/payment/webhook", json={"type": "payment", "data": {"id": "111"}})
+    assert res.json()["status"] == "queued"
+
+    assert calls == ["111"]
+    event = db_session.query(PaymentWebhookEvent).one()
+    assert event.status == "processed"
+    assert event.deliveries == 4
+    assert event.booking_id == booking_id
+
+    booking = db_session.get(Booking, booking_id)
+    assert booking.payment_status == "paid"
+    assert booking.status == "confirmed"
+    assert db_session.query(Payment).filter(Payment.booking_id == booking_id).count() == 1
+
+
+def test_pending_payment_is_requeued_when_notified_again(client, db_session, mp_payments):
+    payments, calls = mp_payments
+    booking_id = _booking(db_session)
+    payments["222"] = {"status": "in_process", "external_reference": str(booking_id)}
+
+    client.post("/api/payment/webhook?topic=payment&id=222")
+    assert db_session.query(PaymentWebhookEvent).one().status == "ignored"
+
+    payments["222"] = _approved(booking_id)
+    client.post("/api/payment/webhook?topic=payment&id=222")
+    db_session.expire_all()
+    assert db_session.query(PaymentWebhookEvent).one().status == "processed"
+    assert db_session.get(Booking, booking_id).payment_status == "paid"
+    assert len(calls) == 2
+
+
+def test_failed_events_back_off_and_can_be_replayed(db_session, mp_payments, monkeypatch):
+    payments, calls = mp_payments
+    monkeypatch.setattr(settings, "PAYMENT_WEBHOOK_MAX_ATTEMPTS", 2)
+    booking_id = _booking(db_session)
+    event_id = PaymentWebhookService.ingest(db_session, "payment", "333", {"params": {"id": "333"}})
+
+    # MercadoPago no responde: reintento con backoff, después 'failed'
+    now = datetime.utcnow()
+    assert PaymentWebhookService.process_batch(db_session, now=now) == 1
+    event = db_session.get(PaymentWebhookEvent, event_id)
+    assert event.status == "received" and event.attempts == 1
+    assert PaymentWebhookService.process_batch(db_session, now=now + timedelta(seconds=1)) == 0
+    PaymentWebhookService.process_batch(db_session, now=now + timedelta(seconds=2))
+    db_session.refresh(event)
+    assert event.status == "failed"
+    assert event.last_error
+
+    payments["333"] = _approved(booking_id)
+    assert PaymentWebhookService.replay(db_session) == 1
+    assert PaymentWebhookService.process_batch(db_session) == 1
+    db_session.refresh(event)
+    assert event.status == "processed"
+    assert db_session.get(Booking, booking_id).payment_status == "paid"
+
+
+def test_confirm_on_stale_booking_rereads_it_and_reclaims_seats(tmp_path):
+    """La reserva se leyó antes de que el barrido la venciera: el pago la confirma igual."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from app.services.booking_expiry_service import BookingExpiryService
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'confirm.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as session:
+        booking_id = _booking(session)
+        booking = session.get(Booking, booking_id)
+        booking.created_at = datetime.utcnow() - timedelta(hours=2)
+        session.commit()
+        ride_id = booking.ride_id
+
+    confirming, sweeper = SessionLocal(), SessionLocal()
+    try:
+        stale = confirming.get(Booking, booking_id)
+        assert BookingExpiryService.expire_batch(sweeper) == 1
+        assert sweeper.get(Ride, ride_id).seats_taken == 0
+
+        assert PaymentWebhookService.confirm_payment(confirming, stale, "333", 5000.0, "ARS")
+        confirming.commit()
+    finally:
+        confirming.close()
+        sweeper.close()
+
+    with SessionLocal() as session:
+        booking = session.get(Booking, booking_id)
+        assert (booking.status, booking.payment_status) == ("confirmed", "paid")
+        assert session.get(Ride, ride_id).seats_taken == 1
+    engine.dispose()
@@ -0,0 +1,66 @@
+import time
+from types import SimpleNamespace
+from app.api.deps import principal_cache, get_current_admin_user
+from app.auth import create_access_token
+from app.main import app
+from app.models.user import User
+
+
+def _user(db, dni, role="P", is_active=True):
+    user = User(dni=dni, email=f"{dni}@cache.com", name=f"User {dni}", hashed_password="x",
+                role=role, is_active=is_active)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _headers(user):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': user.dni, 'id': user.id})}"}
+
+
+def test_second_request_is_served_without_loading_the_user(client, db_session, count_queries):
+    user = _user(db_session, "70000001")
+    headers = _headers(user)
+
+    assert client.get("/api/users/me", headers=headers).json()["dni"] == "70000001"
+    db_session.expunge_all()
+    count_queries.clear()
+    res = client.get("/api/users/me", headers=headers)
+    assert res.status_code == 200 and res.json()["name"] == "User 70000001"
+    assert not any("FROM users" in sql for sql in count_queries)
+    assert principal_cache.stats()["hits"] == 1
+
+
+def test_profile_update_through_cached_user_is_persisted_and_invalidated(client, db_session):
+    user = _user(db_session, "70000002")
+    headers = _headers(user)
+    client.get("/api/users/me", headers=headers)  # queda en caché
+    db_session.expunge_all()
+
+    res = client.patch("/api/users/me", json={"phone": "3511234567"}, headers=headers)
+    assert res.status_code == 200
+    assert db_session.get(User, user.id).phone == "3511234567"
+    assert client.get("/api/users/me", headers=headers).json()["phone"] == "3511234567"
+
+
+def test_blocked_user_is_rejected_right_away(client, db_session, monkeypatch):
+    admin_id = _user(db_session, "70000003", role="admin").id
+    user = _user(db_session, "70000004")
+    user_id, headers = user.id, _headers(user)
+    assert client.get("/api/users/me", headers=headers).status_code == 200
+
+    app.dependency_overrides[get_current_admin_user] = lambda: db_session.get(User, admin_id)
+    assert client.post(f"/api/admin/users/{user_id}/block").status_code == 200
+    assert principal_cache.get(user_id, None) is None
+    assert client.get("/api/users/me", headers=headers).status_code == 403
+
+    # Bloqueado en la base sin pasar por la API: la caché lo sirve a lo sumo TTL segundos
+    other = _user(db_session, "70000005")
+    other_id, other_headers = other.id, _headers(other)
+    client.get("/api/users/me", headers=other_headers)
+    db_session.get(User, other_id).is_active = False
+    db_session.commit()
+    assert client.get("/api/users/me", headers=other_headers).status_code == 200
+    later = time.monotonic() + principal_cache.ttl + 1
+    monkeypatch.setattr("app.core.cache.time", SimpleNamespace(monotonic=lambda: later))
+    assert client.get("/api/users/me", headers=other_headers).status_code == 403
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from app.main import app
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.models.ride import Ride
+from app.utils.matching import haversine_distance
+
+CORDOBA = (-31.4201, -64.1888)
+CARLOS_PAZ = (-31.4241, -64.4978)   # ~30 km
+ALTA_GRACIA = (-31.6529, -64.4283)  # ~34 km
+ROSARIO = (-32.9442, -60.6505)
+BUENOS_AIRES = (-34.6037, -58.3816)
+
+
+def _seed(db_session):
+    driver = User(dni="80000001", email="drv@near.com", name="Driver", hashed_password="x", gender="F", is_active=True)
+    db_session.add(driver)
+    db_session.commit()
+
+    departure = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M")
+    past = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M")
+
+    def ride(name, origin, dest, when=departure):
+        return Ride(origin=name, destination="X", departure_time=when, price=100, available_seats=3,
+                    driver_id=driver.id, origin_lat=origin[0], origin_lng=origin[1],
+                    destination_lat=dest[0], destination_lng=dest[1])
+
+    db_session.add_all([
+        ride("Cordoba-Rosario", CORDOBA, ROSARIO),
+        ride("CarlosPaz-Rosario", CARLOS_PAZ, ROSARIO),
+        ride("AltaGracia-BsAs", ALTA_GRACIA, BUENOS_AIRES),
+        ride("Rosario-Cordoba", ROSARIO, CORDOBA),
+        ride("Cordoba-Pasado", CORDOBA, ROSARIO, when=past),
+        Ride(origin="SinCoords", destination="X", departure_time=departure, price=1, available_seats=1, driver_id=driver.id),
+    ])
+    db_session.commit()
+    driver_id = driver.id
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, driver_id)
+
+
+def test_near_filters_by_exact_distance_and_sorts(client, db_session):
+    _seed(db_session)
+
+    res = client.get("/api/rides/near", params={"lat": CORDOBA[0], "lng": CORDOBA[1], "radius_km": 40})
+    assert res.status_code == 200, res.text
+    rides = res.json()
+    assert [r["origin"] for r in rides] == ["Cordoba-Rosario", "CarlosPaz-Rosario", "AltaGracia-BsAs"]
+    assert rides[0]["distance_km"] == 0
+    expected = haversine_distance(CORDOBA[0], CORDOBA[1], CARLOS_PAZ[0], CARLOS_PAZ[1])
+    assert abs(rides[1]["distance_km"] - expected) < 0.01
+
+    # Con un radio menor Carlos Paz (~30 km) queda afuera
+    res = client.get("/api/rides/near", params={"lat": CORDOBA[0], "lng": CORDOBA[1], "radius_km": 25})
+    assert [r["origin"] for r in res.json()] == ["Cordoba-Rosario"]
+
+
+def test_near_with_destination_and_pagination(client, db_session):
+    _seed(db_session)
+    params = {"lat": CORDOBA[0], "lng": CORDOBA[1], "radius_km": 40,
+              "dest_lat": ROSARIO[0], "dest_lng": ROSARIO[1]}
+
+    rides = client.get("/api/rides/near", params=params).json()
+    assert [r["origin"] for r in rides] == ["Cordoba-Rosario", "CarlosPaz-Rosario"]
+    assert all(r["dest_distance_km"] == 0 for r in rides)
+
+    page = client.get("/api/rides/near", params={**params, "skip": 1, "limit": 1}).json()
+    assert [r["origin"] for r in page] == ["CarlosPaz-Rosario"]
+
+
+def test_near_rejects_partial_destination(client, db_session):
+    _seed(db_session)
+    res = client.get("/api/rides/near", params={"lat": CORDOBA[0], "lng": CORDOBA[1], "dest_lat": ROSARIO[0]})
+    assert res.status_code == 400
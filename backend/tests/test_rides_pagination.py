@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from app.main import app
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.models.ride import Ride
+from app.models.booking import Booking, BookingStatus
+
+
+def _seed(db_session, n_rides):
+    driver = User(dni="70000001", email="drv@page.com", name="Driver", hashed_password="x", gender="F", is_active=True)
+    passenger = User(dni="70000002", email="pax@page.com", name="Pax", hashed_password="x", gender="F", is_active=True)
+    db_session.add_all([driver, passenger])
+    db_session.commit()
+
+    # Varios viajes con la misma hora de salida: el id desempata el cursor
+    base = datetime.now() + timedelta(days=1)
+    for i in range(n_rides):
+        departure = (base + timedelta(hours=i // 3)).strftime("%Y-%m-%dT%H:%M")
+        ride = Ride(origin=f"O{i}", destination="D", departure_time=departure,
+                    price=100, available_seats=4, driver_id=driver.id)
+        db_session.add(ride)
+        db_session.flush()
+        if i % 2 == 0:
+            db_session.add(Booking(ride_id=ride.id, passenger_id=passenger.id, seats_booked=1,
+                                   status=BookingStatus.CONFIRMED.value))
+    db_session.commit()
+    passenger_id = passenger.id
+    app.dependency_overrides[get_current_user] = lambda: db_session.get(User, passenger_id)
+
+
+def test_rides_keyset_pagination_walks_every_ride_once(client, db_session):
+    _seed(db_session, n_rides=11)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        res = client.get("/api/rides", params={"limit": 4, **({"cursor": cursor} if cursor else {})})
+        assert res.status_code == 200, res.text
+        page = res.json()
+        assert len(page) <= 4
+        seen.extend(page)
+        pages += 1
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert [r["origin"] for r in seen] == [f"O{i}" for i in range(11)]
+    assert [r["bookings_count"] for r in seen] == [1 if i % 2 == 0 else 0 for i in range(11)]
+    assert all(r["driver_name"] == "Driver" for r in seen)
+
+
+def test_rides_page_query_count_is_constant(client, db_session, count_queries):
+    _seed(db_session, n_rides=30)
+
+    count_queries.clear()
+    res = client.get("/api/rides", params={"limit": 25})
+    assert res.status_code == 200
+    assert len(res.json()) == 25
+    queries = [q for q in count_queries if "FROM users" not in q or "JOIN" in q]
+    # Viajes + conductor (joined) + reservas (subquery) en una sola consulta
+    assert len(queries) == 1, "\n\n".join(queries)
+
+
+def test_rides_invalid_cursor_is_rejected(client, db_session):
+    _seed(db_session, n_rides=1)
+    res = client.get("/api/rides", params={"cursor": "no-es-un-cursor"})
+    assert res.status_code == 400
+
+
+def test_rides_text_filters_apply_before_the_page_limit(client, db_session):
+    _seed(db_session, n_rides=11)
+
+    # "O1" y "O10" quedan detrás de varias páginas sin filtro
+    res = client.get("/api/rides", params={"limit": 1, "origin": "o1"})
+    assert res.status_code == 200, res.text
+    assert [r["origin"] for r in res.json()] == ["O1"]
+    res = client.get("/api/rides", params={"limit": 1, "origin": "o1", "cursor": res.headers["X-Next-Cursor"]})
+    assert [r["origin"] for r in res.json()] == ["O10"]
+    assert "X-Next-Cursor" not in res.headers
+
+    assert client.get("/api/rides", params={"destination": "x"}).json() == []
+    assert len(client.get("/api/rides", params={"destination": "d", "origin": "%"}).json()) == 0
+    day = client.get("/api/rides").json()[0]["departure_time"][:10]
+    assert all(r["departure_time"].startswith(day) for r in client.get("/api/rides", params={"date": day}).json())
+    assert client.get("/api/rides", params={"date": "mañana"}).status_code == 422
@@ -0,0 +1,174 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import pytest
+from fastapi import Depends, Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.models.ride import Ride
+from app.models.booking import Booking, SEAT_HOLDING_STATUSES
+from app.services.payment_service import PaymentService
+from app.services.seat_service import SeatService, BookingStatusChanged
+from app.services.booking_expiry_service import BookingExpiryService
+
+
+@pytest.fixture(autouse=True)
+def no_mercadopago(monkeypatch):
+    # La preferencia de pago no es parte de lo que se prueba (y saldría a la red)
+    monkeypatch.setattr(PaymentService, "create_preference", lambda self, **kwargs: None)
+
+
+def _departure():
+    return (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%dT%H:%M")
+
+
+def _seed(session, capacity, n_passengers):
+    driver = User(dni="90000000", email="drv@seats.com", name="Driver", hashed_password="x", is_active=True)
+    passengers = [
+        User(dni=f"9100{i:04d}", email=f"p{i}@seats.com", name=f"Pax {i}", hashed_password="x", is_active=True)
+        for i in range(n_passengers)
+    ]
+    session.add_all([driver] + passengers)
+    session.commit()
+    ride = Ride(origin="A", destination="B", departure_time=_departure(), price=100,
+                available_seats=capacity, driver_id=driver.id, status="active")
+    session.add(ride)
+    session.commit()
+    return ride.id, [p.id for p in passengers]
+
+
+def _login_by_header():
+    """get_current_user según el header X-User-Id (varios usuarios en paralelo)."""
+    def current_user(request: Request, db=Depends(get_db)):
+        return db.get(User, int(request.headers["X-User-Id"]))
+    app.dependency_overrides[get_current_user] = current_user
+
+
+def test_book_cancel_and_resize_keep_counter_in_sync(client, db_session):
+    ride_id, (p1, p2) = _seed(db_session, capacity=3, n_passengers=2)
+    _login_by_header()
+
+    res = client.post("/api/bookings/", json={"ride_id": ride_id, "seats_booked": 2}, headers={"X-User-Id": str(p1)})
+    assert res.status_code == 201, res.text
+    booking_id = res.json()["id"]
+
+    res = client.post("/api/bookings/", json={"ride_id": ride_id, "seats_booked": 2}, headers={"X-User-Id": str(p2)})
+    assert res.status_code == 400
+    assert "Disponibles: 1" in res.json()["detail"]
+
+    # Bajar a 1 asiento libera uno; el segundo pasajero ahora entra con 2
+    res = client.patch(f"/api/bookings/{booking_id}", json={"seats_booked": 1}, headers={"X-User-Id": str(p1)})
+    assert res.status_code == 200, res.text
+    res = client.post("/api/bookings/", json={"ride_id": ride_id, "seats_booked": 2}, headers={"X-User-Id": str(p2)})
+    assert res.status_code == 201
+    assert db_session.get(Ride, ride_id).seats_taken == 3
+
+    # Cancelar libera; reactivar vuelve a ocupar (si hay lugar)
+    res = client.patch(f"/api/bookings/{booking_id}", json={"status": "cancelled"}, headers={"X-User-Id": str(p1)})
+    assert res.status_code == 200
+    db_session.expire_all()
+    assert db_session.get(Ride, ride_id).seats_taken == 2
+
+    SeatService.recount(db_session)
+    db_session.commit()
+    db_session.expire_all()
+    assert db_session.get(Ride, ride_id).seats_taken == 2
+
+
+def test_cancelled_ride_rejects_bookings(client, db_session):
+    ride_id, (p1,) = _seed(db_session, capacity=3, n_passengers=1)
+    db_session.get(Ride, ride_id).status = "cancelled"
+    db_session.commit()
+    _login_by_header()
+
+    res = client.post("/api/bookings/", json={"ride_id": ride_id, "seats_booked": 1}, headers={"X-User-Id": str(p1)})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "El viaje no está activo"
+
+
+def test_concurrent_bookings_never_overbook(tmp_path):
+    """Muchos pasajeros reservan a la vez contra una base en archivo (conexiones reales)."""
+    capacity, n_passengers = 5, 24
+    engine = create_engine(f"sqlite:///{tmp_path / 'seats.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with SessionLocal() as session:
+        ride_id, passenger_ids = _seed(session, capacity, n_passengers)
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    _login_by_header()
+    barrier = threading.Barrier(n_passengers)
+
+    try:
+        with TestClient(app) as client:
+            def book(passenger_id):
+                barrier.wait()
+                return client.post("/api/bookings/", json={"ride_id": ride_id, "seats_booked": 1},
+                                   headers={"X-User-Id": str(passenger_id)}).status_code
+
+            with ThreadPoolExecutor(max_workers=n_passengers) as pool:
+                codes = list(pool.map(book, passenger_ids))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert codes.count(201) == capacity
+    assert codes.count(400) == n_passengers - capacity
+    with SessionLocal() as session:
+        assert session.get(Ride, ride_id).seats_taken == capacity
+        held = session.query(func.sum(Booking.seats_booked)).filter(
+            Booking.ride_id == ride_id, Booking.status.in_(SEAT_HOLDING_STATUSES)
+        ).scalar()
+        assert held == capacity
+    engine.dispose()
+
+
+def test_cancel_racing_expiry_does_not_release_seats_twice(tmp_path):
+    """Un cancel/confirm con la reserva leída antes de que el barrido la venza."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    with SessionLocal() as session:
+        ride_id, (p1, p2) = _seed(session, capacity=3, n_passengers=2)
+        assert SeatService.reserve(session, ride_id, 2)
+        stale = Booking(ride_id=ride_id, passenger_id=p1, seats_booked=1, status="awaiting_payment",
+                        created_at=datetime.utcnow() - timedelta(hours=2))
+        paid = Booking(ride_id=ride_id, passenger_id=p2, seats_booked=1, status="confirmed", payment_status="paid")
+        session.add_all([stale, paid])
+        session.commit()
+        stale_id = stale.id
+
+    cancelling, confirming, sweeper = SessionLocal(), SessionLocal(), SessionLocal()
+    try:
+        to_cancel = cancelling.get(Booking, stale_id)
+        to_confirm = confirming.get(Booking, stale_id)
+        assert to_cancel.status == to_confirm.status == "awaiting_payment"
+
+        assert BookingExpiryService.expire_batch(sweeper) == 1
+        assert sweeper.get(Ride, ride_id).seats_taken == 1
+
+        for session, booking, new_status in ((cancelling, to_cancel, "cancelled"), (confirming, to_confirm, "confirmed")):
+            with pytest.raises(BookingStatusChanged):
+                SeatService.change_status(session, booking, new_status)
+            session.rollback()
+    finally:
+        for session in (cancelling, confirming, sweeper):
+            session.close()
+
+    with SessionLocal() as session:
+        assert session.get(Booking, stale_id).status == "expired"
+        assert session.get(Ride, ride_id).seats_taken == 1
+    engine.dispose()
@@ -19,7 +19,7 @@ export default function ManageRideModal({ isOpen, onClose, ride, authFetch, API_
             if (res.ok) {
                 const data = await res.json()
                 // Filtrar solo las activas confirmadas/pendientes (aunque el endpoint devuelve todas, el frontend puede filtrar visualmente)
-                setBookings(data.filter(b => b.status !== 'cancelled'))
+                setBookings(data.filter(b => b.status !== 'cancelled' && b.status !== 'expired'))
             } else {
                 setError("No se pudieron cargar los pasajeros")
             }
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { useNavigate } from 'react-router-dom' // Added useNavigate
 import { useAuth } from '../context/AuthContext'
 import OfferRideModal from '../components/OfferRideModal'
@@ -8,6 +8,7 @@ import CityAutocomplete from '../components/CityAutocomplete'
 import ReserveRideModal from '../components/ReserveRideModal'
 import PaymentModal from '../components/PaymentModal'
 import { API_URL } from '@config/api.js'
+import { waitForPaymentLink } from '../utils/paymentLink'
 
 export default function Dashboard() {
     const { user, authFetch } = useAuth()
@@ -34,6 +35,7 @@ export default function Dashboard() {
 
     // Datos y Estados
     const [rides, setRides] = useState([])
+    const [ridesCursor, setRidesCursor] = useState(null) // Paginación: X-Next-Cursor de /rides
     const [requests, setRequests] = useState([])
     const [matches, setMatches] = useState([]) // NEW: Smart Matches
     const [loading, setLoading] = useState(false) // Moved up context logic check
@@ -59,12 +61,43 @@ export default function Dashboard() {
         fetchData()
     }, [user])
 
+    // Origen / destino / fecha se filtran en el backend, antes de paginar
+    const ridesUrl = (cursor) => {
+        const params = new URLSearchParams()
+        if (searchFrom) params.set('origin', searchFrom)
+        if (searchTo) params.set('destination', searchTo)
+        if (searchDate) params.set('date', searchDate)
+        if (cursor) params.set('cursor', cursor)
+        const query = params.toString()
+        return `${API_URL}/rides${query ? `?${query}` : ''}`
+    }
+
+    const fetchRides = async () => {
+        const resRides = await authFetch(ridesUrl())
+        if (resRides.ok) {
+            setRides(await resRides.json())
+            setRidesCursor(resRides.headers.get('X-Next-Cursor'))
+        }
+    }
+
+    // Nueva búsqueda al cambiar los filtros (con una pausa para no pedir por cada tecla)
+    const filtersReady = useRef(false)
+    useEffect(() => {
+        if (!filtersReady.current) {
+            filtersReady.current = true
+            return
+        }
+        const timer = setTimeout(() => {
+            fetchRides().catch(error => console.error("Error fetching rides:", error))
+        }, 300)
+        return () => clearTimeout(timer)
+    }, [searchFrom, searchTo, searchDate])
+
     const fetchData = async () => {
         setLoading(true)
         try {
             // Fetch Rides
-            const resRides = await authFetch(`${API_URL}/rides`)
-            if (resRides.ok) setRides(await resRides.json())
+            await fetchRides()
 
             // Fetch Requests (if needed, or logic to separate)
             const resRequests = await authFetch(`${API_URL}/requests`)
@@ -80,6 +113,21 @@ export default function Dashboard() {
         }
     }
 
+    // Siguiente página del buscador (cursor devuelto por el backend)
+    const loadMoreRides = async () => {
+        if (!ridesCursor) return
+        try {
+            const res = await authFetch(ridesUrl(ridesCursor))
+            if (res.ok) {
+                const page = await res.json()
+                setRides(prev => [...prev, ...page])
+                setRidesCursor(res.headers.get('X-Next-Cursor'))
+            }
+        } catch (error) {
+            console.error("Error loading more rides:", error)
+        }
+    }
+
     // Filter Logic
     const filteredRides = rides.filter(ride => {
         if (searchFrom && !ride.origin.toLowerCase().includes(searchFrom.toLowerCase())) return false
@@ -129,8 +177,9 @@ export default function Dashboard() {
                         const booking = await res.json()
 
                         // 2. Redirigir a MercadoPago (Real Payment)
-                        if (booking.payment_init_point) {
-                            window.location.href = booking.payment_init_point
+                        const initPoint = await waitForPaymentLink(authFetch, API_URL, booking)
+                        if (initPoint) {
+                            window.location.href = initPoint
                         } else {
                             // Fallback (Simulation)
                             setCurrentBookingForPayment(booking)
@@ -210,6 +259,17 @@ export default function Dashboard() {
                                 ))}
                             </div>
                         )}
+
+                        {ridesCursor && (
+                            <div className="text-center">
+                                <button
+                                    onClick={loadMoreRides}
+                                    className="text-sm font-bold text-cyan-400 border border-slate-800 bg-slate-900 hover:bg-slate-800 px-6 py-2 rounded-full transition-colors"
+                                >
+                                    Cargar más viajes
+                                </button>
+                            </div>
+                        )}
                     </div>
                 )}
 
@@ -6,6 +6,7 @@ import ReviewModal from '../components/reviews/ReviewModal'
 import OfferRideModal from '../components/OfferRideModal'
 import RequestRideModal from '../components/RequestRideModal'
 import { API_URL } from '@config/api.js'
+import { waitForPaymentLink } from '../utils/paymentLink'
 
 const MyTrips = () => {
     const { user, authFetch } = useAuth()
@@ -214,8 +215,9 @@ const MyTrips = () => {
                 if (res.ok) {
                     const bookingData = await res.json()
                     // 2. Redirect to MercadoPago
-                    if (bookingData.payment_init_point) {
-                        window.location.href = bookingData.payment_init_point
+                    const initPoint = await waitForPaymentLink(authFetch, API_URL, bookingData)
+                    if (initPoint) {
+                        window.location.href = initPoint
                     } else {
                         alert("Reserva creada. Ve a 'Mis Reservas' para completar el pago.")
                         fetchData()
@@ -82,7 +82,7 @@ const AdminBookings = () => {
                                     </td>
                                     <td className="px-6 py-4">
                                         <span className={`px-2 py-1 rounded text-xs font-bold uppercase ${b.status === 'confirmed' ? 'bg-green-900/50 text-green-200' :
-                                            b.status === 'cancelled' ? 'bg-red-900/50 text-red-200' :
+                                            (b.status === 'cancelled' || b.status === 'expired') ? 'bg-red-900/50 text-red-200' :
                                                 'bg-yellow-900/50 text-yellow-200'
                                             }`}>
                                             {b.status}
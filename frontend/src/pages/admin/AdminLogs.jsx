@@ -8,20 +8,30 @@ const AdminLogs = () => {
     const { token } = useAuth();
     const [logs, setLogs] = useState([]);
     const [loading, setLoading] = useState(true);
+    // Paginado por cursor: cursors[i] es el cursor de la página i (la 0 no tiene)
+    const [cursors, setCursors] = useState([null]);
     const [page, setPage] = useState(0);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [filters, setFilters] = useState({ action: '', userId: '' });
+    const [draft, setDraft] = useState({ action: '', userId: '' });
     const LIMIT = 50;
 
     useEffect(() => {
         const fetchLogs = async () => {
             setLoading(true);
             try {
+                const params = new URLSearchParams({ limit: LIMIT });
+                if (cursors[page]) params.set('cursor', cursors[page]);
+                if (filters.action) params.set('action', filters.action);
+                if (filters.userId) params.set('user_id', filters.userId);
 
-                const response = await fetch(`${API_URL}/admin/logs?skip=${page * LIMIT}&limit=${LIMIT}`, {
+                const response = await fetch(`${API_URL}/admin/logs?${params}`, {
                     headers: { 'Authorization': `Bearer ${token}` }
                 });
                 if (response.ok) {
                     const data = await response.json();
                     setLogs(data);
+                    setNextCursor(response.headers.get('X-Next-Cursor'));
                 }
             } catch (error) {
                 console.error("Error fetching logs:", error);
@@ -30,13 +40,41 @@ const AdminLogs = () => {
             }
         };
         fetchLogs();
-    }, [token, page]);
+    }, [token, page, cursors, filters]);
+
+    const goNext = () => {
+        if (!nextCursor) return;
+        setCursors(prev => [...prev.slice(0, page + 1), nextCursor]);
+        setPage(p => p + 1);
+    };
+
+    const applyFilters = (e) => {
+        e.preventDefault();
+        setCursors([null]);
+        setPage(0);
+        setFilters({ action: draft.action.trim().toUpperCase(), userId: draft.userId.trim() });
+    };
 
     return (
         <AdminLayout>
             <div className="bg-slate-900 rounded-lg border border-slate-700 overflow-hidden">
                 <div className="p-6 border-b border-slate-700 flex justify-between items-center">
                     <h2 className="text-xl font-bold text-white">System Audit Logs</h2>
+                    <form onSubmit={applyFilters} className="flex gap-2">
+                        <input
+                            value={draft.action}
+                            onChange={e => setDraft(d => ({ ...d, action: e.target.value }))}
+                            placeholder="Action"
+                            className="px-2 py-1 bg-slate-800 text-white rounded border border-slate-700 text-sm"
+                        />
+                        <input
+                            value={draft.userId}
+                            onChange={e => setDraft(d => ({ ...d, userId: e.target.value.replace(/\D/g, '') }))}
+                            placeholder="User ID"
+                            className="w-24 px-2 py-1 bg-slate-800 text-white rounded border border-slate-700 text-sm"
+                        />
+                        <button type="submit" className="px-3 py-1 bg-cyan-700 text-white rounded">Filter</button>
+                    </form>
                     <div className="flex gap-2">
                         <button
                             disabled={page === 0}
@@ -47,8 +85,8 @@ const AdminLogs = () => {
                         </button>
                         <span className="text-slate-400 self-center">Page {page + 1} (Latest)</span>
                         <button
-                            disabled={logs.length < LIMIT}
-                            onClick={() => setPage(p => p + 1)}
+                            disabled={!nextCursor}
+                            onClick={goNext}
                             className="px-3 py-1 bg-slate-700 text-white rounded disabled:opacity-50"
                         >
                             Next
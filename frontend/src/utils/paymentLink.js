@@ -0,0 +1,27 @@
+/**
+ * Link de pago de MercadoPago de una reserva.
+ * El backend crea la preferencia en segundo plano (outbox): después de
+ * reservar se consulta GET /bookings/{id}/payment hasta que esté lista.
+ * Retorna el init_point, o null si falló o no llegó a tiempo.
+ */
+export const waitForPaymentLink = async (authFetch, API_URL, booking, { timeoutMs = 15000, intervalMs = 1000 } = {}) => {
+    if (booking.payment_init_point) return booking.payment_init_point
+
+    const deadline = Date.now() + timeoutMs
+    while (Date.now() < deadline) {
+        try {
+            const res = await authFetch(`${API_URL}/bookings/${booking.id}/payment`)
+            if (res.ok) {
+                const data = await res.json()
+                if (data.status === 'ready') return data.init_point
+                if (data.status !== 'pending') return null
+            } else if (res.status !== 404) {
+                return null
+            }
+        } catch (e) {
+            console.error(e)
+        }
+        await new Promise(resolve => setTimeout(resolve, intervalMs))
+    }
+    return null
+}